@@ -0,0 +1,163 @@
+#pragma once
+
+#include <bits/stdc++.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+// Bulk text I/O shared by t-spanner.cpp and checker.cpp. Input files are
+// memory-mapped and stdin is read in large blocks; integers are parsed by
+// hand. Output is collected in a buffer and written with write(2). The text
+// format is whitespace separated integers, exactly what cin >> reads.
+
+struct text_reader
+{
+    static const size_t BLOCK = 1<<20;
+
+    int fd = -1;
+    bool mapped = false;
+    const char* buf = nullptr;
+    size_t len = 0, pos = 0;
+    std::vector<char> block;
+
+    text_reader() {}
+    text_reader(const text_reader&) = delete;
+    text_reader& operator=(const text_reader&) = delete;
+    ~text_reader() { close(); }
+
+    // Opens path, or stdin if path is null; returns false if it cannot be
+    // opened. Regular files are mapped unless map is false (block reads keep
+    // the resident memory at one block however large the file is).
+    bool open(const char* path, bool map = true)
+    {
+        close();
+        if(!path)
+        {
+            fd = 0;
+            block.resize(BLOCK);
+            return true;
+        }
+        fd = ::open(path, O_RDONLY);
+        if(fd<0) return false;
+        struct stat st;
+        if(map && fstat(fd, &st)==0 && S_ISREG(st.st_mode) && st.st_size>0)
+        {
+            void* base = mmap(nullptr, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+            if(base!=MAP_FAILED)
+            {
+                madvise(base, st.st_size, MADV_SEQUENTIAL);
+                mapped = true;
+                buf = (const char*)base;
+                len = st.st_size;
+                return true;
+            }
+        }
+        // Pipes, empty files or failed mappings fall back to block reads
+        block.resize(BLOCK);
+        return true;
+    }
+
+    void close()
+    {
+        if(mapped) munmap((void*)buf, len);
+        if(fd>0) ::close(fd);
+        fd = -1;
+        mapped = false;
+        buf = nullptr;
+        len = pos = 0;
+    }
+
+    bool refill()
+    {
+        if(mapped || fd<0) return false;
+        ssize_t got;
+        do got = ::read(fd, block.data(), block.size());
+        while(got<0 && errno==EINTR);
+        if(got<=0) return false;
+        buf = block.data();
+        len = got;
+        pos = 0;
+        return true;
+    }
+
+    inline int get()
+    {
+        if(pos==len && !refill()) return -1;
+        return (unsigned char)buf[pos++];
+    }
+
+    // Reads the next (optionally negative) integer; false at end of input
+    template<class T>
+    bool next(T& x)
+    {
+        int c = get();
+        while(c>=0 && c<=' ') c = get();
+        if(c<0) return false;
+        bool neg = c=='-';
+        if(neg) c = get();
+        T v = 0;
+        while(c>='0' && c<='9')
+        {
+            v = v*10 + (c-'0');
+            c = get();
+        }
+        x = neg ? -v : v;
+        return true;
+    }
+};
+
+struct text_writer
+{
+    int fd;
+    std::vector<char> buf;
+    size_t pos = 0;
+    bool ok = true;
+
+    explicit text_writer(int fd_ = 1, size_t cap = 1<<20) : fd(fd_), buf(cap) {}
+    text_writer(const text_writer&) = delete;
+    text_writer& operator=(const text_writer&) = delete;
+    ~text_writer() { flush(); }
+
+    void flush()
+    {
+        size_t done = 0;
+        while(done<pos)
+        {
+            ssize_t put = ::write(fd, buf.data()+done, pos-done);
+            if(put<0 && errno==EINTR) continue;
+            if(put<=0)
+            {
+                ok = false;
+                break;
+            }
+            done += put;
+        }
+        pos = 0;
+    }
+
+    inline void put(char c)
+    {
+        if(pos==buf.size()) flush();
+        buf[pos++] = c;
+    }
+
+    template<class T>
+    void write_int(T x)
+    {
+        if(pos+24>buf.size()) flush();
+        if(x<0)
+        {
+            buf[pos++] = '-';
+            x = -x;
+        }
+        char tmp[24];
+        int k = 0;
+        do
+        {
+            tmp[k++] = '0' + x%10;
+            x /= 10;
+        } while(x);
+        while(k) buf[pos++] = tmp[--k];
+    }
+};
@@ -0,0 +1,154 @@
+#pragma once
+
+#include <bits/stdc++.h>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+// Binary graph file shared by t-spanner.cpp, checker.cpp and graphio.py.
+// Little endian, fixed 32 byte header followed by flat arrays:
+//
+//   0   char[4]  magic "TSPG"
+//   4   uint32   version (1)
+//   8   uint32   layout: 0 = edge list, 1 = CSR
+//   12  int32    n
+//   16  int64    m (undirected edges)
+//   24  int32    t
+//   28  uint32   reserved
+//   32  edge list: int32 u[m], int32 v[m], int32 w[m]
+//       CSR:       int64 indptr[n+1], int32 indices[2m], int32 weights[2m]
+//
+// The file is mmapped read-only, so loading costs no parsing at all.
+
+const char GRAPH_MAGIC[4] = {'T', 'S', 'P', 'G'};
+const int GRAPH_VERSION = 1;
+const int LAYOUT_EDGES = 0;
+const int LAYOUT_CSR = 1;
+
+struct graph_header
+{
+    char magic[4];
+    uint32_t version, layout;
+    int32_t n;
+    int64_t m;
+    int32_t t;
+    uint32_t reserved;
+};
+static_assert(sizeof(graph_header)==32, "graph_header must be 32 bytes");
+
+struct graph_file
+{
+    int layout = LAYOUT_EDGES, n = 0, t = 0;
+    long long m = 0;
+    const int32_t *u = nullptr, *v = nullptr, *w = nullptr; // edge list
+    const int64_t *indptr = nullptr;                        // CSR
+    const int32_t *indices = nullptr, *weights = nullptr;
+    void* base = nullptr;
+    size_t size = 0;
+};
+
+// True if path starts with the binary magic (text graphs start with digits)
+inline bool is_graph_file(const char* path)
+{
+    char magic[4];
+    FILE* f = fopen(path, "rb");
+    if(!f) return false;
+    bool ok = fread(magic, 1, 4, f)==4 && memcmp(magic, GRAPH_MAGIC, 4)==0;
+    fclose(f);
+    return ok;
+}
+
+// Maps a binary graph file; returns false (with g untouched) on any error
+inline bool map_graph_file(const char* path, graph_file& g)
+{
+    int fd = open(path, O_RDONLY);
+    if(fd<0) return false;
+    struct stat st;
+    if(fstat(fd, &st)<0 || (size_t)st.st_size<sizeof(graph_header))
+    {
+        close(fd);
+        return false;
+    }
+    void* base = mmap(nullptr, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+    close(fd);
+    if(base==MAP_FAILED) return false;
+
+    const graph_header* h = (const graph_header*)base;
+    const char* data = (const char*)base + sizeof(graph_header);
+    size_t need = sizeof(graph_header);
+    if(h->layout==LAYOUT_EDGES) need += 3*sizeof(int32_t)*(size_t)h->m;
+    else need += sizeof(int64_t)*((size_t)h->n+1) + 4*sizeof(int32_t)*(size_t)h->m;
+    if(memcmp(h->magic, GRAPH_MAGIC, 4)!=0 || h->version!=GRAPH_VERSION || h->layout>LAYOUT_CSR
+       || (size_t)st.st_size<need)
+    {
+        munmap(base, st.st_size);
+        return false;
+    }
+
+    g = graph_file();
+    g.layout = h->layout;
+    g.n = h->n;
+    g.m = h->m;
+    g.t = h->t;
+    g.base = base;
+    g.size = st.st_size;
+    if(g.layout==LAYOUT_EDGES)
+    {
+        g.u = (const int32_t*)data;
+        g.v = g.u + g.m;
+        g.w = g.v + g.m;
+    }
+    else
+    {
+        g.indptr = (const int64_t*)data;
+        g.indices = (const int32_t*)(g.indptr + g.n + 1);
+        g.weights = g.indices + 2*g.m;
+    }
+    return true;
+}
+
+inline void unmap_graph_file(graph_file& g)
+{
+    if(g.base) munmap(g.base, g.size);
+    g = graph_file();
+}
+
+// Calls f(u, v, w) once per undirected edge, whatever the layout
+template<class F>
+void for_each_edge(const graph_file& g, F f)
+{
+    if(g.layout==LAYOUT_EDGES)
+    {
+        for(long long i=0; i<g.m; i++) f(g.u[i], g.v[i], g.w[i]);
+        return;
+    }
+    for(int i=0; i<g.n; i++)
+    {
+        for(long long p=g.indptr[i]; p<g.indptr[i+1]; p++)
+        {
+            if(g.indices[p]>i) f(i, g.indices[p], g.weights[p]);
+        }
+    }
+}
+
+// Writes an edge list layout file; returns false on I/O error
+inline bool write_graph_file(const char* path, int n, int t, long long m,
+                             const int32_t* u, const int32_t* v, const int32_t* w)
+{
+    FILE* f = fopen(path, "wb");
+    if(!f) return false;
+    graph_header h;
+    memcpy(h.magic, GRAPH_MAGIC, 4);
+    h.version = GRAPH_VERSION;
+    h.layout = LAYOUT_EDGES;
+    h.n = n;
+    h.m = m;
+    h.t = t;
+    h.reserved = 0;
+    bool ok = fwrite(&h, sizeof(h), 1, f)==1
+        && (size_t)fwrite(u, sizeof(int32_t), m, f)==(size_t)m
+        && (size_t)fwrite(v, sizeof(int32_t), m, f)==(size_t)m
+        && (size_t)fwrite(w, sizeof(int32_t), m, f)==(size_t)m;
+    return fclose(f)==0 && ok;
+}
@@ -1,32 +1,131 @@
 #include <bits/stdc++.h>
+#ifdef _OPENMP
+#include <omp.h>
+#endif
+#include "fastio.hpp"
+#include "graphfile.hpp"
 
 using namespace std;
 
-int n, m, t;
-
-struct edge
-{
-    int v, w, s, oi;
-    // opposite vertex, weight, status, index in opposite list
-    // status 0 -> removed
-    // status 1 -> possible
-    // status 2 -> in spanner
-};
+int n, t;
+long long m;
 
 // Timer macros
 #define TIMER_START(name) auto timer_##name##_start = std::chrono::high_resolution_clock::now()
 #define TIMER_END(name) auto timer_##name##_end = std::chrono::high_resolution_clock::now()
-#define TIMER_PRINT(name) cerr << \
-    std::chrono::duration_cast<std::chrono::microseconds>( \
-    timer_##name##_end - timer_##name##_start).count() << endl
 
 
-vector<vector<edge>> adj(0);
+// The graph in CSR form. Vertex u owns entries off[u]..off[u+1]-1, sorted
+// by weight (ties in input order), and every edge is stored from both ends:
+// nbr/wt are the opposite vertex and weight, rev the position of the
+// opposite entry within its row.
+// status 0 -> removed
+// status 1 -> possible
+// status 2 -> in spanner
+vector<long long> off;
+vector<int> nbr, wt, rev;
+vector<unsigned char> status;
+
+inline long long opposite(long long p)
+{
+    return off[nbr[p]] + rev[p];
+}
 
 mt19937_64 RNG(chrono::steady_clock::now().time_since_epoch().count());
 
 const int INF = (int)1e9;
 
+// microseconds spent in phase 1, phase 2 and the whole construction
+long long phase1_us = 0, phase2_us = 0, total_us = 0;
+// microseconds spent loading the graph (parsing and CSR build) and writing the spanner
+long long input_us = 0, output_us = 0;
+
+// Cluster hierarchy of the last build_spanner, kept for the dynamic mode.
+// For level i (0..k-1), level_cluster[i][v] is the center of v's cluster
+// after step 3 of iteration i (-1 once v has left the clustering) and
+// level_join[i][v] the entry v joined that cluster through (-1 if it
+// stayed in its previous one). Level 0 is the singleton clustering.
+vector<vector<int>> level_cluster;
+vector<vector<long long>> level_join;
+
+// Hot-path instrumentation, enabled at runtime with --stats (ts_set_stats in
+// the library). Step timers only run when enabled; the counters are bumped
+// once per vertex or per applied edge, never per scanned adjacency entry.
+bool stats_on = false;
+
+struct step_stats
+{
+    long long us[4], scanned[4];
+    // centers sampled, edges added to / removed from the spanner, vertices dropped (ivd)
+    long long centers, added, removed, dropped;
+};
+
+vector<step_stats> iter_stats;
+step_stats phase2_stats;
+
+// Spanner variant, chosen with --variant (ts_set_variant in the library).
+// "basic" is plain Baswana-Sen; the others run a post-pass after phase 2:
+// "lowdeg" also keeps every edge of a vertex of degree at most low_degree
+// (see retain_low_degree), "prune" drops spanner edges that other spanner
+// edges already cover (see prune_spanner).
+const char* const VARIANTS[] = {"basic", "lowdeg", "prune"};
+int spanner_variant = 0;
+int low_degree = 0;       // 0: ceil(n^(1/k))
+int prune_budget = 0;     // entries scanned per pruning Dijkstra (0: common neighbours only)
+long long post_us = 0;
+step_stats post_stats;
+
+struct step_timer
+{
+    chrono::steady_clock::time_point last;
+    void start()
+    {
+        if(stats_on) last = chrono::steady_clock::now();
+    }
+    // Charges the time since the previous lap (or start) to slot
+    void lap(long long& slot)
+    {
+        if(!stats_on) return;
+        auto now = chrono::steady_clock::now();
+        slot += chrono::duration_cast<chrono::microseconds>(now - last).count();
+        last = now;
+    }
+};
+
+// Phase timings, plus per-iteration step statistics when enabled, as one JSON object
+string stats_json()
+{
+    ostringstream out;
+    out << "{\"phase1\": " << phase1_us << ", \"phase2\": " << phase2_us << ", \"total\": " << total_us
+        << ", \"input\": " << input_us << ", \"output\": " << output_us;
+    if(stats_on)
+    {
+        auto arr = [&](const long long* a) {
+            out << "[" << a[0] << ", " << a[1] << ", " << a[2] << ", " << a[3] << "]";
+        };
+        out << ", \"n\": " << n << ", \"m\": " << m << ", \"t\": " << t << ", \"iterations\": [";
+        for(size_t i=0; i<iter_stats.size(); i++)
+        {
+            auto & st = iter_stats[i];
+            out << (i ? ", " : "") << "{\"step_us\": ";
+            arr(st.us);
+            out << ", \"scanned\": ";
+            arr(st.scanned);
+            out << ", \"centers\": " << st.centers << ", \"added\": " << st.added
+                << ", \"removed\": " << st.removed << ", \"dropped\": " << st.dropped << "}";
+        }
+        out << "], \"phase2_stats\": {\"us\": " << phase2_stats.us[0] << ", \"scanned\": " << phase2_stats.scanned[0]
+            << ", \"added\": " << phase2_stats.added << ", \"removed\": " << phase2_stats.removed << "}";
+    }
+    if(spanner_variant)
+    {
+        out << ", \"variant\": \"" << VARIANTS[spanner_variant] << "\", \"post\": " << post_us
+            << ", \"post_added\": " << post_stats.added << ", \"post_removed\": " << post_stats.removed;
+    }
+    out << "}";
+    return out.str();
+}
+
 bool sample(int n, int k)
 {
     // 1/n^*(1/k) chance
@@ -37,32 +136,341 @@ bool sample(int n, int k)
     return vl<=sp;
 }
 
-signed main()
+// Worker threads for the per-vertex loops; 0 means the OpenMP default
+// (OMP_NUM_THREADS or all cores). Ignored when built without -fopenmp.
+int threads = 0;
+
+int num_threads()
 {
-    // freopen("debug.log", "w", stderr);
-    TIMER_START(tt);
-    ios::sync_with_stdio(0);
-    cin.tie(0);
+#ifdef _OPENMP
+    return threads>0 ? threads : omp_get_max_threads();
+#else
+    return 1;
+#endif
+}
 
-    cin>>n>>m>>t; // take parameters
-    adj.resize(n);
+int thread_id()
+{
+#ifdef _OPENMP
+    return omp_get_thread_num();
+#else
+    return 0;
+#endif
+}
 
-    int k = (t+1)/2;
+// Builds the CSR graph from an edge list (self loops are dropped; edge ids
+// must fit in an int). Rows are filled in input order and then sorted by
+// weight, so the first live entry to a cluster is always the lightest one.
+// Returns, for every edge, its entry in the row of its smaller endpoint
+// (-1 for self loops), used to map the result back to the input edges.
+vector<long long> build_graph(int nv, long long me, const int* eu, const int* ev, const int* ew)
+{
+    n = nv; m = me;
+    off.assign(n+1, 0);
+    for(long long i=0; i<me; i++)
+    {
+        if(eu[i]==ev[i]) continue;
+        off[eu[i]+1]++;
+        off[ev[i]+1]++;
+    }
+    for(int i=0; i<n; i++) off[i+1] += off[i];
+    long long len = off[n];
+    nbr.assign(len, 0);
+    wt.assign(len, 0);
+    rev.assign(len, 0);
+    status.assign(len, 1);
+
+    vector<int> id(len);
+    {
+        vector<long long> fill(off.begin(), off.end()-1);
+        for(long long i=0; i<me; i++)
+        {
+            int u = eu[i], v = ev[i];
+            if(u==v) continue;
+            long long pu = fill[u]++, pv = fill[v]++;
+            nbr[pu] = v; wt[pu] = ew[i]; id[pu] = i;
+            nbr[pv] = u; wt[pv] = ew[i]; id[pv] = i;
+        }
+    }
+
+    #pragma omp parallel num_threads(num_threads())
+    {
+        vector<array<int, 3>> row;
+        #pragma omp for schedule(dynamic, 256)
+        for(int u=0; u<n; u++)
+        {
+            row.clear();
+            for(long long p=off[u]; p<off[u+1]; p++) row.push_back({wt[p], id[p], nbr[p]});
+            sort(row.begin(), row.end());
+            long long p = off[u];
+            for(auto & r: row)
+            {
+                wt[p] = r[0]; id[p] = r[1]; nbr[p] = r[2];
+                p++;
+            }
+        }
+    }
+
+    // Pair up the two entries of every edge through its id
+    vector<long long> where(me, -1);
+    #pragma omp parallel for schedule(dynamic, 256) num_threads(num_threads())
+    for(int u=0; u<n; u++)
+    {
+        for(long long p=off[u]; p<off[u+1]; p++)
+        {
+            if(u<nbr[p]) where[id[p]] = p;
+        }
+    }
+    #pragma omp parallel for schedule(dynamic, 256) num_threads(num_threads())
+    for(int u=0; u<n; u++)
+    {
+        for(long long p=off[u]; p<off[u+1]; p++)
+        {
+            if(u<nbr[p]) continue;
+            long long q = where[id[p]];
+            rev[p] = q - off[nbr[p]];
+            rev[q] = p - off[u];
+        }
+    }
+    return where;
+}
 
-    for(int i=0; i<m; i++)
+// Entries collected by each thread
+typedef vector<vector<long long>> edge_buffers;
+
+// Marks the collected edges as in the spanner, then removes the collected
+// edges that did not make it. Additions only ever set status 2 and removals
+// skip status 2, so the result does not depend on the order of the entries:
+// any thread count and schedule gives the same spanner as the serial run.
+void apply_changes(const edge_buffers& to_add, const edge_buffers& to_rem, step_stats& st)
+{
+    for(auto & buf: to_add)
+    {
+        for(auto p: buf)
+        {
+            st.added += status[p]!=2;
+            status[p] = 2;
+            status[opposite(p)] = 2;
+        }
+    }
+    for(auto & buf: to_rem)
+    {
+        for(auto p: buf)
+        {
+            if(status[p]==2) continue;
+            st.removed += status[p]!=0;
+            status[p] = 0;
+            status[opposite(p)] = 0;
+        }
+    }
+}
+
+// Per-thread scratch indexed by cluster slot (center_idx), allocated once per
+// build. Only the slots a vertex touched are reset afterwards, so handling a
+// vertex costs O(its degree) rather than O(number of clusters).
+struct cluster_scratch
+{
+    vector<long long> min_ed;  // lightest live edge (entry) to each cluster
+    vector<char> tr;           // clusters whose edges are all removed
+    vector<int> touched;
+
+    void init(int size)
+    {
+        min_ed.assign(size, -1);
+        tr.assign(size, 0);
+        touched.clear();
+    }
+
+    // Offers entry p as the lightest edge to cluster slot ci. Rows are
+    // scanned in weight order, so the first offer per cluster wins.
+    void offer(int ci, long long p)
+    {
+        if(min_ed[ci]==-1)
+        {
+            min_ed[ci] = p;
+            touched.push_back(ci);
+        }
+    }
+
+    void reset()
+    {
+        for(int ci: touched)
+        {
+            min_ed[ci] = -1;
+            tr[ci] = 0;
+        }
+        touched.clear();
+    }
+};
+
+// The low-degree retention heuristic: every edge of a vertex of degree at
+// most low_degree joins the spanner, so such vertices keep exact distances
+// to their neighbours. The default threshold n^(1/k) adds at most
+// n^(1+1/k) edges, within the size bound of the construction itself.
+void retain_low_degree(int k)
+{
+    long long limit = low_degree>0 ? low_degree : (long long)ceil(pow(n, 1.0/k));
+    int nt = num_threads();
+    edge_buffers to_add(nt), to_rem(nt);
+    #pragma omp parallel for schedule(dynamic, 256) num_threads(nt)
+    for(int u=0; u<n; u++)
+    {
+        if(off[u+1]-off[u]>limit) continue;
+        int tid = thread_id();
+        for(long long p=off[u]; p<off[u+1]; p++) to_add[tid].push_back(p);
+    }
+    apply_changes(to_add, to_rem, post_stats);
+}
+
+// Per-thread state of the pruning searches
+struct prune_search
+{
+    vector<long long> dist;
+    vector<int> touched;
+    priority_queue<pair<long long, int>, vector<pair<long long, int>>, greater<pair<long long, int>>> pq;
+
+    void init(int nv) { dist.assign(nv, LLONG_MAX); }
+
+    void reset()
+    {
+        for(int x: touched) dist[x] = LLONG_MAX;
+        touched.clear();
+        while(!pq.empty()) pq.pop();
+    }
+};
+
+// Drops every spanner edge (u, v, w) that another spanner path of weight at
+// most w and at least two edges already joins. Only positive-weight edges
+// are dropped or used in such paths. Breaking ties towards paths of more
+// edges, no dropped edge lies on a shortest path of the spanner, so all
+// spanner distances (and with them the stretch) are unchanged, and every
+// edge can be checked against the spanner from phase 2 in parallel and
+// dropped at once, the same for any thread count. Dropping edges merely
+// covered within t*w would compound the stretch along chains of drops.
+// Each check first looks for a common neighbour of u and v; with
+// prune_budget > 0 it then runs a Dijkstra from u cut at distance w and
+// after that many scanned entries (the edge stays if it runs out).
+void prune_spanner()
+{
+    // The spanner as its own weight-sorted CSR: sent[q] is the graph entry of spanner entry q
+    int nt = num_threads();
+    vector<long long> soff(n+1, 0);
+    #pragma omp parallel for schedule(dynamic, 256) num_threads(nt)
+    for(int u=0; u<n; u++)
+    {
+        long long cnt = 0;
+        for(long long p=off[u]; p<off[u+1]; p++) cnt += status[p]==2 && wt[p]>0;
+        soff[u+1] = cnt;
+    }
+    for(int u=0; u<n; u++) soff[u+1] += soff[u];
+    vector<long long> sent(soff[n]);
+    #pragma omp parallel for schedule(dynamic, 256) num_threads(nt)
+    for(int u=0; u<n; u++)
+    {
+        long long q = soff[u];
+        for(long long p=off[u]; p<off[u+1]; p++)
+        {
+            if(status[p]==2 && wt[p]>0) sent[q++] = p;
+        }
+    }
+
+    vector<prune_search> scratch(nt);
+    for(auto & sc: scratch) sc.init(n);
+    edge_buffers to_rem(nt);
+    long long scanned = 0;
+    #pragma omp parallel for schedule(dynamic, 64) reduction(+:scanned) num_threads(nt)
+    for(int u=0; u<n; u++)
+    {
+        auto & sc = scratch[thread_id()];
+        auto & dist = sc.dist;
+        for(long long qp=soff[u]; qp<soff[u+1]; qp++)
+        {
+            // Each edge once, from its lower endpoint
+            long long p = sent[qp];
+            int v = nbr[p];
+            if(v<u) continue;
+            long long w = wt[p];
+            bool covered = false;
+
+            // Paths u-x-v: mark the lighter neighbours of v, then look for one next to u
+            for(long long q=soff[v]; q<soff[v+1] && wt[sent[q]]<w; q++)
+            {
+                int x = nbr[sent[q]];
+                if(dist[x]!=LLONG_MAX) continue;
+                dist[x] = wt[sent[q]];
+                sc.touched.push_back(x);
+            }
+            for(long long q=soff[u]; q<soff[u+1] && wt[sent[q]]<w && !covered; q++)
+            {
+                int x = nbr[sent[q]];
+                scanned++;
+                covered = x==v || (dist[x]!=LLONG_MAX && wt[sent[q]]+dist[x]<=w);
+            }
+            sc.reset();
+
+            // Longer paths: Dijkstra from u, cut at distance w
+            if(!covered && prune_budget>0)
+            {
+                long long budget = prune_budget;
+                dist[u] = 0;
+                sc.touched.push_back(u);
+                sc.pq.push({0, u});
+                while(!sc.pq.empty() && budget>0)
+                {
+                    auto [d, x] = sc.pq.top();
+                    sc.pq.pop();
+                    if(d>dist[x]) continue;
+                    if(x==v)
+                    {
+                        covered = true;
+                        break;
+                    }
+                    for(long long q=soff[x]; q<soff[x+1]; q++)
+                    {
+                        long long e = sent[q];
+                        long long nd = d + wt[e];
+                        // Rows are weight-sorted, so the rest of the row is too heavy
+                        if(nd>w) break;
+                        budget--;
+                        int y = nbr[e];
+                        // A parallel edge of the same weight is not a cover
+                        if(nd>=dist[y] || (x==u && y==v && nd==w)) continue;
+                        if(dist[y]==LLONG_MAX) sc.touched.push_back(y);
+                        dist[y] = nd;
+                        sc.pq.push({nd, y});
+                    }
+                }
+                scanned += prune_budget - budget;
+                sc.reset();
+            }
+            if(covered) to_rem[thread_id()].push_back(p);
+        }
+    }
+    post_stats.scanned[0] = scanned;
+    for(auto & buf: to_rem)
     {
-        int u, v, w;
-        cin>>u>>v>>w;
-        edge eu, ev;
-        eu.w = ev.w = w;
-        eu.s = ev.s = 1;
-        eu.oi = adj[v].size();
-        ev.oi = adj[u].size();
-        eu.v = v;
-        ev.v = u;
-        adj[v].push_back(ev);
-        adj[u].push_back(eu);
+        for(auto p: buf)
+        {
+            status[p] = 0;
+            status[opposite(p)] = 0;
+            post_stats.removed++;
+        }
     }
+}
+
+// Runs Baswana-Sen on the CSR graph; afterwards entries with status 2 form the spanner
+void build_spanner()
+{
+    int k = (t+1)/2;
+    // Every entry starts as possible, so a loaded graph can be rebuilt for
+    // another t or seed without touching the CSR arrays
+    fill(status.begin(), status.end(), 1);
+    iter_stats.clear();
+    phase2_stats = step_stats();
+    step_timer timer;
+    int nt = num_threads();
+    vector<cluster_scratch> scratch(nt);
+    for(auto & sc: scratch) sc.init(n);
 
     TIMER_START(total);
 
@@ -76,11 +484,17 @@ signed main()
     {
         centers.push_back(i);
     }
+    level_cluster.assign(1, cluster);
+    level_join.assign(1, vector<long long>(n, -1));
 
     // phase 1
     TIMER_START(phase1);
     for(int i=1; i<k; i++)
     {
+        iter_stats.push_back(step_stats());
+        auto & st = iter_stats.back();
+        timer.start();
+
         // step 1
         // sampling
         fill(is_center.begin(), is_center.end(), 0);
@@ -94,6 +508,9 @@ signed main()
             }
         }
         if(!cc) is_center[centers[0]] = 1;
+        st.centers = max(cc, 1);
+        st.scanned[0] = centers.size();
+        timer.lap(st.us[0]);
         // cerr<<cc<<"\n";
         // cerr<<"centers: ";
         // for(int i=0; i<n; i++)
@@ -103,24 +520,28 @@ signed main()
         // cerr<<"\n";
 
         // step 2
-        vector<int> min_idx(n, -1); 
+        // rows are weight-sorted, so the first live entry into a sampled
+        // cluster is the lightest one
+        vector<long long> min_idx(n, -1); 
+        long long scanned = 0;
+        #pragma omp parallel for schedule(dynamic, 64) reduction(+:scanned) num_threads(nt)
         for(int j=0; j<n; j++)
         {
             if(!ivd[j]) continue;
             if(is_center[cluster[j]]) continue;
-            int mw = INF;
-            for(int k=0; k<adj[j].size(); k++)
+            long long p = off[j];
+            for(; p<off[j+1]; p++)
             {
-                auto& e = adj[j][k];
-                if(!e.s) continue;
-                if(!is_center[cluster[e.v]]) continue;
-                if(e.w<mw)
-                {
-                    mw = e.w;
-                    min_idx[j] = k;
-                }
+                if(!status[p]) continue;
+                if(!is_center[cluster[nbr[p]]]) continue;
+                min_idx[j] = p;
+                break;
             }
+            scanned += min(p+1, off[j+1]) - off[j];
         }
+        st.scanned[1] = scanned;
+
+        timer.lap(st.us[1]);
 
         //step 3
         vector<int> center_idx(n, -1);
@@ -130,124 +551,126 @@ signed main()
             center_idx[j] = cidx;
             cidx++;
         }
-        vector<pair<int, int>> to_add(0);
-        vector<pair<int, int>> to_rem(0);
-        vector<pair<int, int>> cluster_change(0);
+        // Each thread collects into its own buffers; see apply_changes
+        edge_buffers to_add(nt), to_rem(nt);
+        vector<vector<pair<int, int>>> cluster_change(nt);
+        long long dropped = 0;
+        scanned = 0;
+        #pragma omp parallel for schedule(dynamic, 64) reduction(+:scanned, dropped) num_threads(nt)
         for(int j=0; j<n; j++)
         {
             if(!ivd[j]) continue;
             if(is_center[cluster[j]]) continue;
             if(min_idx[j]==-1)
             {
-                vector<int> min_ed(cidx, -1);
-                for(int k=0; k<adj[j].size(); k++)
+                scanned += off[j+1] - off[j];
+                dropped++;
+                int tid = thread_id();
+                auto & sc = scratch[tid];
+                for(long long p=off[j]; p<off[j+1]; p++)
                 {
-                    auto & e = adj[j][k];
-                    if(e.s!=1) continue;
-                    to_rem.push_back({j, k});
-                    if(center_idx[cluster[e.v]]<0) continue;
-                    int ci = center_idx[cluster[e.v]];
-                    if(min_ed[ci]==-1)
-                    {
-                        min_ed[ci] = k;
-                    }
-                    else if(e.w<adj[j][min_ed[ci]].w)
-                    {
-                        min_ed[ci] = k;
-                    }
+                    if(status[p]!=1) continue;
+                    to_rem[tid].push_back(p);
+                    if(center_idx[cluster[nbr[p]]]<0) continue;
+                    sc.offer(center_idx[cluster[nbr[p]]], p);
                 }
                 ivd[j] = 0;
-                for(int k=0; k<cidx; k++)
+                for(int ci: sc.touched)
                 {
-                    if(min_ed[k]<0) continue;
-                    to_add.push_back({j, min_ed[k]});
+                    to_add[tid].push_back(sc.min_ed[ci]);
                 }
+                sc.reset();
             }
         }
+        #pragma omp parallel for schedule(dynamic, 64) reduction(+:scanned) num_threads(nt)
         for(int j=0; j<n; j++)
         {
             if(!ivd[j]) continue;
             if(is_center[cluster[j]]) continue;
             if(min_idx[j]!=-1)
             {
-                int ncj = cluster[adj[j][min_idx[j]].v];
-                vector<int> min_ed(cidx, -1);
-                vector<int> tr(cidx, 0);
-                for(int k=0; k<adj[j].size(); k++)
+                scanned += 2*(off[j+1] - off[j]);
+                int tid = thread_id();
+                auto & sc = scratch[tid];
+                int ncj = cluster[nbr[min_idx[j]]];
+                int cw = wt[min_idx[j]];
+                for(long long p=off[j]; p<off[j+1]; p++)
                 {
-                    auto & e = adj[j][k];
-                    if(e.s!=1) continue;
+                    if(status[p]!=1) continue;
                     // if(!is_center[cluster[e.v]]) to_rem.push_back({j, k});
-                    if(cluster[e.v]==ncj) to_rem.push_back({j, k});
-                    if(center_idx[cluster[e.v]]<0) continue;
-                    int ci = center_idx[cluster[e.v]];
-                    if(min_ed[ci]==-1)
+                    if(cluster[nbr[p]]==ncj) to_rem[tid].push_back(p);
+                    if(center_idx[cluster[nbr[p]]]<0) continue;
+                    int ci = center_idx[cluster[nbr[p]]];
+                    sc.offer(ci, p);
+                    if(wt[p]<cw && ci!=center_idx[ncj])
                     {
-                        min_ed[ci] = k;
-                    }
-                    else if(e.w<adj[j][min_ed[ci]].w)
-                    {
-                        min_ed[ci] = k;
-                    }
-                    if(e.w<adj[j][min_idx[j]].w && ci!=center_idx[ncj])
-                    {
-                        tr[ci] = 1;
+                        sc.tr[ci] = 1;
                     }
                 }
-                cluster_change.push_back({j, ncj});
-                int cw = adj[j][min_idx[j]].w;
-                for(int k=0; k<cidx; k++)
+                cluster_change[tid].push_back({j, ncj});
+                for(int ci: sc.touched)
                 {
                     // if(is_center[centers[k]]) continue;
-                    if(min_ed[k]<0) continue;
-                    if(adj[j][min_ed[k]].w>=cw) continue;
-                    to_add.push_back({j, min_ed[k]});
+                    if(wt[sc.min_ed[ci]]>=cw) continue;
+                    to_add[tid].push_back(sc.min_ed[ci]);
                 }
-                to_add.push_back({j, min_idx[j]});
-                for(int k=0; k<adj[j].size(); k++)
+                to_add[tid].push_back(min_idx[j]);
+                for(long long p=off[j]; p<off[j+1]; p++)
                 {
-                    auto & e = adj[j][k];
-                    if(e.s!=1) continue;
-                    int ci = center_idx[cluster[e.v]];
-                    if(tr[ci]) to_rem.push_back({j, k});
+                    if(status[p]!=1) continue;
+                    // Live edges only lead to vertices still in some cluster
+                    int ci = center_idx[cluster[nbr[p]]];
+                    if(ci>=0 && sc.tr[ci]) to_rem[tid].push_back(p);
                 }
+                sc.reset();
             }
         }
-        for(auto p: to_add)
+        st.scanned[2] = scanned;
+        st.dropped = dropped;
+        apply_changes(to_add, to_rem, st);
+        level_join.emplace_back(n, -1);
+        for(auto & buf: cluster_change)
         {
-            auto & e = adj[p.first][p.second];
-            e.s = 2;
-            adj[e.v][e.oi].s = 2;
-        }
-        for(auto p: to_rem)
-        {
-            auto & e = adj[p.first][p.second];
-            if(e.s==2) continue;
-            e.s = 0;
-            adj[e.v][e.oi].s = 0;
+            for(auto p: buf)
+            {
+                cluster[p.first] = p.second;
+                level_join.back()[p.first] = min_idx[p.first];
+            }
         }
-        for(auto p: cluster_change)
+        level_cluster.emplace_back(n, -1);
+        for(int j=0; j<n; j++)
         {
-            cluster[p.first] = p.second;
+            if(ivd[j] && is_center[cluster[j]]) level_cluster.back()[j] = cluster[j];
         }
-        
+        timer.lap(st.us[2]);
+
 
         //step 4
+        long long removed = 0;
+        scanned = 0;
+        // Only j's own entries are written, each side of an edge by its endpoint
+        #pragma omp parallel for schedule(dynamic, 64) reduction(+:scanned, removed) num_threads(nt)
         for(int j=0; j<n; j++)
         {
             if(!is_center[cluster[j]]) continue;
-            for(auto& e: adj[j])
+            scanned += off[j+1] - off[j];
+            for(long long p=off[j]; p<off[j+1]; p++)
             {
-                if(cluster[e.v]!=cluster[j]) continue;
-                if(e.s<2) e.s = 0;
+                if(cluster[nbr[p]]!=cluster[j]) continue;
+                // Both sides are cleared; count each edge from its lower end
+                removed += status[p]==1 && j<nbr[p];
+                if(status[p]<2) status[p] = 0;
             }
         }
+        st.scanned[3] = scanned;
+        st.removed += removed;
 
         centers.clear();
         for(int j=0; j<n; j++)
         {
             if(is_center[j]) centers.push_back(j);
         }
+        timer.lap(st.us[3]);
     }
 
     TIMER_END(phase1);
@@ -255,19 +678,19 @@ signed main()
     // cerr<<"After ph1:\n";
     // for(int i=0; i<n; i++)
     // {
-    //     for(auto j: adj[i])
+    //     for(long long p=off[i]; p<off[i+1]; p++)
     //     {
-    //         if(j.s==2)
+    //         if(status[p]==2)
     //         {
-    //             cerr<<i<<" "<<j.v<<" "<<j.w<<"\n";
+    //             cerr<<i<<" "<<nbr[p]<<" "<<wt[p]<<"\n";
     //         }
     //     }
     // }
 
     TIMER_START(phase2);
+    timer.start();
     //phase 2
-    vector<pair<int, int>> to_add(0);
-    vector<pair<int, int>> to_rem(0);
+    edge_buffers to_add(nt), to_rem(nt);
 
     vector<int> center_idx(n, -1);
     int cidx = 0;
@@ -276,77 +699,1782 @@ signed main()
         center_idx[i] = cidx;
         cidx++;
     }
+    long long scanned = 0;
+    #pragma omp parallel for schedule(dynamic, 64) reduction(+:scanned) num_threads(nt)
     for(int i=0; i<n; i++)
     {
         if(!ivd[i]) continue;
-        vector<int> min_ed(cidx, -1);
-        for(int j=0; j<adj[i].size(); j++)
-        {
-            auto & e = adj[i][j];
-            if(e.s!=1) continue;
-            if(center_idx[cluster[e.v]]<0) continue;
-            to_rem.push_back({i, j});
-            int ci = center_idx[cluster[e.v]];
-            if(min_ed[ci]==-1)
-            {
-                min_ed[ci] = j;
-            }
-            else
-            {
-                if(e.w<adj[i][min_ed[ci]].w) min_ed[ci] = j;
-            }
+        scanned += off[i+1] - off[i];
+        int tid = thread_id();
+        auto & sc = scratch[tid];
+        for(long long p=off[i]; p<off[i+1]; p++)
+        {
+            if(status[p]!=1) continue;
+            if(center_idx[cluster[nbr[p]]]<0) continue;
+            to_rem[tid].push_back(p);
+            sc.offer(center_idx[cluster[nbr[p]]], p);
         }
-        for(int j=0; j<cidx; j++)
+        for(int ci: sc.touched)
         {
-            if(min_ed[j]<0) continue;
-            to_add.push_back({i, min_ed[j]});
+            to_add[tid].push_back(sc.min_ed[ci]);
         }
+        sc.reset();
+    }
+    phase2_stats.scanned[0] = scanned;
+    apply_changes(to_add, to_rem, phase2_stats);
+    timer.lap(phase2_stats.us[0]);
+    TIMER_END(phase2);
+
+    // Post-pass of the chosen variant
+    post_stats = step_stats();
+    TIMER_START(post);
+    if(spanner_variant==1) retain_low_degree(k);
+    else if(spanner_variant==2) prune_spanner();
+    TIMER_END(post);
+    TIMER_END(total);
+
+    phase1_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_phase1_end - timer_phase1_start).count();
+    phase2_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_phase2_end - timer_phase2_start).count();
+    total_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_total_end - timer_total_start).count();
+    post_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_post_end - timer_post_start).count();
+}
+
+// C interface used by tspanner.py when built with -DTSPANNER_LIB -shared.
+// The arrays are read in place; mask[i] is set to 1 when edge i is kept and
+// timings (if not null) receives phase1, phase2 and total microseconds.
+// Returns the number of spanner edges, or -1 if an endpoint is out of range.
+extern "C" long long ts_spanner_edges(int nv, long long me, const int* eu, const int* ev, const int* ew,
+                                      int tv, unsigned long long seed, unsigned char* mask, long long* timings)
+{
+    for(long long i=0; i<me; i++)
+    {
+        if(eu[i]<0 || eu[i]>=nv || ev[i]<0 || ev[i]>=nv) return -1;
     }
+    t = tv;
+    TIMER_START(input);
+    vector<long long> where = build_graph(nv, me, eu, ev, ew);
+    TIMER_END(input);
+    input_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_input_end - timer_input_start).count();
+    RNG.seed(seed);
+    build_spanner();
 
-    for(auto p: to_add)
+    long long cnt = 0;
+    for(long long i=0; i<me; i++)
     {
-        auto & e = adj[p.first][p.second];
-        e.s = 2;
-        adj[e.v][e.oi].s = 2;
+        mask[i] = where[i]>=0 && status[where[i]]==2;
+        cnt += mask[i];
     }
-    for(auto p: to_rem)
+    if(timings)
     {
-        auto & e = adj[p.first][p.second];
-        if(e.s==2) continue;
-        e.s = 0;
-        adj[e.v][e.oi].s = 0;
+        timings[0] = phase1_us;
+        timings[1] = phase2_us;
+        timings[2] = total_us;
     }
-    TIMER_END(phase2);
+    return cnt;
+}
 
-    vector<pair<pair<int, int>, int>> fin(0);
-    for(int i=0; i<n; i++)
+// Same as ts_spanner_edges for a CSR graph. Only entries with column > row
+// are read as edges, so symmetric and upper-triangular CSR both work; mask
+// is indexed by CSR entry and left 0 on the other entries.
+extern "C" long long ts_spanner_csr(int nv, const long long* indptr, const int* indices, const int* weights,
+                                    int tv, unsigned long long seed, unsigned char* mask, long long* timings)
+{
+    for(long long p=0; p<indptr[nv]; p++)
     {
-        for(auto & e: adj[i])
+        if(indices[p]<0 || indices[p]>=nv) return -1;
+    }
+    t = tv;
+    vector<int> eu, ev, ew;
+    vector<long long> src;
+    for(int i=0; i<nv; i++)
+    {
+        for(long long p=indptr[i]; p<indptr[i+1]; p++)
         {
-            if(e.v<i) continue;
-            if(e.s<2) continue;
-            // cout<<i<<" "<<e.v<<" "<<e.w<<"\n";
-            fin.push_back({{i, e.v}, e.w});
+            if(indices[p]<=i) continue;
+            eu.push_back(i);
+            ev.push_back(indices[p]);
+            ew.push_back(weights[p]);
+            src.push_back(p);
         }
     }
-    TIMER_END(total);
-    // cerr <<" TIMERS: " << timer_phase1_start.time_since_epoch().count() << " " << timer_phase1_end.time_since_epoch().count() << " " << timer_phase2_start.time_since_epoch().count() << " " << timer_phase2_end.time_since_epoch().count() << " " << timer_total_start.time_since_epoch().count() << " " << timer_total_end.time_since_epoch().count() << "\n";
-    // Calculate time differences in milliseconds
-    auto phase1_ms = std::chrono::duration_cast<std::chrono::microseconds>(timer_phase1_end - timer_phase1_start).count();
-    auto phase2_ms = std::chrono::duration_cast<std::chrono::microseconds>(timer_phase2_end - timer_phase2_start).count();
-    auto total_ms = std::chrono::duration_cast<std::chrono::microseconds>(timer_total_end - timer_total_start).count();
-
-    // Print time taken for each phase
-    cerr << phase1_ms << endl;
-    cerr << phase2_ms << endl;
-    cerr << total_ms << endl;
+    TIMER_START(input);
+    vector<long long> where = build_graph(nv, eu.size(), eu.data(), ev.data(), ew.data());
+    TIMER_END(input);
+    input_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_input_end - timer_input_start).count();
+    RNG.seed(seed);
+    build_spanner();
 
-    cout<<n<<" "<<fin.size()<<"\n";
-    for(auto e: fin)
+    long long cnt = 0;
+    for(long long p=0; p<indptr[nv]; p++) mask[p] = 0;
+    for(size_t i=0; i<src.size(); i++)
     {
-        cout<<e.first.first<<" "<<e.first.second<<" "<<e.second<<"\n";
+        mask[src[i]] = status[where[i]]==2;
+        cnt += mask[src[i]];
     }
-    TIMER_END(tt);
-    TIMER_PRINT(tt);
+    if(timings)
+    {
+        timings[0] = phase1_us;
+        timings[1] = phase2_us;
+        timings[2] = total_us;
+    }
+    return cnt;
+}
+
+// Turns the step instrumentation of later ts_spanner_* calls on or off
+extern "C" void ts_set_stats(int on)
+{
+    stats_on = on;
+}
+
+// Sets the worker thread count of later ts_spanner_* calls (0: OpenMP default)
+extern "C" void ts_set_threads(int nt)
+{
+    threads = nt;
+}
+
+// Sets the variant of later ts_spanner_* calls (an index into VARIANTS) and
+// its parameters, 0 keeping their defaults. Returns -1 for an unknown variant.
+extern "C" int ts_set_variant(int v, int low_deg, int budget)
+{
+    if(v<0 || v>=(int)size(VARIANTS)) return -1;
+    spanner_variant = v;
+    low_degree = low_deg;
+    prune_budget = budget;
     return 0;
-}
\ No newline at end of file
+}
+
+// Copies the JSON statistics of the last ts_spanner_* call (see stats_json)
+// into buf, NUL-terminated and truncated to cap bytes. Returns the full
+// length, so callers can retry with a larger buffer.
+extern "C" long long ts_last_stats(char* buf, long long cap)
+{
+    string js = stats_json();
+    if(cap>0)
+    {
+        long long len = min((long long)js.size(), cap-1);
+        memcpy(buf, js.data(), len);
+        buf[len] = 0;
+    }
+    return js.size();
+}
+
+// Single-source shortest paths on a CSR graph, used by stretch.py to
+// profile distances without materialising them in Python. dist[x] gets the
+// distance from source, or -1 if x is unreachable.
+extern "C" void ts_dijkstra(int nv, const long long* indptr, const int* indices, const int* weights,
+                            int source, long long* dist)
+{
+    for(int i=0; i<nv; i++) dist[i] = -1;
+    priority_queue<pair<long long, int>, vector<pair<long long, int>>, greater<pair<long long, int>>> pq;
+    dist[source] = 0;
+    pq.push({0, source});
+    while(!pq.empty())
+    {
+        auto [d, x] = pq.top();
+        pq.pop();
+        if(d>dist[x]) continue;
+        for(long long p=indptr[x]; p<indptr[x+1]; p++)
+        {
+            int y = indices[p];
+            long long nd = d + weights[p];
+            if(dist[y]>=0 && dist[y]<=nd) continue;
+            dist[y] = nd;
+            pq.push({nd, y});
+        }
+    }
+}
+
+// Open-addressing hash map from non-negative 64-bit keys: two flat arrays,
+// no per-entry allocation, so the oracle's bunches and the streaming state
+// stay a few words per entry
+template<class V>
+struct flat_map
+{
+    vector<long long> keys;  // -1 marks an empty slot
+    vector<V> vals;
+    size_t used = 0;
+
+    size_t slot(long long key) const
+    {
+        size_t mask = keys.size()-1, i = ((unsigned long long)key*0x9E3779B97F4A7C15ull)>>17 & mask;
+        while(keys[i]!=-1 && keys[i]!=key) i = (i+1) & mask;
+        return i;
+    }
+
+    const V* find(long long key) const
+    {
+        if(keys.empty()) return nullptr;
+        size_t i = slot(key);
+        return keys[i]==key ? &vals[i] : nullptr;
+    }
+
+    // Value of key, default-constructed on first use
+    V& operator[](long long key)
+    {
+        if(2*(used+1)>keys.size()) grow();
+        size_t i = slot(key);
+        if(keys[i]!=key)
+        {
+            keys[i] = key;
+            vals[i] = V();
+            used++;
+        }
+        return vals[i];
+    }
+
+    void grow()
+    {
+        vector<long long> old_keys(max<size_t>(16, 2*keys.size()), -1);
+        vector<V> old_vals(old_keys.size());
+        old_keys.swap(keys);
+        old_vals.swap(vals);
+        for(size_t i=0; i<old_keys.size(); i++)
+        {
+            if(old_keys[i]==-1) continue;
+            size_t j = slot(old_keys[i]);
+            keys[j] = old_keys[i];
+            vals[j] = old_vals[i];
+        }
+    }
+
+    template<class F>
+    void for_each(F f)
+    {
+        for(size_t i=0; i<keys.size(); i++)
+        {
+            if(keys[i]!=-1) f(keys[i], vals[i]);
+        }
+    }
+};
+
+// Thorup-Zwick distance oracle on the sampling hierarchy of build_spanner.
+// A_0 = V and A_i (0 < i < k) are the centers sampled in iteration i, which
+// are nested (a center is the center of its own cluster, so they can be read
+// off level_cluster); A_k is empty. For every level i > 0 a vertex v keeps
+// its pivot p_i(v), a nearest vertex of A_i, and d(A_i, v); its bunch B(v)
+// holds every w of A_i \ A_{i+1} with d(w, v) < d(A_{i+1}, v), with d(w, v).
+// Distances are exact in the input graph, so a query, which walks up at most
+// k levels, estimates d(u, v) within a factor 2k-1 (Thorup and Zwick 2005).
+//
+// Oracle file: a 32 byte header laid out like graph_header (magic "TSPO",
+// version, k, n, bunch entries, t) followed by int32 pivot[(k-1)n], int64
+// pdist[(k-1)n], int64 boff[n+1], int32 bnode[entries], int64
+// bdist[entries]. The bunch index is rebuilt on load.
+const char ORACLE_MAGIC[4] = {'T', 'S', 'P', 'O'};
+const int ORACLE_VERSION = 1;
+
+struct distance_oracle
+{
+    int n = 0, k = 1, t = 1;
+    vector<int> pivot;        // pivot[(i-1)*n + v]; -1 if v's component misses A_i
+    vector<long long> pdist;  // pdist[(i-1)*n + v] = d(A_i, v)
+    vector<long long> boff;   // bunch of v: entries boff[v]..boff[v+1]-1, by vertex
+    vector<int> bnode;
+    vector<long long> bdist;
+    flat_map<long long> index;  // v*n + w -> d(w, v) for every w in B(v)
+
+    long long entries() const { return bnode.size(); }
+
+    void build_index()
+    {
+        index = flat_map<long long>();
+        for(int v=0; v<n; v++)
+        {
+            for(long long p=boff[v]; p<boff[v+1]; p++) index[(long long)v*n + bnode[p]] = bdist[p];
+        }
+    }
+
+    // Estimate of d(u, v), at most 2k-1 times the distance; -1 if disconnected
+    long long query(int u, int v) const
+    {
+        if(u==v) return 0;
+        int w = u;
+        long long du = 0;
+        const long long* dv;
+        for(int i=0; !(dv = index.find((long long)v*n + w)); )
+        {
+            if(++i==k) return -1;
+            swap(u, v);
+            w = pivot[(long long)(i-1)*n + u];
+            if(w<0) return -1;
+            du = pdist[(long long)(i-1)*n + u];
+        }
+        return du + *dv;
+    }
+
+    bool write(const string& path) const
+    {
+        FILE* f = fopen(path.c_str(), "wb");
+        if(!f) return false;
+        graph_header h;
+        memcpy(h.magic, ORACLE_MAGIC, 4);
+        h.version = ORACLE_VERSION;
+        h.layout = k;
+        h.n = n;
+        h.m = entries();
+        h.t = t;
+        h.reserved = 0;
+        bool ok = fwrite(&h, sizeof(h), 1, f)==1
+            && fwrite(pivot.data(), sizeof(int), pivot.size(), f)==pivot.size()
+            && fwrite(pdist.data(), sizeof(long long), pdist.size(), f)==pdist.size()
+            && fwrite(boff.data(), sizeof(long long), boff.size(), f)==boff.size()
+            && fwrite(bnode.data(), sizeof(int), bnode.size(), f)==bnode.size()
+            && fwrite(bdist.data(), sizeof(long long), bdist.size(), f)==bdist.size();
+        return fclose(f)==0 && ok;
+    }
+
+    bool read(const string& path)
+    {
+        FILE* f = fopen(path.c_str(), "rb");
+        if(!f) return false;
+        graph_header h;
+        bool ok = fread(&h, sizeof(h), 1, f)==1 && memcmp(h.magic, ORACLE_MAGIC, 4)==0
+            && h.version==ORACLE_VERSION && h.layout>=1 && h.n>=0 && h.m>=0;
+        if(ok)
+        {
+            n = h.n;
+            k = h.layout;
+            t = h.t;
+            pivot.resize((size_t)(k-1)*n);
+            pdist.resize((size_t)(k-1)*n);
+            boff.resize(n+1);
+            bnode.resize(h.m);
+            bdist.resize(h.m);
+            ok = fread(pivot.data(), sizeof(int), pivot.size(), f)==pivot.size()
+                && fread(pdist.data(), sizeof(long long), pdist.size(), f)==pdist.size()
+                && fread(boff.data(), sizeof(long long), boff.size(), f)==boff.size()
+                && fread(bnode.data(), sizeof(int), bnode.size(), f)==bnode.size()
+                && fread(bdist.data(), sizeof(long long), bdist.size(), f)==bdist.size()
+                && boff[0]==0 && boff[n]==h.m;
+        }
+        fclose(f);
+        if(ok) build_index();
+        return ok;
+    }
+};
+
+// Per-thread Dijkstra scratch over the CSR graph; only touched vertices are reset
+struct oracle_search
+{
+    vector<long long> dist;
+    vector<int> touched;
+    priority_queue<pair<long long, int>, vector<pair<long long, int>>, greater<pair<long long, int>>> pq;
+
+    void init(int nv) { dist.assign(nv, LLONG_MAX); }
+
+    // Dijkstra from w that only settles vertices y with d(w, y) < limit[y]
+    // (no limit if null), calling f(y, d) for each
+    template<class F>
+    void cluster(int w, const long long* limit, F f)
+    {
+        dist[w] = 0;
+        touched.push_back(w);
+        pq.push({0, w});
+        while(!pq.empty())
+        {
+            auto [d, x] = pq.top();
+            pq.pop();
+            if(d>dist[x]) continue;
+            f(x, d);
+            for(long long p=off[x]; p<off[x+1]; p++)
+            {
+                int y = nbr[p];
+                long long nd = d + wt[p];
+                if(nd>=dist[y] || (limit && nd>=limit[y])) continue;
+                if(dist[y]==LLONG_MAX) touched.push_back(y);
+                dist[y] = nd;
+                pq.push({nd, y});
+            }
+        }
+        for(int x: touched) dist[x] = LLONG_MAX;
+        touched.clear();
+    }
+};
+
+long long oracle_us = 0;
+
+// Builds the oracle of the loaded graph from the hierarchy of the last
+// build_spanner: one multi-source Dijkstra per level for the pivots, then
+// one bounded Dijkstra per vertex w (the cluster of w, i.e. the vertices
+// whose bunch holds w), run in parallel. Bunches are sorted by vertex, so
+// the oracle does not depend on the thread count.
+void build_oracle(distance_oracle& o)
+{
+    TIMER_START(oracle);
+    int k = level_cluster.size();
+    o.n = n;
+    o.k = k;
+    o.t = t;
+    vector<int> top(n, 0);  // w is in A_0..A_top[w]
+    for(int i=1; i<k; i++)
+    {
+        for(int v=0; v<n; v++)
+        {
+            if(level_cluster[i][v]==v) top[v] = i;
+        }
+    }
+
+    int nt = num_threads();
+    o.pivot.assign((size_t)(k-1)*n, -1);
+    o.pdist.assign((size_t)(k-1)*n, LLONG_MAX);
+    #pragma omp parallel for schedule(dynamic, 1) num_threads(nt)
+    for(int i=1; i<k; i++)
+    {
+        int* piv = &o.pivot[(size_t)(i-1)*n];
+        long long* pd = &o.pdist[(size_t)(i-1)*n];
+        priority_queue<pair<long long, int>, vector<pair<long long, int>>, greater<pair<long long, int>>> pq;
+        for(int v=0; v<n; v++)
+        {
+            if(top[v]<i) continue;
+            piv[v] = v;
+            pd[v] = 0;
+            pq.push({0, v});
+        }
+        while(!pq.empty())
+        {
+            auto [d, x] = pq.top();
+            pq.pop();
+            if(d>pd[x]) continue;
+            for(long long p=off[x]; p<off[x+1]; p++)
+            {
+                int y = nbr[p];
+                long long nd = d + wt[p];
+                if(nd>=pd[y]) continue;
+                pd[y] = nd;
+                piv[y] = piv[x];
+                pq.push({nd, y});
+            }
+        }
+    }
+
+    vector<oracle_search> scratch(nt);
+    for(auto & sc: scratch) sc.init(n);
+    vector<vector<pair<int, int>>> found(nt);    // (v, w): w is in B(v)
+    vector<vector<long long>> found_dist(nt);
+    #pragma omp parallel for schedule(dynamic, 16) num_threads(nt)
+    for(int w=0; w<n; w++)
+    {
+        int tid = thread_id();
+        const long long* limit = top[w]+1<k ? &o.pdist[(size_t)top[w]*n] : nullptr;
+        scratch[tid].cluster(w, limit, [&](int v, long long d) {
+            found[tid].push_back({v, w});
+            found_dist[tid].push_back(d);
+        });
+    }
+
+    o.boff.assign(n+1, 0);
+    for(auto & buf: found)
+    {
+        for(auto [v, w]: buf) o.boff[v+1]++;
+    }
+    for(int v=0; v<n; v++) o.boff[v+1] += o.boff[v];
+    vector<long long> pos(o.boff.begin(), o.boff.end()-1);
+    vector<pair<int, long long>> entries(o.boff[n]);
+    for(int tid=0; tid<nt; tid++)
+    {
+        for(size_t j=0; j<found[tid].size(); j++)
+        {
+            entries[pos[found[tid][j].first]++] = {found[tid][j].second, found_dist[tid][j]};
+        }
+        vector<pair<int, int>>().swap(found[tid]);
+        vector<long long>().swap(found_dist[tid]);
+    }
+    o.bnode.resize(entries.size());
+    o.bdist.resize(entries.size());
+    #pragma omp parallel for schedule(dynamic, 64) num_threads(nt)
+    for(int v=0; v<n; v++)
+    {
+        sort(entries.begin()+o.boff[v], entries.begin()+o.boff[v+1]);
+        for(long long p=o.boff[v]; p<o.boff[v+1]; p++)
+        {
+            o.bnode[p] = entries[p].first;
+            o.bdist[p] = entries[p].second;
+        }
+    }
+    o.build_index();
+    TIMER_END(oracle);
+    oracle_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_oracle_end - timer_oracle_start).count();
+}
+
+// Builds the spanner and the distance oracle of an edge list (as
+// ts_spanner_edges) and writes the oracle to path. timings (if not null)
+// receives phase1, phase2, total and oracle microseconds. Returns the
+// number of bunch entries, -1 if an endpoint is out of range or -2 if the
+// file cannot be written.
+extern "C" long long ts_oracle_edges(int nv, long long me, const int* eu, const int* ev, const int* ew,
+                                     int tv, unsigned long long seed, const char* path, long long* timings)
+{
+    for(long long i=0; i<me; i++)
+    {
+        if(eu[i]<0 || eu[i]>=nv || ev[i]<0 || ev[i]>=nv) return -1;
+    }
+    t = tv;
+    build_graph(nv, me, eu, ev, ew);
+    RNG.seed(seed);
+    build_spanner();
+    distance_oracle o;
+    build_oracle(o);
+    if(timings)
+    {
+        timings[0] = phase1_us;
+        timings[1] = phase2_us;
+        timings[2] = total_us;
+        timings[3] = oracle_us;
+    }
+    return o.write(path) ? o.entries() : -2;
+}
+
+// Loads an oracle file; returns a handle for ts_oracle_query, or null
+extern "C" void* ts_oracle_load(const char* path)
+{
+    auto* o = new distance_oracle();
+    if(o->read(path)) return o;
+    delete o;
+    return nullptr;
+}
+
+extern "C" void ts_oracle_free(void* handle)
+{
+    delete (distance_oracle*)handle;
+}
+
+// n, k, t and the number of bunch entries of a loaded oracle
+extern "C" void ts_oracle_info(void* handle, long long* info)
+{
+    auto* o = (const distance_oracle*)handle;
+    info[0] = o->n;
+    info[1] = o->k;
+    info[2] = o->t;
+    info[3] = o->entries();
+}
+
+// Answers nq queries (qu[i], qv[i]) into out (-1 for disconnected pairs),
+// spread over the worker threads. Returns -1 if a vertex is out of range.
+extern "C" int ts_oracle_query(void* handle, long long nq, const int* qu, const int* qv, long long* out)
+{
+    auto* o = (const distance_oracle*)handle;
+    for(long long i=0; i<nq; i++)
+    {
+        if(qu[i]<0 || qu[i]>=o->n || qv[i]<0 || qv[i]>=o->n) return -1;
+    }
+    #pragma omp parallel for schedule(static) num_threads(num_threads())
+    for(long long i=0; i<nq; i++) out[i] = o->query(qu[i], qv[i]);
+    return 0;
+}
+
+#ifndef TSPANNER_LIB
+// Spanner edges (status 2, each once from its smaller endpoint) as a binary graph file
+bool write_spanner_file(const string& path)
+{
+    vector<int> fu, fv, fw;
+    for(int i=0; i<n; i++)
+    {
+        for(long long p=off[i]; p<off[i+1]; p++)
+        {
+            if(nbr[p]<i) continue;
+            if(status[p]<2) continue;
+            fu.push_back(i);
+            fv.push_back(nbr[p]);
+            fw.push_back(wt[p]);
+        }
+    }
+    return write_graph_file(path.c_str(), n, t, fu.size(), fu.data(), fv.data(), fw.data());
+}
+
+// Streams the spanner edges as text to stdout straight from the status array
+bool write_spanner_text()
+{
+    long long cnt = 0;
+    for(long long p=0; p<off[n]; p++) cnt += status[p]==2;
+    text_writer out(1);
+    out.write_int(n); out.put(' '); out.write_int(cnt/2); out.put('\n');
+    for(int i=0; i<n; i++)
+    {
+        for(long long p=off[i]; p<off[i+1]; p++)
+        {
+            if(nbr[p]<i) continue;
+            if(status[p]<2) continue;
+            out.write_int(i); out.put(' ');
+            out.write_int(nbr[p]); out.put(' ');
+            out.write_int(wt[p]); out.put('\n');
+        }
+    }
+    out.flush();
+    return out.ok;
+}
+
+// One spanner of a batch: threshold, seed and an optional binary output file
+struct batch_run
+{
+    int t;
+    unsigned long long seed;
+    string output;
+};
+
+// Reads a batch file: one run per line as "t seed [output]"; blank lines and
+// lines starting with # are skipped. Returns false if the file cannot be
+// read or a line is malformed.
+bool read_batch(const string& path, vector<batch_run>& runs)
+{
+    ifstream in(path);
+    if(!in) return false;
+    string line;
+    while(getline(in, line))
+    {
+        istringstream ls(line);
+        batch_run r;
+        string first;
+        if(!(ls >> first) || first[0]=='#') continue;
+        try
+        {
+            r.t = stoi(first);
+        }
+        catch(const exception&)
+        {
+            return false;
+        }
+        if(!(ls >> r.seed)) return false;
+        ls >> r.output;
+        runs.push_back(r);
+    }
+    return true;
+}
+
+// Builds the spanner of every run on the loaded graph, writing each to its
+// output file (if any) and one JSON line per run to stderr: the run's index,
+// t, seed and spanner edge count along with the stats_json() keys. Loading the graph
+// is charged to the first run's input time.
+int run_batch(const vector<batch_run>& runs)
+{
+    for(size_t i=0; i<runs.size(); i++)
+    {
+        t = runs[i].t;
+        RNG.seed(runs[i].seed);
+        build_spanner();
+        long long cnt = 0;
+        for(long long p=0; p<off[n]; p++) cnt += status[p]==2;
+
+        TIMER_START(output);
+        if(!runs[i].output.empty() && !write_spanner_file(runs[i].output))
+        {
+            cerr << "cannot write " << runs[i].output << endl;
+            return 1;
+        }
+        TIMER_END(output);
+        output_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_output_end - timer_output_start).count();
+
+        // stats_json already carries t when the statistics are on
+        cerr << "{\"run\": " << i;
+        if(!stats_on) cerr << ", \"t\": " << t;
+        cerr << ", \"seed\": " << runs[i].seed << ", \"edges\": " << cnt/2 << ", " << stats_json().substr(1) << endl;
+        input_us = 0;
+    }
+    return 0;
+}
+
+// Dynamic mode (--updates). Edges get stable ids (the initial ones in CSR
+// order, insertions appended) and every non-spanner edge keeps a
+// certificate: a spanner path of length at most (2k-1) times its weight,
+// registered with each spanner edge on it (deps). Deleting a spanner edge
+// only invalidates the certificates registered with it, so a batch rechecks
+// just those edges and its own insertions, lightest first, each with a
+// Dijkstra on the spanner bounded by (2k-1)w; an edge that is no longer
+// covered joins the spanner. The spanner only grows during a repair, so
+// certificates that were not rechecked stay valid. A recheck leaves the
+// entries of the old certificate behind; add_dep compacts them away, so
+// deps[sp] stays within twice the certificates still using sp (at least 16)
+// instead of growing with the update history.
+struct dyn_graph
+{
+    vector<int> eu, ev, ew;
+    vector<char> alive, in_sp;
+    vector<int> stamp;                    // bumped whenever a certificate is replaced
+    vector<vector<pair<int, int>>> sadj;  // spanner adjacency: (neighbour, edge id)
+    vector<vector<pair<int, int>>> deps;  // per spanner edge: (certified edge, its stamp)
+    vector<int> dep_limit;                // size of deps[sp] that triggers its next compaction
+    vector<vector<int>> gadj;             // live edge ids at each vertex, in insertion order
+    vector<vector<int>> level;  // level_cluster of the initial build
+    vector<vector<int>> join;   // level_join as edge ids
+    long long stretch, sp_edges = 0;
+
+    int add_edge(int u, int v, int w, bool sp)
+    {
+        int id = eu.size();
+        eu.push_back(u); ev.push_back(v); ew.push_back(w);
+        alive.push_back(1);
+        in_sp.push_back(0);
+        stamp.push_back(0);
+        deps.emplace_back();
+        dep_limit.push_back(16);
+        gadj[u].push_back(id);
+        gadj[v].push_back(id);
+        if(sp) promote(id);
+        return id;
+    }
+
+    // Registers d's current certificate with spanner edge sp. Once deps[sp]
+    // reaches its limit, entries of replaced certificates, deleted edges and
+    // edges now in the spanner are dropped and the limit doubles the rest,
+    // so the compactions cost O(1) amortized per entry.
+    void add_dep(int sp, int d)
+    {
+        auto & ds = deps[sp];
+        ds.push_back({d, stamp[d]});
+        if((int)ds.size()<dep_limit[sp]) return;
+        ds.erase(remove_if(ds.begin(), ds.end(), [&](const pair<int, int>& e) {
+            return !alive[e.first] || in_sp[e.first] || stamp[e.first]!=e.second;
+        }), ds.end());
+        dep_limit[sp] = max(16, 2*(int)ds.size());
+    }
+
+    void promote(int id)
+    {
+        in_sp[id] = 1;
+        sp_edges++;
+        sadj[eu[id]].push_back({ev[id], id});
+        sadj[ev[id]].push_back({eu[id], id});
+    }
+
+    int other(int id, int x) const
+    {
+        return eu[id]==x ? ev[id] : eu[id];
+    }
+
+    // Appends the tree edges from x up to the center of its level-i cluster;
+    // false if one of them has left the spanner since the initial build
+    bool tree_path(int x, int i, vector<int>& path, long long& len) const
+    {
+        for(; i>0; i--)
+        {
+            int id = join[i][x];
+            if(id<0) continue;
+            if(!in_sp[id]) return false;
+            path.push_back(id);
+            len += ew[id];
+            x = other(id, x);
+        }
+        return true;
+    }
+
+    // Looks for the path the construction covered edge id with: through the
+    // shared cluster of its endpoints, or through a spanner edge from one
+    // endpoint into the other's cluster, at some level. The hierarchy is not
+    // maintained under updates, so a candidate only counts while all of its
+    // edges are still in the spanner and it is short enough.
+    bool hierarchy_path(int id, vector<int>& path) const
+    {
+        long long limit = stretch*ew[id];
+        for(size_t i=0; i<level.size(); i++)
+        {
+            for(int side=0; side<2; side++)
+            {
+                int x = side ? ev[id] : eu[id], y = other(id, x);
+                int cy = level[i][y];
+                if(cy<0) continue;
+                if(!side && level[i][x]==cy)
+                {
+                    long long len = 0;
+                    path.clear();
+                    if(tree_path(x, i, path, len) && tree_path(y, i, path, len) && len<=limit) return true;
+                }
+                for(auto [z, e]: sadj[x])
+                {
+                    if(ew[e]>ew[id] || level[i][z]!=cy) continue;
+                    long long len = ew[e];
+                    path.assign(1, e);
+                    if(tree_path(z, i, path, len) && tree_path(y, i, path, len) && len<=limit) return true;
+                }
+            }
+        }
+        return false;
+    }
+
+    void drop_from(int x, int id)
+    {
+        auto & row = sadj[x];
+        for(size_t i=0; i<row.size(); i++)
+        {
+            if(row[i].second!=id) continue;
+            row[i] = row.back();
+            row.pop_back();
+            return;
+        }
+    }
+
+    // Removes and returns the most recently inserted live edge between u and
+    // v, or -1 if there is none. Costs O(deg) of the lower-degree endpoint.
+    int take_edge(int u, int v)
+    {
+        int x = gadj[u].size()<=gadj[v].size() ? u : v, y = u^v^x;
+        auto & row = gadj[x];
+        for(size_t i=row.size(); i-->0; )
+        {
+            int id = row[i];
+            if(other(id, x)!=y) continue;
+            row.erase(row.begin()+i);
+            auto & back = gadj[y];
+            back.erase(find(back.begin(), back.end(), id));
+            return id;
+        }
+        return -1;
+    }
+};
+
+dyn_graph dyn;
+
+// Per-thread bidirectional Dijkstra scratch on the spanner; only touched
+// vertices are reset. Both searches grow balls of about half the distance,
+// far fewer vertices than one ball of the full distance on dense graphs.
+struct pair_search
+{
+    struct side
+    {
+        vector<long long> dist;
+        vector<int> par;  // edge id that reached the vertex, -1 at the root
+        vector<int> touched;
+        priority_queue<pair<long long, int>, vector<pair<long long, int>>, greater<pair<long long, int>>> pq;
+
+        void reset(int root)
+        {
+            for(int x: touched) dist[x] = -1;
+            touched.assign(1, root);
+            pq = decltype(pq)();
+            dist[root] = 0;
+            par[root] = -1;
+            pq.push({0, root});
+        }
+
+        long long top()
+        {
+            while(!pq.empty() && pq.top().first>dist[pq.top().second]) pq.pop();
+            return pq.empty() ? LLONG_MAX : pq.top().first;
+        }
+    };
+
+    side fwd, bwd;
+    int meet_x = -1, meet_y = -1, meet_id = -1;
+    long long scanned = 0;
+
+    void init(int size)
+    {
+        for(side* s: {&fwd, &bwd})
+        {
+            s->dist.assign(size, -1);
+            s->par.assign(size, -1);
+        }
+    }
+
+    // Spanner distance between u and v if it is at most limit, else -1;
+    // only spanner edges of weight at most max_w are used
+    long long run(int u, int v, long long limit, int max_w = INT_MAX)
+    {
+        fwd.reset(u);
+        bwd.reset(v);
+        meet_id = -1;
+        if(u==v) return 0;
+        long long best = LLONG_MAX;
+        while(true)
+        {
+            long long tf = fwd.top(), tb = bwd.top();
+            if(tf==LLONG_MAX || tb==LLONG_MAX || tf+tb>=best || tf+tb>limit) break;
+            bool forward = tf<=tb;
+            side & a = forward ? fwd : bwd;
+            side & b = forward ? bwd : fwd;
+            auto [d, x] = a.pq.top();
+            a.pq.pop();
+            for(auto [y, id]: dyn.sadj[x])
+            {
+                scanned++;
+                if(dyn.ew[id]>max_w) continue;
+                long long nd = d + dyn.ew[id];
+                if(nd>limit) continue;
+                if(b.dist[y]>=0 && nd+b.dist[y]<best)
+                {
+                    best = nd + b.dist[y];
+                    meet_x = forward ? x : y;
+                    meet_y = forward ? y : x;
+                    meet_id = id;
+                }
+                if(a.dist[y]>=0 && a.dist[y]<=nd) continue;
+                if(a.dist[y]<0) a.touched.push_back(y);
+                a.dist[y] = nd;
+                a.par[y] = id;
+                a.pq.push({nd, y});
+            }
+        }
+        return best<=limit ? best : -1;
+    }
+
+    // True if edge id has a spanner path of length at most stretch times its
+    // weight. Baswana-Sen covers an edge through spanner edges no heavier
+    // than itself, so that much smaller search goes first.
+    bool covers(int id, long long stretch)
+    {
+        long long limit = stretch*dyn.ew[id];
+        return run(dyn.eu[id], dyn.ev[id], limit, dyn.ew[id])>=0 || run(dyn.eu[id], dyn.ev[id], limit)>=0;
+    }
+
+    // Appends (spanner edge, certified edge) for every edge of the last path found
+    void certify(int cert, vector<pair<int, int>>& out) const
+    {
+        out.push_back({meet_id, cert});
+        for(auto [s, y]: {make_pair(&fwd, meet_x), make_pair(&bwd, meet_y)})
+        {
+            while(s->par[y]>=0)
+            {
+                int id = s->par[y];
+                out.push_back({id, cert});
+                y = dyn.eu[id]==y ? dyn.ev[id] : dyn.eu[id];
+            }
+        }
+    }
+};
+
+// Edges the initial certification had to search for (no hierarchy path)
+long long index_searched = 0;
+
+// Moves the built spanner and its hierarchy into dyn and certifies every
+// removed edge, by its hierarchy path where one exists
+void init_dynamic()
+{
+    int k = (t+1)/2;
+    dyn = dyn_graph();
+    dyn.stretch = 2*k-1;
+    dyn.sadj.assign(n, {});
+    dyn.gadj.assign(n, {});
+    dyn.eu.reserve(off[n]/2); dyn.ev.reserve(off[n]/2); dyn.ew.reserve(off[n]/2);
+    for(int i=0; i<n; i++)
+    {
+        long long sp = 0;
+        for(long long p=off[i]; p<off[i+1]; p++) sp += status[p]==2;
+        dyn.sadj[i].reserve(sp);
+        dyn.gadj[i].reserve(off[i+1]-off[i]);
+    }
+    vector<int> entry_id(off[n], -1);
+    for(int i=0; i<n; i++)
+    {
+        for(long long p=off[i]; p<off[i+1]; p++)
+        {
+            if(nbr[p]<i) continue;
+            entry_id[p] = entry_id[opposite(p)] = dyn.add_edge(i, nbr[p], wt[p], status[p]==2);
+        }
+    }
+    dyn.level = level_cluster;
+    dyn.join.assign(level_join.size(), vector<int>(n, -1));
+    for(size_t i=0; i<level_join.size(); i++)
+    {
+        for(int v=0; v<n; v++)
+        {
+            if(level_join[i][v]>=0) dyn.join[i][v] = entry_id[level_join[i][v]];
+        }
+    }
+    vector<int>().swap(entry_id);
+    off.clear(); nbr.clear(); wt.clear(); rev.clear(); status.clear();
+
+    vector<int> removed;
+    for(size_t id=0; id<dyn.eu.size(); id++)
+    {
+        if(!dyn.in_sp[id]) removed.push_back(id);
+    }
+    int nt = num_threads();
+    vector<pair_search> search(nt);
+    vector<vector<pair<int, int>>> found(nt);
+    vector<vector<int>> uncovered(nt);
+    long long searched = 0;
+    #pragma omp parallel for schedule(dynamic, 256) reduction(+:searched) num_threads(nt)
+    for(size_t i=0; i<removed.size(); i++)
+    {
+        int tid = thread_id(), id = removed[i];
+        static thread_local vector<int> path;
+        if(dyn.hierarchy_path(id, path))
+        {
+            for(int e: path) found[tid].push_back({e, id});
+            continue;
+        }
+        auto & s = search[tid];
+        if(s.fwd.dist.empty()) s.init(n);
+        searched++;
+        if(s.covers(id, dyn.stretch)) s.certify(id, found[tid]);
+        else uncovered[tid].push_back(id);
+    }
+    index_searched = searched;
+    for(auto & buf: found)
+    {
+        for(auto [sp, id]: buf) dyn.add_dep(sp, id);
+        vector<pair<int, int>>().swap(buf);
+    }
+    // Only reachable if the construction missed an edge; keep the invariant anyway
+    for(auto & buf: uncovered)
+    {
+        for(int id: buf) dyn.promote(id);
+    }
+}
+
+struct update
+{
+    char op;
+    int u, v, w;
+};
+
+struct batch_stats
+{
+    long long us = 0, inserted = 0, deleted = 0, rechecked = 0, searched = 0, promoted = 0, scanned = 0;
+};
+
+// Applies one batch of updates in order, then repairs the spanner
+bool apply_batch(const vector<update>& batch, batch_stats& st)
+{
+    auto start = chrono::steady_clock::now();
+    vector<int> pending;
+    for(auto & up: batch)
+    {
+        if(up.u<0 || up.u>=n || up.v<0 || up.v>=n) return false;
+        if(up.u==up.v) continue;
+        if(up.op=='+')
+        {
+            pending.push_back(dyn.add_edge(up.u, up.v, up.w, false));
+            st.inserted++;
+            continue;
+        }
+        // Deletes the most recently inserted edge between u and v, if any
+        int id = dyn.take_edge(up.u, up.v);
+        if(id<0) continue;
+        dyn.alive[id] = 0;
+        st.deleted++;
+        if(!dyn.in_sp[id]) continue;
+        dyn.in_sp[id] = 0;
+        dyn.sp_edges--;
+        dyn.drop_from(dyn.eu[id], id);
+        dyn.drop_from(dyn.ev[id], id);
+        for(auto [d, s]: dyn.deps[id])
+        {
+            if(dyn.stamp[d]==s) pending.push_back(d);
+        }
+        vector<pair<int, int>>().swap(dyn.deps[id]);
+        dyn.dep_limit[id] = 16;
+    }
+
+    sort(pending.begin(), pending.end(), [](int a, int b) {
+        return make_pair(dyn.ew[a], a) < make_pair(dyn.ew[b], b);
+    });
+    pending.erase(unique(pending.begin(), pending.end()), pending.end());
+    static pair_search s;
+    if((int)s.fwd.dist.size()!=n) s.init(n);
+    s.scanned = 0;
+    vector<pair<int, int>> cert;
+    vector<int> path;
+    for(int id: pending)
+    {
+        if(!dyn.alive[id] || dyn.in_sp[id]) continue;
+        st.rechecked++;
+        dyn.stamp[id]++;
+        cert.clear();
+        if(dyn.hierarchy_path(id, path))
+        {
+            for(int e: path) cert.push_back({e, id});
+        }
+        else if(st.searched++, s.covers(id, dyn.stretch))
+        {
+            s.certify(id, cert);
+        }
+        else
+        {
+            dyn.promote(id);
+            st.promoted++;
+            continue;
+        }
+        for(auto [sp, d]: cert) dyn.add_dep(sp, d);
+    }
+    st.scanned = s.scanned;
+    st.us = chrono::duration_cast<chrono::microseconds>(chrono::steady_clock::now() - start).count();
+    return true;
+}
+
+// Reads an update file: "+ u v w" inserts an edge, "- u v" deletes one;
+// blank lines separate batches and lines starting with # are skipped.
+// Returns false if the file cannot be read or a line is malformed.
+bool read_updates(const string& path, vector<vector<update>>& batches)
+{
+    ifstream in(path);
+    if(!in) return false;
+    string line;
+    batches.assign(1, {});
+    while(getline(in, line))
+    {
+        istringstream ls(line);
+        string op;
+        if(!(ls >> op))
+        {
+            if(!batches.back().empty()) batches.push_back({});
+            continue;
+        }
+        if(op[0]=='#') continue;
+        update up = {op[0], 0, 0, 0};
+        if((op!="+" && op!="-") || !(ls >> up.u >> up.v)) return false;
+        if(up.op=='+' && !(ls >> up.w)) return false;
+        batches.back().push_back(up);
+    }
+    if(batches.back().empty()) batches.pop_back();
+    return true;
+}
+
+// Live edges of the dynamic graph (or only its spanner) as a binary graph file
+bool write_dynamic_file(const string& path, bool spanner_only)
+{
+    vector<int> fu, fv, fw;
+    for(size_t id=0; id<dyn.eu.size(); id++)
+    {
+        if(!dyn.alive[id] || (spanner_only && !dyn.in_sp[id])) continue;
+        fu.push_back(dyn.eu[id]);
+        fv.push_back(dyn.ev[id]);
+        fw.push_back(dyn.ew[id]);
+    }
+    return write_graph_file(path.c_str(), n, t, fu.size(), fu.data(), fv.data(), fw.data());
+}
+
+bool write_dynamic_text()
+{
+    text_writer out(1);
+    out.write_int(n); out.put(' '); out.write_int(dyn.sp_edges); out.put('\n');
+    for(size_t id=0; id<dyn.eu.size(); id++)
+    {
+        if(!dyn.alive[id] || !dyn.in_sp[id]) continue;
+        out.write_int(dyn.eu[id]); out.put(' ');
+        out.write_int(dyn.ev[id]); out.put(' ');
+        out.write_int(dyn.ew[id]); out.put('\n');
+    }
+    out.flush();
+    return out.ok;
+}
+
+// Builds the spanner of the loaded graph, then applies every batch of the
+// update file. Prints the usual JSON line (plus "index", the microseconds
+// spent certifying the removed edges) and then one JSON line per batch.
+// The final spanner goes to output_path (or text on stdout) and, if
+// graph_path is set, the final graph to graph_path.
+int run_dynamic(const vector<vector<update>>& batches, const string& output_path, const string& graph_path)
+{
+    build_spanner();
+    auto start = chrono::steady_clock::now();
+    init_dynamic();
+    long long index_us = chrono::duration_cast<chrono::microseconds>(chrono::steady_clock::now() - start).count();
+    cerr << "{\"index\": " << index_us << ", \"index_searched\": " << index_searched << ", "
+         << stats_json().substr(1) << endl;
+
+    for(size_t i=0; i<batches.size(); i++)
+    {
+        batch_stats st;
+        if(!apply_batch(batches[i], st))
+        {
+            cerr << "batch " << i << ": vertex out of range" << endl;
+            return 1;
+        }
+        cerr << "{\"batch\": " << i << ", \"us\": " << st.us << ", \"inserted\": " << st.inserted
+             << ", \"deleted\": " << st.deleted << ", \"rechecked\": " << st.rechecked
+             << ", \"searched\": " << st.searched
+             << ", \"promoted\": " << st.promoted << ", \"scanned\": " << st.scanned
+             << ", \"edges\": " << dyn.sp_edges << "}" << endl;
+    }
+
+    bool ok = output_path.empty() ? write_dynamic_text() : write_dynamic_file(output_path, true);
+    if(ok && !graph_path.empty()) ok = write_dynamic_file(graph_path, false);
+    if(!ok)
+    {
+        cerr << "cannot write the dynamic spanner or graph" << endl;
+        return 1;
+    }
+    return 0;
+}
+
+// Semi-streaming mode (--stream). The edge list is read from the input file
+// once per pass and never stored: Baswana-Sen runs in 2k-1 passes (steps 2
+// and 3 of every iteration, then phase 2) keeping O(n) state per level plus
+// the ids of the spanner edges, and one last pass writes those edges out.
+// An edge's status is not stored either; it is replayed from the per-level
+// state, so the spanner is the one build_spanner gives for the same input
+// order and seed.
+
+// Reads the edges of a graph file front to back, as often as needed, in
+// fixed-size blocks: text through an unmapped text_reader, binary edge
+// lists with pread. Binary CSR files are mapped, as their rows are not
+// laid out as an edge list.
+struct edge_stream
+{
+    static const long long BLOCK = 1<<16;
+
+    string path;
+    int layout = -1;  // -1 for text
+    int n = 0, t = 0;
+    long long m = 0;
+
+    bool open(const string& p)
+    {
+        path = p;
+        graph_header h;
+        int fd = ::open(path.c_str(), O_RDONLY);
+        if(fd<0) return false;
+        bool binary = pread(fd, &h, sizeof(h), 0)==(ssize_t)sizeof(h) && memcmp(h.magic, GRAPH_MAGIC, 4)==0;
+        ::close(fd);
+        if(binary)
+        {
+            layout = h.layout;
+            n = h.n; m = h.m; t = h.t;
+            return true;
+        }
+        text_reader in;
+        if(!in.open(path.c_str(), false)) return false;
+        return in.next(n) && in.next(m) && in.next(t);
+    }
+
+    // Calls f(u, v, w, id) for every edge, id being its position in the file
+    template<class F>
+    bool pass(F f)
+    {
+        if(layout==LAYOUT_CSR)
+        {
+            graph_file gf;
+            if(!map_graph_file(path.c_str(), gf)) return false;
+            long long id = 0;
+            for_each_edge(gf, [&](int u, int v, int w) { f(u, v, w, id++); });
+            unmap_graph_file(gf);
+            return true;
+        }
+        if(layout==LAYOUT_EDGES)
+        {
+            int fd = ::open(path.c_str(), O_RDONLY);
+            if(fd<0) return false;
+            vector<int32_t> u(BLOCK), v(BLOCK), w(BLOCK);
+            bool ok = true;
+            for(long long s=0; s<m && ok; s+=BLOCK)
+            {
+                long long cnt = min(BLOCK, m-s);
+                size_t bytes = cnt*sizeof(int32_t);
+                off_t base = sizeof(graph_header) + s*sizeof(int32_t);
+                ok = pread(fd, u.data(), bytes, base)==(ssize_t)bytes
+                    && pread(fd, v.data(), bytes, base + m*sizeof(int32_t))==(ssize_t)bytes
+                    && pread(fd, w.data(), bytes, base + 2*m*sizeof(int32_t))==(ssize_t)bytes;
+                for(long long i=0; ok && i<cnt; i++) f(u[i], v[i], w[i], s+i);
+            }
+            ::close(fd);
+            return ok;
+        }
+        text_reader in;
+        if(!in.open(path.c_str(), false)) return false;
+        int nv, tv;
+        long long me;
+        in.next(nv); in.next(me); in.next(tv);
+        for(long long id=0; id<m; id++)
+        {
+            int u = 0, v = 0, w = 0;
+            in.next(u); in.next(v); in.next(w);
+            f(u, v, w, id);
+        }
+        return true;
+    }
+};
+
+// Decisions of one phase 1 iteration, enough to replay its removals
+struct stream_level
+{
+    vector<int> cl, cl_after;  // clusters before and after the iteration's step 3
+    vector<char> ivd, sampled, live;  // live: the cluster is one of the iteration's centers
+    vector<long long> join_id;        // edge j joined through, -1 if j was dropped
+    vector<int> ncj, cw;
+    flat_map<char> closed;  // j*n + c: j removed its edges to cluster c
+};
+
+// Lightest edge found so far, compared by (weight, position) like the sorted CSR rows
+struct stream_edge
+{
+    int u = -1, v = -1, w = INT_MAX;
+    long long id = -1;
+
+    bool offer(int a, int b, int c, long long i)
+    {
+        if(id>=0 && make_pair(w, id)<=make_pair(c, i)) return false;
+        u = a; v = b; w = c; id = i;
+        return true;
+    }
+};
+
+// Lightest (weight, position) seen for one (vertex, cluster) pair
+struct stream_pick
+{
+    int w = INT_MAX;
+    long long id = -1;
+
+    void offer(int c, long long i)
+    {
+        if(make_pair(c, i)<make_pair(w, id)) w = c, id = i;
+    }
+};
+
+vector<stream_level> levels;
+flat_map<int> stream_added;  // spanner edge id -> level it was added at
+
+// Status of edge (u, v) with the given id at the start of level i
+int stream_status(int u, int v, long long id, int i)
+{
+    const int* added = stream_added.find(id);
+    if(added && *added<i) return 2;
+    for(int l=0; l<i-1; l++)
+    {
+        const auto & L = levels[l];
+        for(int s=0; s<2; s++)
+        {
+            int x = s ? v : u, y = s ? u : v;
+            if(!L.ivd[x] || L.sampled[L.cl[x]]) continue;
+            if(L.join_id[x]<0 || L.cl[y]==L.ncj[x]) return 0;
+            if(L.live[L.cl[y]] && L.closed.find((long long)x*n + L.cl[y])) return 0;
+        }
+        if(L.sampled[L.cl_after[u]] && L.cl_after[u]==L.cl_after[v]) return 0;
+    }
+    return 1;
+}
+
+void stream_add(long long id, int level, step_stats& st)
+{
+    if(id<0 || stream_added.find(id)) return;
+    stream_added[id] = level;
+    st.added++;
+}
+
+// Runs Baswana-Sen over passes of the stream; the spanner edges end up in stream_added
+bool stream_spanner(edge_stream& es)
+{
+    n = es.n; m = es.m;
+    int k = (t+1)/2;
+    levels.clear();
+    stream_added = flat_map<int>();
+    iter_stats.clear();
+    phase2_stats = step_stats();
+    step_timer timer;
+
+    TIMER_START(total);
+    vector<int> cluster(n), centers(n);
+    vector<char> ivd(n, 1), is_center(n, 0), live(n, 1);
+    iota(cluster.begin(), cluster.end(), 0);
+    iota(centers.begin(), centers.end(), 0);
+
+    TIMER_START(phase1);
+    for(int i=1; i<k; i++)
+    {
+        iter_stats.push_back(step_stats());
+        auto & st = iter_stats.back();
+        timer.start();
+
+        // step 1
+        fill(is_center.begin(), is_center.end(), 0);
+        int cc = 0;
+        for(auto j: centers)
+        {
+            if(sample(n, k))
+            {
+                is_center[j] = 1;
+                cc++;
+            }
+        }
+        if(!cc) is_center[centers[0]] = 1;
+        st.centers = max(cc, 1);
+        st.scanned[0] = centers.size();
+        timer.lap(st.us[0]);
+
+        // step 2: lightest live edge of every unsampled vertex into a sampled cluster
+        auto active = [&](int j) { return ivd[j] && !is_center[cluster[j]]; };
+        vector<stream_edge> nearest(n);
+        bool ok = es.pass([&](int u, int v, int w, long long id) {
+            if(u==v) return;
+            st.scanned[1]++;
+            if(!(active(u) && is_center[cluster[v]]) && !(active(v) && is_center[cluster[u]])) return;
+            if(stream_status(u, v, id, i)==0) return;
+            if(active(u) && is_center[cluster[v]]) nearest[u].offer(u, v, w, id);
+            if(active(v) && is_center[cluster[u]]) nearest[v].offer(u, v, w, id);
+        });
+        if(!ok) return false;
+        timer.lap(st.us[1]);
+
+        // step 3: lightest possible edge per (vertex, cluster) pair it gets added for
+        stream_level L;
+        L.cl = cluster;
+        L.ivd = ivd;
+        L.sampled = is_center;
+        L.live = live;
+        L.join_id.assign(n, -1);
+        L.ncj.assign(n, -1);
+        L.cw.assign(n, 0);
+        for(int j=0; j<n; j++)
+        {
+            if(!active(j) || nearest[j].id<0) continue;
+            L.join_id[j] = nearest[j].id;
+            L.ncj[j] = cluster[nearest[j].u==j ? nearest[j].v : nearest[j].u];
+            L.cw[j] = nearest[j].w;
+        }
+        flat_map<stream_pick> lightest;
+        ok = es.pass([&](int u, int v, int w, long long id) {
+            if(u==v) return;
+            st.scanned[2]++;
+            bool checked = false, possible = false;
+            for(int s=0; s<2; s++)
+            {
+                int x = s ? v : u, y = s ? u : v;
+                if(!active(x) || !live[cluster[y]]) continue;
+                if(L.join_id[x]>=0 && (cluster[y]==L.ncj[x] || w>=L.cw[x])) continue;
+                if(!checked)
+                {
+                    possible = stream_status(u, v, id, i)==1;
+                    checked = true;
+                }
+                if(possible) lightest[(long long)x*n + cluster[y]].offer(w, id);
+            }
+        });
+        if(!ok) return false;
+        for(int j=0; j<n; j++)
+        {
+            if(!active(j)) continue;
+            if(L.join_id[j]<0)
+            {
+                st.dropped++;
+                ivd[j] = 0;
+                continue;
+            }
+            stream_add(nearest[j].id, i, st);
+        }
+        lightest.for_each([&](long long key, const stream_pick& e) {
+            if(L.join_id[key/n]>=0) L.closed[key] = 1;
+            stream_add(e.id, i, st);
+        });
+        for(int j=0; j<n; j++)
+        {
+            if(L.join_id[j]>=0) cluster[j] = L.ncj[j];
+        }
+        L.cl_after = cluster;
+        timer.lap(st.us[2]);
+
+        // step 4 needs no pass: intra-cluster edges are replayed from cl_after
+        levels.push_back(move(L));
+        centers.clear();
+        fill(live.begin(), live.end(), 0);
+        for(int j=0; j<n; j++)
+        {
+            if(!is_center[j]) continue;
+            centers.push_back(j);
+            live[j] = 1;
+        }
+        timer.lap(st.us[3]);
+    }
+    TIMER_END(phase1);
+
+    // phase 2: every remaining vertex keeps its lightest edge into each cluster
+    TIMER_START(phase2);
+    timer.start();
+    flat_map<stream_pick> lightest;
+    bool ok = es.pass([&](int u, int v, int w, long long id) {
+        if(u==v) return;
+        phase2_stats.scanned[0]++;
+        bool checked = false, possible = false;
+        for(int s=0; s<2; s++)
+        {
+            int x = s ? v : u, y = s ? u : v;
+            if(!ivd[x] || !live[cluster[y]]) continue;
+            if(!checked)
+            {
+                possible = stream_status(u, v, id, k)==1;
+                checked = true;
+            }
+            if(possible) lightest[(long long)x*n + cluster[y]].offer(w, id);
+        }
+    });
+    if(!ok) return false;
+    lightest.for_each([&](long long, const stream_pick& e) { stream_add(e.id, k, phase2_stats); });
+    timer.lap(phase2_stats.us[0]);
+    TIMER_END(phase2);
+    TIMER_END(total);
+
+    phase1_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_phase1_end - timer_phase1_start).count();
+    phase2_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_phase2_end - timer_phase2_start).count();
+    total_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_total_end - timer_total_start).count();
+    return true;
+}
+
+// Writes the spanner edges in one more pass, each as soon as it is read:
+// binary to output_path (the three arrays are filled block by block with
+// pwrite), or text to stdout if output_path is empty
+bool write_stream_spanner(edge_stream& es, const string& output_path)
+{
+    long long cnt = stream_added.used;
+    if(output_path.empty())
+    {
+        text_writer out(1);
+        out.write_int(n); out.put(' '); out.write_int(cnt); out.put('\n');
+        bool ok = es.pass([&](int u, int v, int w, long long id) {
+            if(u==v || !stream_added.find(id)) return;
+            out.write_int(u); out.put(' ');
+            out.write_int(v); out.put(' ');
+            out.write_int(w); out.put('\n');
+        });
+        out.flush();
+        return ok && out.ok;
+    }
+
+    int fd = ::open(output_path.c_str(), O_WRONLY|O_CREAT|O_TRUNC, 0644);
+    if(fd<0) return false;
+    graph_header h;
+    memcpy(h.magic, GRAPH_MAGIC, 4);
+    h.version = GRAPH_VERSION;
+    h.layout = LAYOUT_EDGES;
+    h.n = n;
+    h.m = cnt;
+    h.t = t;
+    h.reserved = 0;
+    bool ok = pwrite(fd, &h, sizeof(h), 0)==(ssize_t)sizeof(h);
+    vector<int32_t> bu, bv, bw;
+    long long done = 0;
+    auto flush = [&]() {
+        size_t bytes = bu.size()*sizeof(int32_t);
+        off_t base = sizeof(graph_header) + done*sizeof(int32_t);
+        ok = ok && pwrite(fd, bu.data(), bytes, base)==(ssize_t)bytes
+            && pwrite(fd, bv.data(), bytes, base + cnt*sizeof(int32_t))==(ssize_t)bytes
+            && pwrite(fd, bw.data(), bytes, base + 2*cnt*sizeof(int32_t))==(ssize_t)bytes;
+        done += bu.size();
+        bu.clear(); bv.clear(); bw.clear();
+    };
+    ok = es.pass([&](int u, int v, int w, long long id) {
+        if(u==v || !stream_added.find(id)) return;
+        bu.push_back(u); bv.push_back(v); bw.push_back(w);
+        if((long long)bu.size()==edge_stream::BLOCK) flush();
+    }) && ok;
+    flush();
+    return ::close(fd)==0 && ok && done==cnt;
+}
+
+// Builds the spanner of input_path in passes and writes it to output_path
+// (binary) or as text to stdout. The JSON line gets the number of passes.
+int run_stream(const string& input_path, const string& output_path, int t_override)
+{
+    edge_stream es;
+    if(input_path.empty() || !es.open(input_path))
+    {
+        cerr << "--stream needs a readable --input file" << endl;
+        return 1;
+    }
+    t = t_override ? t_override : es.t;
+    if(!stream_spanner(es))
+    {
+        cerr << "cannot read " << input_path << endl;
+        return 1;
+    }
+
+    TIMER_START(output);
+    bool ok = write_stream_spanner(es, output_path);
+    TIMER_END(output);
+    output_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_output_end - timer_output_start).count();
+    if(!ok)
+    {
+        cerr << "cannot write the spanner" << endl;
+        return 1;
+    }
+    int k = (t+1)/2;
+    cerr << "{\"passes\": " << 2*k << ", " << stats_json().substr(1) << endl;
+    return 0;
+}
+
+// Answers the queries of queries_path ("u v" pairs, whitespace separated)
+// with the oracle file oracle_path, one estimate per line on stdout (-1 for
+// disconnected pairs). The JSON line has the microseconds spent loading
+// the oracle and answering, and the number of queries.
+int run_queries(const string& oracle_path, const string& queries_path)
+{
+    TIMER_START(load);
+    distance_oracle o;
+    if(!o.read(oracle_path))
+    {
+        cerr << "cannot read oracle file " << oracle_path << endl;
+        return 1;
+    }
+    TIMER_END(load);
+    text_reader in;
+    if(!in.open(queries_path.c_str()))
+    {
+        cerr << "cannot open " << queries_path << endl;
+        return 1;
+    }
+    vector<int> qu, qv;
+    int a, b;
+    while(in.next(a) && in.next(b))
+    {
+        if(a<0 || a>=o.n || b<0 || b>=o.n)
+        {
+            cerr << "query vertex out of range: " << a << " " << b << endl;
+            return 1;
+        }
+        qu.push_back(a);
+        qv.push_back(b);
+    }
+    vector<long long> out(qu.size());
+    TIMER_START(query);
+    #pragma omp parallel for schedule(static) num_threads(num_threads())
+    for(size_t i=0; i<qu.size(); i++) out[i] = o.query(qu[i], qv[i]);
+    TIMER_END(query);
+
+    text_writer w(1);
+    for(long long d: out)
+    {
+        w.write_int(d);
+        w.put('\n');
+    }
+    w.flush();
+    cerr << "{\"load\": " << std::chrono::duration_cast<std::chrono::microseconds>(timer_load_end - timer_load_start).count()
+         << ", \"query\": " << std::chrono::duration_cast<std::chrono::microseconds>(timer_query_end - timer_query_start).count()
+         << ", \"queries\": " << qu.size() << "}" << endl;
+    return w.ok ? 0 : 1;
+}
+
+signed main(int argc, char** argv)
+{
+    // freopen("debug.log", "w", stderr);
+    ios::sync_with_stdio(0);
+    cin.tie(0);
+
+    // --input/--output accept the binary graph format (graphfile.hpp);
+    // text input from a file or stdin and text output to stdout still work.
+    // --batch builds one spanner per line of a batch file (see read_batch)
+    // from a single load of the graph; --updates maintains the spanner under
+    // the batches of an update file (see run_dynamic); --stream builds it in
+    // passes over the --input file without loading it (see stream_spanner).
+    // --oracle also builds the distance oracle into the given file, and with
+    // --queries answers the queries of a file from that oracle instead.
+    // --variant picks the post-pass (see VARIANTS), tuned by --low_degree
+    // and --prune_budget.
+    string input_path, output_path, batch_path, updates_path, graph_output_path, oracle_path, queries_path;
+    bool stream = false;
+    int t_override = 0;
+    for(int i=1; i<argc; i++)
+    {
+        string arg = argv[i];
+        if(arg=="--seed" && i+1<argc) RNG.seed(stoull(argv[++i]));
+        else if(arg=="--input" && i+1<argc) input_path = argv[++i];
+        else if(arg=="--output" && i+1<argc) output_path = argv[++i];
+        else if(arg=="--t" && i+1<argc) t_override = stoi(argv[++i]);
+        else if(arg=="--stats") stats_on = true;
+        else if(arg=="--threads" && i+1<argc) threads = stoi(argv[++i]);
+        else if(arg=="--batch" && i+1<argc) batch_path = argv[++i];
+        else if(arg=="--updates" && i+1<argc) updates_path = argv[++i];
+        else if(arg=="--graph_output" && i+1<argc) graph_output_path = argv[++i];
+        else if(arg=="--stream") stream = true;
+        else if(arg=="--oracle" && i+1<argc) oracle_path = argv[++i];
+        else if(arg=="--queries" && i+1<argc) queries_path = argv[++i];
+        else if(arg=="--variant" && i+1<argc)
+        {
+            string name = argv[++i];
+            spanner_variant = find(begin(VARIANTS), end(VARIANTS), name) - begin(VARIANTS);
+            if(spanner_variant==(int)size(VARIANTS))
+            {
+                cerr << "unknown variant " << name << " (basic, lowdeg or prune)" << endl;
+                return 1;
+            }
+        }
+        else if(arg=="--low_degree" && i+1<argc) low_degree = stoi(argv[++i]);
+        else if(arg=="--prune_budget" && i+1<argc) prune_budget = stoi(argv[++i]);
+    }
+    if(spanner_variant && (stream || !updates_path.empty()))
+    {
+        cerr << "--variant needs the in-memory engine (not --stream or --updates)" << endl;
+        return 1;
+    }
+    if(stream) return run_stream(input_path, output_path, t_override);
+    if(!queries_path.empty()) return run_queries(oracle_path, queries_path);
+    vector<batch_run> runs;
+    if(!batch_path.empty() && !read_batch(batch_path, runs))
+    {
+        cerr << "cannot read batch file " << batch_path << endl;
+        return 1;
+    }
+    vector<vector<update>> updates;
+    if(!updates_path.empty() && !read_updates(updates_path, updates))
+    {
+        cerr << "cannot read update file " << updates_path << endl;
+        return 1;
+    }
+
+    TIMER_START(input);
+    graph_file gf;
+    vector<int> eu, ev, ew;
+    if(!input_path.empty() && map_graph_file(input_path.c_str(), gf))
+    {
+        t = gf.t;
+        if(gf.layout==LAYOUT_EDGES)
+        {
+            // Build straight from the mapped arrays
+            build_graph(gf.n, gf.m, gf.u, gf.v, gf.w);
+        }
+        else
+        {
+            for_each_edge(gf, [&](int u, int v, int w) {
+                eu.push_back(u);
+                ev.push_back(v);
+                ew.push_back(w);
+            });
+            build_graph(gf.n, eu.size(), eu.data(), ev.data(), ew.data());
+        }
+        unmap_graph_file(gf);
+    }
+    else
+    {
+        text_reader in;
+        if(!in.open(input_path.empty() ? nullptr : input_path.c_str()))
+        {
+            cerr << "cannot open " << input_path << endl;
+            return 1;
+        }
+        int nv = 0;
+        long long me = 0;
+        in.next(nv); in.next(me); in.next(t); // take parameters
+        eu.resize(me);
+        ev.resize(me);
+        ew.resize(me);
+        for(long long i=0; i<me; i++)
+        {
+            in.next(eu[i]); in.next(ev[i]); in.next(ew[i]);
+        }
+        build_graph(nv, me, eu.data(), ev.data(), ew.data());
+    }
+    // The edge list is no longer needed once the CSR graph is built
+    vector<int>().swap(eu);
+    vector<int>().swap(ev);
+    vector<int>().swap(ew);
+    TIMER_END(input);
+    input_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_input_end - timer_input_start).count();
+    if(!batch_path.empty()) return run_batch(runs);
+    if(t_override) t = t_override;
+    if(!updates_path.empty()) return run_dynamic(updates, output_path, graph_output_path);
+
+    build_spanner();
+
+    TIMER_START(output);
+    bool written = output_path.empty() ? write_spanner_text() : write_spanner_file(output_path);
+    TIMER_END(output);
+    output_us = std::chrono::duration_cast<std::chrono::microseconds>(timer_output_end - timer_output_start).count();
+    if(!written)
+    {
+        cerr << "cannot write " << (output_path.empty() ? "the spanner to stdout" : output_path) << endl;
+        return 1;
+    }
+
+    if(!oracle_path.empty())
+    {
+        distance_oracle o;
+        build_oracle(o);
+        if(!o.write(oracle_path))
+        {
+            cerr << "cannot write " << oracle_path << endl;
+            return 1;
+        }
+        cerr << "{\"oracle\": " << oracle_us << ", \"bunch\": " << o.entries() << ", " << stats_json().substr(1) << endl;
+        return 0;
+    }
+
+    // Phase timings (and step statistics with --stats) as one JSON line
+    cerr << stats_json() << endl;
+    return 0;
+}
+#endif
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Reproducible benchmark suite for the spanner engine.
+
+Every case generates its graph from a fixed seed and builds the spanner with
+a fixed seed, so repetitions do exactly the same work. After a few warm-up
+runs, a case is repeated until the 95% confidence interval of the median
+total time is within --target_ci of the median (bounded by --min_reps,
+--max_reps and --max_time). Results are reported as median, IQR and CI per
+metric, written as JSON, and optionally compared against a saved baseline;
+slowdowns beyond --threshold whose CIs do not overlap are flagged and make
+the exit status non-zero.
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import cache
+import generator
+import graphio
+import scheduler
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+EXEC_PATH = os.path.join(ROOT, "t_spanner_exec")
+EXEC_SOURCE = os.path.join(ROOT, "algo", "t-spanner.cpp")
+EXEC_FLAGS = ["-std=c++17", "-O2", "-pthread", "-fopenmp"]
+
+METRICS = ("phase1", "phase2", "total", "wall")
+# Metric the adaptive repetition count and the baseline comparison use
+PRIMARY = "total"
+
+SUITES = {
+    "quick": [
+        {"name": "gnm-dense", "family": "gnm", "n": 1000, "m": 200000},
+        {"name": "gnm-sparse", "family": "gnm", "n": 20000, "m": 100000},
+        {"name": "grid", "family": "grid", "n": 10000},
+        {"name": "scalefree", "family": "scalefree", "n": 20000, "degree": 5},
+    ],
+    # Sparse graphs (m = 4n) of growing n: time should grow linearly with n
+    "sparse": [
+        {"name": f"sparse-{n}", "family": "gnm", "n": n, "m": 4 * n}
+        for n in (10000, 30000, 100000, 300000)
+    ],
+    "full": [
+        {"name": "gnm-dense", "family": "gnm", "n": 3000, "m": 2000000},
+        {"name": "gnm-sparse", "family": "gnm", "n": 200000, "m": 1000000},
+        {"name": "grid", "family": "grid", "n": 250000},
+        {"name": "geometric", "family": "geometric", "n": 100000, "m": 1000000},
+        {"name": "scalefree", "family": "scalefree", "n": 200000, "degree": 8},
+    ],
+}
+T_VALUES = (3, 5, 7)
+
+
+def build_exec():
+    """Compile t_spanner_exec if it is missing or older than its sources."""
+    sources = glob.glob(os.path.join(ROOT, "algo", "*"))
+    if (os.path.exists(EXEC_PATH)
+            and os.path.getmtime(EXEC_PATH) >= max(os.path.getmtime(p) for p in sources)):
+        return EXEC_PATH
+    compiler = "g++-14" if sys.platform == "darwin" else "g++"
+    try:
+        subprocess.run([compiler, *EXEC_FLAGS, EXEC_SOURCE, "-o", EXEC_PATH],
+                       check=True, stderr=subprocess.PIPE)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Error compiling {EXEC_SOURCE}: {e.stderr.decode()}") from None
+    return EXEC_PATH
+
+
+def expand_cases(suite, t_values):
+    """One case per (graph, t) of a suite."""
+    return [dict(case, name=f"{case['name']}/t{t}", t=t) for case in SUITES[suite] for t in t_values]
+
+
+def generate_case(case, path, seed):
+    """Write the graph of a case to a binary graph file."""
+    params = {key: case[key] for key in ("m", "p", "radius", "degree") if key in case}
+    u, v, w = generator.generate(case["n"], max_w=case.get("max_w"), family=case["family"],
+                                 seed=seed, **params)
+    graphio.write_graph_file(path, case["n"], case["t"], u, v, w)
+    return int(u.size)
+
+
+class Runner:
+    """Runs the spanner of one graph file with a fixed seed and returns its timings."""
+
+    def __init__(self, engine, graph_path, t, seed, tmp, threads=None):
+        self.engine, self.graph_path, self.t, self.seed = engine, graph_path, t, seed
+        self.threads = threads
+        self.out = os.path.join(tmp, "spanner.tsg")
+        if engine == "lib":
+            import tspanner
+            g = graphio.read_graph_file(graph_path)
+            self.n = g.n
+            self.edges = [np.ascontiguousarray(a, dtype=np.int32) for a in graphio.to_edges(g)]
+            self.lib = tspanner
+
+    def __call__(self):
+        start = time.perf_counter()
+        if self.engine == "lib":
+            _, timing = self.lib.spanner_mask(self.n, *self.edges, self.t, self.seed, threads=self.threads)
+        else:
+            cmd = [EXEC_PATH, "--seed", str(self.seed), "--input", self.graph_path,
+                   "--output", self.out, "--t", str(self.t)]
+            if self.threads is not None:
+                cmd += ["--threads", str(self.threads)]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"t-spanner failed: {result.stderr.strip()}")
+            timing = json.loads(result.stderr.strip().splitlines()[-1])
+        timing["wall"] = int((time.perf_counter() - start) * 1e6)
+        return timing
+
+
+def median_ci(x, z=1.96):
+    """Distribution-free confidence interval of the median of sorted x.
+
+    Uses the order statistics whose ranks bracket n/2 by z standard
+    deviations of the binomial(n, 1/2) rank distribution.
+    """
+    n = len(x)
+    half = z * math.sqrt(n) / 2
+    lo = max(math.floor(n / 2 - half), 1)
+    hi = min(math.ceil(n / 2 + half + 1), n)
+    return float(x[lo - 1]), float(x[hi - 1])
+
+
+def summarize(samples):
+    """Median, quartiles, IQR, median CI, mean and spread of samples."""
+    x = np.sort(np.asarray(samples, dtype=np.float64))
+    q1, median, q3 = np.percentile(x, [25, 50, 75])
+    ci_low, ci_high = median_ci(x)
+    return {
+        "reps": int(x.size),
+        "median": float(median),
+        "q1": float(q1),
+        "q3": float(q3),
+        "iqr": float(q3 - q1),
+        "ci_low": ci_low,
+        "ci_high": ci_high,
+        "mean": float(x.mean()),
+        "stdev": float(x.std(ddof=1)) if x.size > 1 else 0.0,
+        "min": float(x[0]),
+        "max": float(x[-1]),
+    }
+
+
+def converged(samples, target):
+    """Whether the median CI half-width is within target of the median."""
+    stats = summarize(samples)
+    if stats["median"] <= 0:
+        return True
+    return (stats["ci_high"] - stats["ci_low"]) / 2 <= target * stats["median"]
+
+
+def bench_case(case, args, tmp):
+    """Warm up, repeat adaptively and summarize one case."""
+    graph_seed = scheduler.job_seed(args.seed, case["name"].split("/")[0])
+    graph_path = os.path.join(tmp, "graph.tsg")
+    m = generate_case(case, graph_path, graph_seed)
+    run = Runner(args.engine, graph_path, case["t"], scheduler.job_seed(args.seed, case["name"]), tmp,
+                 args.threads)
+
+    for _ in range(args.warmup):
+        run()
+    samples = {key: [] for key in METRICS}
+    start = time.monotonic()
+    while True:
+        timing = run()
+        for key in METRICS:
+            samples[key].append(timing[key])
+        reps = len(samples[PRIMARY])
+        if reps >= args.max_reps:
+            break
+        if reps >= args.min_reps and (converged(samples[PRIMARY], args.target_ci)
+                                      or time.monotonic() - start >= args.max_time):
+            break
+
+    return {
+        "name": case["name"],
+        "params": {key: value for key, value in case.items() if key != "name"},
+        "m": m,
+        "graph_seed": graph_seed,
+        "stats": {key: summarize(values) for key, values in samples.items()},
+        "samples": samples,
+    }
+
+
+def cpu_model():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(args):
+    import tspanner
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "source_digest": cache.source_digest("algo/*.cpp", "algo/*.hpp"),
+        "engine": args.engine,
+        "flags": tspanner.LIB_FLAGS if args.engine == "lib" else EXEC_FLAGS,
+        "seed": args.seed,
+        "threads": args.threads,
+        "suite": args.suite,
+        "cpu": cpu_model(),
+        "cpus": len(scheduler.available_cpus()),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def compare(results, baseline, threshold, metric=PRIMARY):
+    """Compare medians against a baseline run.
+
+    A case regresses when its median is more than threshold slower and its
+    CI lies entirely above the baseline CI (and improves symmetrically).
+    Returns one row per case present in both runs.
+    """
+    base = {r["name"]: r["stats"][metric] for r in baseline["results"]}
+    rows = []
+    for r in results:
+        if r["name"] not in base:
+            continue
+        old, new = base[r["name"]], r["stats"][metric]
+        ratio = new["median"] / old["median"] if old["median"] else float("inf")
+        status = "ok"
+        if ratio > 1 + threshold and new["ci_low"] > old["ci_high"]:
+            status = "slower"
+        elif ratio < 1 - threshold and new["ci_high"] < old["ci_low"]:
+            status = "faster"
+        rows.append({"name": r["name"], "baseline": old["median"], "median": new["median"],
+                     "ratio": ratio, "status": status})
+    return rows
+
+
+def print_result(r, out=sys.stdout):
+    s = r["stats"]
+    cells = "  ".join(f"{key}={s[key]['median']:.0f}us [IQR {s[key]['iqr']:.0f}]" for key in METRICS)
+    p = s[PRIMARY]
+    print(f"{r['name']:<18} m={r['m']:<9} reps={p['reps']:<3} {cells}  "
+          f"CI({PRIMARY})=[{p['ci_low']:.0f}, {p['ci_high']:.0f}]", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the t-spanner engine")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick", help="Benchmark suite (default: quick)")
+    parser.add_argument("--cases", nargs="*", default=None, help="Only run cases whose name starts with one of these")
+    parser.add_argument("--t_values", type=int, nargs="*", default=list(T_VALUES), help="t values (default: 3 5 7)")
+    parser.add_argument("--engine", choices=["exec", "lib"], default="exec",
+                        help="Time t_spanner_exec runs (exec) or in-process library calls (lib)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Engine worker threads (default: OMP_NUM_THREADS or all cores)")
+    parser.add_argument("--seed", type=int, default=1, help="Base seed for graphs and spanners (default: 1)")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed warm-up runs per case (default: 2)")
+    parser.add_argument("--min_reps", type=int, default=5, help="Minimum timed runs per case (default: 5)")
+    parser.add_argument("--max_reps", type=int, default=50, help="Maximum timed runs per case (default: 50)")
+    parser.add_argument("--target_ci", type=float, default=0.02,
+                        help="Stop once the median CI half-width is within this fraction of the median (default: 0.02)")
+    parser.add_argument("--max_time", type=float, default=30.0,
+                        help="Stop repeating a case after this many seconds (default: 30)")
+    parser.add_argument("--pin", action="store_true",
+                        help="Pin the benchmark (and the engine) to --threads CPUs (default: one)")
+    parser.add_argument("--output", "-o", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Compare against a JSON file written by --output")
+    parser.add_argument("--threshold", type=float, default=0.05,
+                        help="Relative slowdown of the median flagged as a regression (default: 0.05)")
+    args = parser.parse_args()
+
+    if args.pin and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(scheduler.pinned_cpus(args.threads or 1)))
+    if args.engine == "exec":
+        build_exec()
+
+    cases = expand_cases(args.suite, args.t_values)
+    if args.cases:
+        cases = [c for c in cases if c["name"].startswith(tuple(args.cases))]
+
+    results = []
+    for case in cases:
+        with tempfile.TemporaryDirectory() as tmp:
+            results.append(bench_case(case, args, tmp))
+        print_result(results[-1])
+    report = {"meta": metadata(args), "results": results}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to '{args.output}'")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("cpu") != report["meta"]["cpu"]:
+            print(f"Warning: baseline was recorded on {baseline['meta'].get('cpu')}")
+        rows = compare(results, baseline, args.threshold)
+        print(f"\nComparison of median {PRIMARY} time against {args.baseline}:")
+        for row in rows:
+            flag = {"slower": "  <-- REGRESSION", "faster": "  (faster)"}.get(row["status"], "")
+            print(f"  {row['name']:<18} {row['baseline']:>12.0f}us -> {row['median']:>12.0f}us "
+                  f"({row['ratio'] - 1:+.1%}){flag}")
+        regressions = [row for row in rows if row["status"] == "slower"]
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Content-addressed on-disk cache for sweep artifacts.
+
+Generated graphs, spanner outputs, timings and checker verdicts are stored
+under a key that hashes everything they depend on: generator parameters and
+seed, the source of generator.py / algo/ / checker.cpp, the compile flags
+and t. Editing the algorithm therefore changes the key and old entries are
+simply never looked up again; they age out through the size-bounded LRU
+eviction (recency is the file mtime, refreshed on every hit).
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ROOT, ".cache")
+DEFAULT_MAX_BYTES = 2 << 30
+
+_digests = {}
+
+
+def source_digest(*patterns):
+    """Hash of the contents of the files matching patterns (relative to the repo)."""
+    paths = sorted({p for pat in patterns for p in glob.glob(os.path.join(ROOT, pat))})
+    key = tuple((p, os.path.getmtime(p)) for p in paths)
+    if key not in _digests:
+        h = hashlib.sha256()
+        for p in paths:
+            h.update(os.path.relpath(p, ROOT).encode())
+            with open(p, "rb") as f:
+                h.update(f.read())
+        _digests[key] = h.hexdigest()
+    return _digests[key]
+
+
+def make_key(*parts):
+    """Stable key for a tuple of JSON-serialisable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResultCache:
+    """Files and JSON values stored by key, evicted least recently used first."""
+
+    def __init__(self, root=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def _path(self, key, suffix):
+        return os.path.join(self.root, key[:2], key + suffix)
+
+    def _hit(self, path):
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get_file(self, key, suffix=".tsg"):
+        """Path of the cached file for key, or None."""
+        path = self._path(key, suffix)
+        return path if self._hit(path) else None
+
+    def put_file(self, key, src, suffix=".tsg"):
+        """Move src into the cache and return its cached path."""
+        path = self._path(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(src, path)
+        except OSError:
+            # Different filesystem: copy next to the target, then rename
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as out, open(src, "rb") as f:
+                while chunk := f.read(1 << 20):
+                    out.write(chunk)
+            os.replace(tmp, path)
+        self.evict()
+        return path
+
+    def scratch(self):
+        """Temporary directory on the cache's filesystem, for files to put_file."""
+        path = os.path.join(self.root, "tmp")
+        os.makedirs(path, exist_ok=True)
+        return tempfile.TemporaryDirectory(dir=path)
+
+    def get_json(self, key):
+        """Cached JSON value for key, or None."""
+        path = self._path(key, ".json")
+        try:
+            with open(path) as f:
+                value = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        self._hit(path)
+        return value
+
+    def put_json(self, key, value):
+        path = self._path(key, ".json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp, path)
+        self.evict()
+
+    def entries(self):
+        """(mtime, size, path) of every cached file."""
+        out = []
+        if not os.path.isdir(self.root):
+            return out
+        for sub in os.scandir(self.root):
+            # Objects live in two-hex-digit shards; skip the scratch directory
+            if len(sub.name) != 2 or not sub.is_dir():
+                continue
+            for e in os.scandir(sub.path):
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                out.append((st.st_mtime, st.st_size, e.path))
+        return out
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
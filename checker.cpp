@@ -1,4 +1,6 @@
 #include "bits/stdc++.h"
+#include "algo/fastio.hpp"
+#include "algo/graphfile.hpp"
 using namespace std;
 /*
 #include <ext/pb_ds/assoc_container.hpp>
@@ -40,38 +42,284 @@ bool verify(const vector<vector<int>> &dist1, const vector<vector<int>> &dist2,
     return true;
 }
 
-void solve(int tc) {
+// Text reader for path, or the shared stdin reader (both graphs come back
+// to back on stdin) if path is null. Returns null if path cannot be opened.
+text_reader *open_text(const char *path, unique_ptr<text_reader> &file) {
+    static text_reader stdin_reader;
+    if (!path) {
+        if (stdin_reader.fd < 0) stdin_reader.open(nullptr);
+        return &stdin_reader;
+    }
+    file = make_unique<text_reader>();
+    return file->open(path) ? file.get() : nullptr;
+}
+
+// Reads a graph from path (binary graph file or text) or, if path is null,
+// from stdin. with_t says whether the text header carries the threshold.
+bool read_graph(const char *path, bool with_t, int &n, int &m, int &threshold,
+                vector<vector<pair<int, int>>> &adj) {
+    graph_file gf;
+    if (path && map_graph_file(path, gf)) {
+        n = gf.n, m = gf.m;
+        if (with_t) threshold = gf.t;
+        adj.assign(n, {});
+        for_each_edge(gf, [&](int32_t u, int32_t v, int32_t w) {
+            adj[u].push_back({v, w});
+            adj[v].push_back({u, w});
+        });
+        unmap_graph_file(gf);
+        return true;
+    }
+    unique_ptr<text_reader> file;
+    text_reader *in = open_text(path, file);
+    if (!in) return false;
+    in->next(n), in->next(m);
+    if (with_t) in->next(threshold);
+    adj.assign(n, {});
+    for (int i = 0; i < m; ++i) {
+        int u = 0, v = 0, w = 0;
+        in->next(u), in->next(v), in->next(w);
+        adj[u].push_back({v, w});
+        adj[v].push_back({u, w});
+    }
+    return true;
+}
+
+// Edge list with 32-bit fields, for the linear-memory edge check
+struct edge_list {
+    int n = 0, m = 0, t = 0;
+    vector<int32_t> u, v, w;
+};
+
+// Same input handling as read_graph, but keeps the raw edge list
+bool read_edges(const char *path, bool with_t, edge_list &g) {
+    graph_file gf;
+    if (path && map_graph_file(path, gf)) {
+        g.n = gf.n, g.m = gf.m;
+        if (with_t) g.t = gf.t;
+        g.u.reserve(g.m), g.v.reserve(g.m), g.w.reserve(g.m);
+        for_each_edge(gf, [&](int32_t u, int32_t v, int32_t w) {
+            g.u.push_back(u), g.v.push_back(v), g.w.push_back(w);
+        });
+        unmap_graph_file(gf);
+        return true;
+    }
+    unique_ptr<text_reader> file;
+    text_reader *in = open_text(path, file);
+    if (!in) return false;
+    in->next(g.n), in->next(g.m);
+    if (with_t) in->next(g.t);
+    g.u.resize(g.m), g.v.resize(g.m), g.w.resize(g.m);
+    for (int i = 0; i < g.m; ++i) in->next(g.u[i]), in->next(g.v[i]), in->next(g.w[i]);
+    return true;
+}
+
+// Adjacency in CSR form: neighbours of x are to/wt[off[x]..off[x+1]).
+// With both_ways every edge is stored from both endpoints (the spanner);
+// otherwise only from its smaller endpoint (the original edges to check).
+struct csr_graph {
+    vector<int64_t> off;
+    vector<int32_t> to, wt;
+};
+
+csr_graph build_csr(const edge_list &g, bool both_ways) {
+    csr_graph h;
+    h.off.assign(g.n + 1, 0);
+    for (int i = 0; i < g.m; ++i) {
+        int32_t a = min(g.u[i], g.v[i]), b = max(g.u[i], g.v[i]);
+        h.off[a + 1]++;
+        if (both_ways) h.off[b + 1]++;
+    }
+    for (int x = 0; x < g.n; ++x) h.off[x + 1] += h.off[x];
+    h.to.resize(h.off[g.n]), h.wt.resize(h.off[g.n]);
+    vector<int64_t> pos(h.off.begin(), h.off.end() - 1);
+    for (int i = 0; i < g.m; ++i) {
+        int32_t a = min(g.u[i], g.v[i]), b = max(g.u[i], g.v[i]);
+        h.to[pos[a]] = b, h.wt[pos[a]++] = g.w[i];
+        if (both_ways) h.to[pos[b]] = a, h.wt[pos[b]++] = g.w[i];
+    }
+    // Sort every row by (neighbour, weight) so direct edges can be looked up
+    vector<pair<int32_t, int32_t>> row;
+    for (int x = 0; x < g.n; ++x) {
+        row.clear();
+        for (int64_t p = h.off[x]; p < h.off[x + 1]; ++p) row.push_back({h.to[p], h.wt[p]});
+        sort(all(row));
+        for (int64_t p = h.off[x]; p < h.off[x + 1]; ++p) tie(h.to[p], h.wt[p]) = row[p - h.off[x]];
+    }
+    return h;
+}
+
+// Lightest direct spanner edge a-b, or LLONG_MAX if there is none
+int direct_weight(const csr_graph &h, int32_t a, int32_t b) {
+    auto first = h.to.begin() + h.off[a], last = h.to.begin() + h.off[a + 1];
+    auto it = lower_bound(first, last, b);
+    return it != last && *it == b ? h.wt[it - h.to.begin()] : LLONG_MAX;
+}
+
+// Per-thread Dijkstra scratch. dist and need are reset through touched
+// lists, so a search costs only what it explores.
+struct bounded_search {
+    vector<int> dist, need;
+    vector<int32_t> touched, targets;
+    priority_queue<pair<int, int32_t>, vector<pair<int, int32_t>>, greater<>> pq;
+
+    explicit bounded_search(int n) : dist(n, LLONG_MAX), need(n, LLONG_MAX) {}
+
+    // Checks every original edge (a, b) grouped under a in one search from
+    // a, cut off at the largest t * w and stopped once all targets are
+    // settled. Returns a target whose spanner distance exceeds its bound,
+    // or -1 if all of them are fine.
+    int32_t check_source(const csr_graph &h, const csr_graph &orig, int32_t a, int threshold) {
+        int cutoff = 0;
+        for (int64_t p = orig.off[a]; p < orig.off[a + 1]; ++p) {
+            int32_t b = orig.to[p];
+            int bound = (int)orig.wt[p] * threshold;
+            // Most checks end here: the edge itself (or a lighter copy) is kept
+            if (b == a || direct_weight(h, a, b) <= bound) continue;
+            if (need[b] == LLONG_MAX) targets.push_back(b);
+            need[b] = min(need[b], bound);
+            cutoff = max(cutoff, bound);
+        }
+        int32_t bad = -1;
+        size_t pending = targets.size();
+        if (pending) {
+            dist[a] = 0;
+            touched.push_back(a);
+            pq.push({0, a});
+        }
+        while (!pq.empty() && pending) {
+            auto [d, x] = pq.top();
+            pq.pop();
+            if (d > dist[x]) continue;
+            if (need[x] != LLONG_MAX) {
+                // x is settled, so d is its exact spanner distance
+                if (d > need[x]) {
+                    bad = x;
+                    break;
+                }
+                need[x] = LLONG_MAX;
+                pending--;
+            }
+            for (int64_t p = h.off[x]; p < h.off[x + 1]; ++p) {
+                int nd = d + h.wt[p];
+                int32_t y = h.to[p];
+                if (nd > cutoff || nd >= dist[y]) continue;
+                if (dist[y] == LLONG_MAX) touched.push_back(y);
+                dist[y] = nd;
+                pq.push({nd, y});
+            }
+        }
+        for (int32_t b : targets) {
+            // Targets never reached within the cutoff are violations too
+            if (bad < 0 && need[b] != LLONG_MAX) bad = b;
+            need[b] = LLONG_MAX;
+        }
+        for (int32_t x : touched) dist[x] = LLONG_MAX;
+        targets.clear();
+        touched.clear();
+        while (!pq.empty()) pq.pop();
+        return bad;
+    }
+};
+
+// Checks d_H(u, v) <= t * w(u, v) for every original edge, which is enough
+// for H to be a t-spanner of G. Original edges are grouped by their smaller
+// endpoint so each source needs one bounded Dijkstra; sources are handed to
+// threads in chunks and all threads stop at the first violation. Memory is
+// O(n + m) plus O(n) scratch per thread, instead of the two n x n matrices
+// of the FW path.
+bool verify_edges(const csr_graph &orig, const csr_graph &h, int n, int threshold, int threads) {
+    const int chunk = 64;
+    atomic<int64_t> next(0);
+    atomic<int64_t> bad_a(-1), bad_b(-1);
+    auto worker = [&]() {
+        bounded_search search(n);
+        while (bad_a.load(memory_order_relaxed) < 0) {
+            int64_t lo = next.fetch_add(chunk);
+            if (lo >= n) break;
+            int64_t hi = min<int64_t>(lo + chunk, n);
+            for (int64_t a = lo; a < hi && bad_a.load(memory_order_relaxed) < 0; ++a) {
+                int32_t b = search.check_source(h, orig, a, threshold);
+                int64_t none = -1;
+                if (b >= 0 && bad_a.compare_exchange_strong(none, a)) bad_b = b;
+            }
+        }
+    };
+    threads = max<int>(1, min<int>(threads, (n + chunk - 1) / chunk));
+    vector<thread> pool;
+    for (int i = 1; i < threads; ++i) pool.emplace_back(worker);
+    worker();
+    for (auto &th : pool) th.join();
+
+    if (bad_a.load() >= 0) {
+        cerr << "edge u v violates stretch " << threshold << ": " << bad_a.load() << " " << bad_b.load() << '\n';
+        return false;
+    }
+    return true;
+}
+
+void solve_edges(const char *original_path, const char *spanner_path, int t_override, int threads) {
+    edge_list g, s;
+    if (!read_edges(original_path, true, g)) {
+        cerr << "cannot read " << original_path << '\n';
+        exit(1);
+    }
+    if (t_override) g.t = t_override;
+    if (!read_edges(spanner_path, false, s)) {
+        cerr << "cannot read " << spanner_path << '\n';
+        exit(1);
+    }
+    cerr << s.n << " " << g.m << " " << s.m << " " << g.t << '\n';
+    int n = s.n = g.n = max(s.n, g.n);
+    csr_graph orig = build_csr(g, false), h = build_csr(s, true);
+    int threshold = g.t;
+    g = edge_list(), s = edge_list();
+    cout << (verify_edges(orig, h, n, threshold, threads) ? "YES" : "NO") << '\n';
+}
+
+// Usage: checker_exec [--mode fw|edges] [--threads N] [ORIGINAL SPANNER [T]]
+// Without paths both graphs are read back to back from stdin as before.
+// T overrides the original's t. fw (default) compares all-pairs distances
+// with Floyd-Warshall; edges checks only the stretch of original edges with
+// bounded Dijkstra, which is exact and scales to large graphs.
+void solve(const char *original_path, const char *spanner_path, int t_override) {
     vector<vector<pair<int, int>>> adj1, adj2;
-    int n, m_o, threshold;
-    cin >> n >> m_o >> threshold;
-    adj1.resize(n);
-    adj2.resize(n);
-    for (int i = 0; i < m_o; ++i) {
-        int u, v, w;
-        cin >> u >> v >> w;
-        adj1[u].push_back({v, w});
-        adj1[v].push_back({u, w});
+    int n, m_o, threshold, m_2;
+    if (!read_graph(original_path, true, n, m_o, threshold, adj1)) {
+        cerr << "cannot read " << original_path << '\n';
+        exit(1);
     }
+    if (t_override) threshold = t_override;
     vector<vector<int>> dist1 = distances_fw(n, adj1);
-    int m_2;
-    cin >> n >> m_2;
-    cerr << n << " " << m_o << " " << m_2 << " " << threshold << '\n';
-    for (int i = 0; i < m_2; ++i) {
-        int u, v, w;
-        cin >> u >> v >> w;
-        adj2[u].push_back({v, w});
-        adj2[v].push_back({u, w});
+    if (!read_graph(spanner_path, false, n, m_2, threshold, adj2)) {
+        cerr << "cannot read " << spanner_path << '\n';
+        exit(1);
     }
+    cerr << n << " " << m_o << " " << m_2 << " " << threshold << '\n';
     vector<vector<int>> dist2 = distances_fw(n, adj2);
 
     cout << (verify(dist1, dist2, threshold) ? "YES" : "NO") << '\n';
 }
 
-signed main() {
+signed main(signed argc, char **argv) {
     cin.tie(0)->sync_with_stdio(0);
-    int tc = 1;
-    //cin >> tc;
-    for (int i = 1; i <= tc; ++i) solve(i);
+    string mode = "fw";
+    int threads = max(1u, thread::hardware_concurrency());
+    vector<char *> pos;
+    for (int i = 1; i < argc; ++i) {
+        string arg = argv[i];
+        if (arg == "--mode" && i + 1 < argc) mode = argv[++i];
+        else if (arg == "--threads" && i + 1 < argc) threads = max(1LL, atoll(argv[++i]));
+        else pos.push_back(argv[i]);
+    }
+    const char *original_path = pos.size() >= 2 ? pos[0] : nullptr;
+    const char *spanner_path = pos.size() >= 2 ? pos[1] : nullptr;
+    int t_override = pos.size() >= 3 ? atoll(pos[2]) : 0;
+    if (mode == "edges") solve_edges(original_path, spanner_path, t_override, threads);
+    else if (mode == "fw") solve(original_path, spanner_path, t_override);
+    else {
+        cerr << "unknown mode " << mode << '\n';
+        return 1;
+    }
     return 0;
 }
-
@@ -1,5 +1,259 @@
 import argparse
-import random
+import sys
+
+import numpy as np
+
+FAMILIES = ("gnm", "gnp", "grid", "geometric", "scalefree")
+
+# Number of edges formatted per write when streaming text output
+CHUNK_EDGES = 1 << 16
+
+
+def pair_count(n):
+    """Number of unordered vertex pairs in a simple graph on n vertices."""
+    return n * (n - 1) // 2
+
+
+def sample_pair_indices(rng, total, m):
+    """Sample m distinct pair indices from [0, total) in random order.
+
+    Sparse requests draw with replacement and deduplicate in rounds, dense
+    requests sample the complement instead, so the work and memory stay
+    O(m) even when m is close to total.
+    """
+    if m <= 0:
+        return np.empty(0, dtype=np.int64)
+    if 2 * m > total:
+        # Dense: draw the pairs to leave out and keep everything else
+        drop = sample_pair_indices(rng, total, total - m)
+        keep = np.ones(total, dtype=bool)
+        keep[drop] = False
+        idx = np.flatnonzero(keep)
+        rng.shuffle(idx)
+        return idx
+
+    idx = np.empty(0, dtype=np.int64)
+    while idx.size < m:
+        # Oversample a little so one or two rounds are enough
+        need = m - idx.size
+        extra = rng.integers(0, total, size=need + need // 8 + 16, dtype=np.int64)
+        idx = np.unique(np.concatenate([idx, extra]))
+    # Every distinct value is equally likely, so a random prefix is uniform
+    return rng.permutation(idx)[:m]
+
+
+def decode_pairs(n, idx):
+    """Map row-major upper-triangle pair indices to endpoints u < v."""
+    idx = np.asarray(idx, dtype=np.int64)
+    b = 2 * n - 1
+    u = ((b - np.sqrt(float(b) * b - 8.0 * idx)) // 2).astype(np.int64)
+    u = np.clip(u, 0, max(n - 2, 0))
+
+    # Fix off-by-one rounding of the square root for very large n
+    def row_start(r):
+        return r * (b - r) // 2
+
+    u -= row_start(u) > idx
+    u += row_start(u + 1) <= idx
+    v = idx - row_start(u) + u + 1
+    return u, v
+
+
+def gnm_edges(rng, n, m):
+    """Uniform random simple graph with exactly m edges."""
+    m = min(m, pair_count(n))
+    return decode_pairs(n, sample_pair_indices(rng, pair_count(n), m))
+
+
+def gnp_edges(rng, n, p):
+    """Erdos-Renyi graph where every pair is present with probability p."""
+    total = pair_count(n)
+    m = int(rng.binomial(total, min(max(p, 0.0), 1.0))) if total else 0
+    return decode_pairs(n, sample_pair_indices(rng, total, m))
+
+
+def grid_edges(n):
+    """Near-square 4-neighbour grid on exactly n vertices (last row may be partial)."""
+    rows = max(int(np.sqrt(n)), 1)
+    cols = -(-n // rows)
+    ids = np.arange(n, dtype=np.int64)
+    right = ids[(ids % cols != cols - 1) & (ids + 1 < n)]
+    down = ids[ids + cols < n]
+    u = np.concatenate([right, down])
+    v = np.concatenate([right + 1, down + cols])
+    return u, v
+
+
+def geometric_edges(rng, n, radius):
+    """Random geometric graph: n points in the unit square, pairs within radius.
+
+    Points are bucketed into cells of side radius, so only pairs in the same
+    or adjacent cells are ever compared.
+    """
+    if n < 2 or radius <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    pts = rng.random((n, 2))
+    side = max(int(1.0 / radius), 1)
+    cx = np.minimum((pts[:, 0] * side).astype(np.int64), side - 1)
+    cy = np.minimum((pts[:, 1] * side).astype(np.int64), side - 1)
+    cell = cx * side + cy
+    order = np.argsort(cell, kind="stable")
+    counts = np.bincount(cell, minlength=side * side)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    # Position of every point inside the cell-sorted order
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n, dtype=np.int64)
+
+    us, vs = [], []
+    # Same cell plus half of the neighbourhood, so each cell pair is seen once
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        nx, ny = cx + dx, cy + dy
+        ok = (nx < side) & (ny >= 0) & (ny < side)
+        src = np.flatnonzero(ok)
+        ncell = nx[src] * side + ny[src]
+        cnt = counts[ncell]
+        if not cnt.sum():
+            continue
+        a = np.repeat(src, cnt)
+        # j-th member of the neighbouring cell for every repeated source
+        offs = np.arange(cnt.sum(), dtype=np.int64) - np.repeat(np.cumsum(cnt) - cnt, cnt)
+        b = order[np.repeat(starts[ncell], cnt) + offs]
+        if dx == 0 and dy == 0:
+            keep = rank[a] < rank[b]
+            a, b = a[keep], b[keep]
+        d = pts[a] - pts[b]
+        close = np.einsum("ij,ij->i", d, d) <= radius * radius
+        us.append(a[close])
+        vs.append(b[close])
+    if not us:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(us), np.concatenate(vs)
+
+
+def scalefree_edges(rng, n, d):
+    """Barabasi-Albert preferential attachment with d edges per new vertex.
+
+    Uses the Batagelj-Brandes edge-copy formulation: the target of edge e is
+    an endpoint of a uniformly chosen earlier slot. Chains of copies are
+    resolved by vectorised pointer jumping instead of a Python loop.
+    """
+    d = max(int(d), 1)
+    total = n * d
+    if n < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    e = np.arange(total, dtype=np.int64)
+    src = e // d
+    # Slot 2e holds src[e], slot 2e+1 copies a random earlier slot
+    ref = (rng.random(total) * (2 * e + 1)).astype(np.int64)
+    odd = np.flatnonzero(ref & 1)
+    while odd.size:
+        ref[odd] = ref[(ref[odd] - 1) // 2]
+        odd = odd[ref[odd] & 1 == 1]
+    dst = src[ref // 2]
+
+    # Drop self loops and parallel edges created by the copy process
+    u, v = np.minimum(src, dst), np.maximum(src, dst)
+    keep = u != v
+    key = np.unique(u[keep] * n + v[keep])
+    return key // n, key % n
+
+
+def generate(n, m=None, max_w=None, family="gnm", seed=None, p=None, radius=None, degree=None):
+    """Generate a weighted graph and return (u, v, w) int64 arrays.
+
+    Edges come out in random order and orientation, weights are uniform in
+    [1, max_w]. m only steers the density of the non-gnm families when their
+    own parameter is not given.
+    """
+    rng = np.random.default_rng(seed)
+    total = pair_count(n)
+    m = min(m if m is not None else n ** 2 // 2, total)
+    max_w = max_w if max_w is not None else n
+
+    if family == "gnm":
+        u, v = gnm_edges(rng, n, m)
+    elif family == "gnp":
+        u, v = gnp_edges(rng, n, p if p is not None else (m / total if total else 0.0))
+    elif family == "grid":
+        u, v = grid_edges(n)
+    elif family == "geometric":
+        if radius is None:
+            # Expected edge count of an RGG is about total * pi * r^2
+            radius = np.sqrt(m / (total * np.pi)) if total else 0.0
+        u, v = geometric_edges(rng, n, radius)
+    elif family == "scalefree":
+        u, v = scalefree_edges(rng, n, degree if degree is not None else max(round(m / max(n, 1)), 1))
+    else:
+        raise ValueError(f"Unknown graph family: {family}")
+
+    if family != "gnm":
+        # gnm already comes out shuffled
+        perm = rng.permutation(u.size)
+        u, v = u[perm], v[perm]
+    flip = rng.random(u.size) < 0.5
+    u, v = np.where(flip, v, u), np.where(flip, u, v)
+    w = rng.integers(1, max_w + 1, size=u.size, dtype=np.int64)
+    return u, v, w
+
+
+def write_graph(out, n, t, u, v, w):
+    """Write the graph in the text format read by t-spanner.cpp, in bulk chunks.
+
+    With t=None the header is just "n m", the format of spanner output.
+    """
+    header = f"{n} {u.size}" if t is None else f"{n} {u.size} {t}"
+    out.write(f"{header}\n".encode())
+    edges = np.stack([u, v, w], axis=1)
+    for s in range(0, len(edges), CHUNK_EDGES):
+        chunk = edges[s:s + CHUNK_EDGES]
+        out.write((("%d %d %d\n" * len(chunk)) % tuple(chunk.ravel().tolist())).encode())
+
+
+def generate_updates(n, u, v, batches, size, max_w=None, delete_fraction=0.5, seed=None):
+    """Random update batches for the graph (u, v), as read by t-spanner.cpp --updates.
+
+    Each operation deletes a uniformly chosen live edge (original or inserted
+    earlier) with probability delete_fraction, and otherwise inserts an edge
+    between two random distinct vertices with a weight uniform in [1, max_w].
+    Returns a list of batches of (op, a, b, w) tuples with op "+" or "-"
+    (w is 0 for deletions).
+    """
+    rng = np.random.default_rng(seed)
+    max_w = max_w if max_w is not None else n
+    # Live edges, with room for every insertion; deletions swap in the last one
+    lu = np.empty(u.size + batches * size, dtype=np.int64)
+    lv = np.empty_like(lu)
+    lu[:u.size], lv[:v.size] = u, v
+    live = u.size
+    out = []
+    for _ in range(batches):
+        deletes = rng.random(size) < delete_fraction
+        picks = rng.random(size)
+        a = rng.integers(n, size=size)
+        b = (a + rng.integers(1, max(n, 2), size=size)) % n
+        w = rng.integers(1, max_w + 1, size=size)
+        ops = []
+        for i in range(size):
+            if deletes[i] and live:
+                j = int(picks[i] * live)
+                ops.append(("-", int(lu[j]), int(lv[j]), 0))
+                live -= 1
+                lu[j], lv[j] = lu[live], lv[live]
+            else:
+                ops.append(("+", int(a[i]), int(b[i]), int(w[i])))
+                lu[live], lv[live] = a[i], b[i]
+                live += 1
+        out.append(ops)
+    return out
+
+
+def write_updates(out, batches):
+    """Write update batches ("+ a b w" / "- a b" lines, a blank line after each batch)."""
+    for ops in batches:
+        lines = [f"+ {a} {b} {w}\n" if op == "+" else f"- {a} {b}\n" for op, a, b, w in ops]
+        out.write(("".join(lines) + "\n").encode())
+
 
 def main():
     # Set up argument parser
@@ -8,36 +262,29 @@ def main():
     parser.add_argument("m", type=int, nargs="?", help="Number of edges in the graph (default: n^2/2)")
     parser.add_argument("t", type=int, nargs="?", default=3, help="Parameter t (default: 3)")
     parser.add_argument("max_w", type=int, nargs="?", default=None, help="Maximum weight of edges (default: n)")
+    parser.add_argument("--family", choices=FAMILIES, default="gnm", help="Graph family (default: gnm)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed (default: fresh entropy)")
+    parser.add_argument("--p", type=float, default=None, help="Edge probability for gnp (default: m / (n(n-1)/2))")
+    parser.add_argument("--radius", type=float, default=None, help="Connection radius for geometric (default: matches m)")
+    parser.add_argument("--degree", type=int, default=None, help="Edges per new vertex for scalefree (default: m/n)")
+    parser.add_argument("--output", "-o", default=None,
+                        help="Write to this file instead of stdout (a .tsg name writes the binary format)")
 
     # Parse arguments
     args = parser.parse_args()
-    n = args.n
-    m = args.m if args.m is not None else n**2 // 2
-    t = args.t
-    max_w = args.max_w if args.max_w is not None else n
-
-    # Ensure m is not greater than the maximum possible number of edges in a simple graph
-    max_possible_edges = n * (n - 1) // 2
-    m = min(m, max_possible_edges)
-
-    # Generate edges
-    edges = set()
-    while len(edges) < m:
-        u = random.randint(0, n - 1)
-        v = random.randint(0, n - 1)
-        if u != v:
-            edge = tuple(sorted((u, v)))
-            edges.add(edge)
-
-    # Assign random weights to edges and shuffle their order
-    edges = [(u, v) if random.choice([True, False]) else (v, u) for u, v in edges]
-    random.shuffle(edges)
-    edges_with_weights = [(u, v, random.randint(1, max_w)) for u, v in edges]
+    u, v, w = generate(args.n, args.m, args.max_w, args.family, args.seed,
+                       p=args.p, radius=args.radius, degree=args.degree)
 
     # Print the graph
-    print(n, m, t)
-    for u, v, w in edges_with_weights:
-        print(u, v, w)
+    if args.output and args.output.endswith(".tsg"):
+        import graphio
+        graphio.write_graph_file(args.output, args.n, args.t, u, v, w)
+    elif args.output:
+        with open(args.output, "wb") as out:
+            write_graph(out, args.n, args.t, u, v, w)
+    else:
+        write_graph(sys.stdout.buffer, args.n, args.t, u, v, w)
+        sys.stdout.flush()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""Binary graph files and importers for real-world edge lists.
+
+The binary format (layout documented in algo/graphfile.hpp) is a 32 byte
+header followed by flat int32/int64 arrays, so both the C++ tools and this
+module can mmap it and use the arrays without parsing. Importers read SNAP,
+DIMACS and Matrix Market edge lists, compact vertex ids, drop self loops and
+duplicate edges, and cache the converted file so repeat runs skip parsing.
+"""
+
+import argparse
+import collections
+import gzip
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+MAGIC = b"TSPG"
+VERSION = 1
+LAYOUT_EDGES = 0
+LAYOUT_CSR = 1
+
+HEADER = np.dtype([
+    ("magic", "S4"), ("version", "<u4"), ("layout", "<u4"), ("n", "<i4"),
+    ("m", "<i8"), ("t", "<i4"), ("reserved", "<u4"),
+])
+assert HEADER.itemsize == 32
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".graph_cache")
+FORMATS = ("text", "snap", "dimacs", "mtx", "bin")
+
+# Edge-list graph: u, v, w are int32 arrays (mmapped when read from disk)
+Graph = collections.namedtuple("Graph", "n m t u v w")
+# CSR graph: both directions of every edge are stored
+CSRGraph = collections.namedtuple("CSRGraph", "n m t indptr indices weights")
+
+
+def _header(n, m, t, layout):
+    h = np.zeros(1, dtype=HEADER)
+    h[0] = (MAGIC, VERSION, layout, n, m, t, 0)
+    return h.tobytes()
+
+
+def write_graph_file(path, n, t, u, v, w):
+    """Write an edge list layout graph file."""
+    u, v, w = (np.ascontiguousarray(a, dtype="<i4") for a in (u, v, w))
+    with open(path, "wb") as f:
+        f.write(_header(n, u.size, t, LAYOUT_EDGES))
+        for a in (u, v, w):
+            a.tofile(f)
+
+
+def write_csr_file(path, n, t, indptr, indices, weights):
+    """Write a CSR layout graph file (indices/weights hold both directions)."""
+    indptr = np.ascontiguousarray(indptr, dtype="<i8")
+    indices = np.ascontiguousarray(indices, dtype="<i4")
+    weights = np.ascontiguousarray(weights, dtype="<i4")
+    with open(path, "wb") as f:
+        f.write(_header(n, indices.size // 2, t, LAYOUT_CSR))
+        for a in (indptr, indices, weights):
+            a.tofile(f)
+
+
+def is_graph_file(path):
+    """True if path is a binary graph file rather than text."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(4) == MAGIC
+    except OSError:
+        return False
+
+
+def read_header(path):
+    """Return (n, m, t, layout) from a binary graph file header."""
+    h = np.fromfile(path, dtype=HEADER, count=1)
+    if h.size != 1 or h[0]["magic"] != MAGIC or h[0]["version"] != VERSION:
+        raise ValueError(f"{path} is not a binary graph file")
+    return int(h[0]["n"]), int(h[0]["m"]), int(h[0]["t"]), int(h[0]["layout"])
+
+
+def read_graph_file(path):
+    """Memory-map a binary graph file and return a Graph or CSRGraph.
+
+    The arrays are read-only views of the file, so they cost no parsing and
+    can be passed to tspanner without a copy.
+    """
+    n, m, t, layout = read_header(path)
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    off = HEADER.itemsize
+    if layout == LAYOUT_EDGES:
+        arr = np.frombuffer(data, dtype="<i4", count=3 * m, offset=off)
+        return Graph(n, m, t, arr[:m], arr[m:2 * m], arr[2 * m:])
+    indptr = np.frombuffer(data, dtype="<i8", count=n + 1, offset=off)
+    rest = np.frombuffer(data, dtype="<i4", count=4 * m, offset=off + 8 * (n + 1))
+    return CSRGraph(n, m, t, indptr, rest[:2 * m], rest[2 * m:])
+
+
+def to_csr(n, u, v, w):
+    """Symmetric CSR arrays (indptr, indices, weights) for an edge list.
+
+    Each adjacency row is sorted by neighbour id.
+    """
+    u = np.asarray(u, dtype=np.int64)
+    v = np.asarray(v, dtype=np.int64)
+    src = np.concatenate([u, v])
+    dst = np.concatenate([v, u])
+    wt = np.concatenate([w, w])
+    order = np.lexsort((dst, src))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order].astype(np.int32), wt[order].astype(np.int32)
+
+
+def to_edges(g):
+    """Edge list arrays (u, v, w) of a Graph or CSRGraph."""
+    if isinstance(g, Graph):
+        return g.u, g.v, g.w
+    rows = np.repeat(np.arange(g.n, dtype=np.int32), np.diff(g.indptr))
+    upper = g.indices > rows
+    return rows[upper], g.indices[upper], g.weights[upper]
+
+
+def clean_edges(u, v, w):
+    """Compact vertex ids to 0..n-1, drop self loops and keep the lightest
+    copy of every duplicate edge. Returns (n, u, v, w) with int32 arrays."""
+    u = np.asarray(u, dtype=np.int64)
+    v = np.asarray(v, dtype=np.int64)
+    w = np.asarray(w, dtype=np.int64)
+    keep = u != v
+    u, v, w = u[keep], v[keep], w[keep]
+    ids, inv = np.unique(np.concatenate([u, v]), return_inverse=True)
+    n = ids.size
+    a, b = inv[:u.size], inv[u.size:]
+    lo, hi = np.minimum(a, b), np.maximum(a, b)
+    key = lo * n + hi
+    # Sort by key, lightest first, and keep the first copy of each key
+    order = np.lexsort((w, key))
+    key, w = key[order], w[order]
+    first = np.ones(key.size, dtype=bool)
+    first[1:] = key[1:] != key[:-1]
+    key, w = key[first], w[first]
+    return n, (key // n).astype(np.int32), (key % n).astype(np.int32), w.astype(np.int32)
+
+
+def _open_text(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read()
+
+
+def _numeric_rows(lines, ncols):
+    """Parse whitespace separated integer/float rows in bulk."""
+    if not lines:
+        return np.empty((0, ncols))
+    vals = np.array(b" ".join(lines).split(), dtype=np.float64)
+    # Extra columns (e.g. SNAP timestamps) are kept and ignored by callers
+    return vals.reshape(len(lines), -1)
+
+
+def _weights(col):
+    # The engine works on positive integer weights
+    return np.maximum(np.rint(col), 1).astype(np.int64)
+
+
+def read_snap(path, default_weight=1):
+    """SNAP style edge list: "u v [w]" per line, '#' or '%' comments."""
+    lines = [ln for ln in _open_text(path).splitlines()
+             if ln.strip() and ln.lstrip()[:1] not in (b"#", b"%")]
+    if not lines:
+        return np.empty(0), np.empty(0), np.empty(0)
+    widths = np.array([len(ln.split()) for ln in lines])
+    if (widths < 2).any():
+        bad = int(np.argmax(widths < 2))
+        raise ValueError(f"{path}: edge line {lines[bad].decode(errors='replace')!r} has fewer than 2 columns")
+    ncols = int(widths[0])
+    if (widths == ncols).all():
+        rows = _numeric_rows(lines, ncols)
+        w = _weights(rows[:, 2]) if ncols >= 3 else np.full(len(rows), default_weight)
+        return rows[:, 0], rows[:, 1], w
+    # Mixed "u v" and "u v w" rows: unweighted rows get default_weight
+    rows = np.array([ln.split()[:3] + [b"0"] * (3 - min(k, 3)) for ln, k in zip(lines, widths)],
+                    dtype=np.float64)
+    w = np.where(widths >= 3, _weights(rows[:, 2]), default_weight)
+    return rows[:, 0], rows[:, 1], w
+
+
+def read_dimacs(path, default_weight=1):
+    """DIMACS shortest path format: "p sp n m" header, "a u v w" arcs, 1-based."""
+    lines = [ln[1:] for ln in _open_text(path).splitlines() if ln[:1] == b"a"]
+    rows = _numeric_rows(lines, 3)
+    return rows[:, 0] - 1, rows[:, 1] - 1, _weights(rows[:, 2])
+
+
+def read_mtx(path, default_weight=1):
+    """Matrix Market coordinate matrix, 1-based; pattern matrices get default_weight."""
+    raw = _open_text(path).splitlines()
+    if not raw or not raw[0].lower().startswith(b"%%matrixmarket"):
+        raise ValueError(f"{path} is not a Matrix Market file")
+    banner = raw[0].lower().split()
+    if b"coordinate" not in banner:
+        raise ValueError(f"{path}: only coordinate Matrix Market files are supported")
+    body = [ln for ln in raw[1:] if ln.strip() and not ln.startswith(b"%")]
+    pattern = b"pattern" in banner
+    # First body line is "rows cols nnz"; complex entries keep the real part
+    rows = np.array(b" ".join(body[1:]).split(), dtype=np.float64)
+    rows = rows.reshape(len(body) - 1, -1)
+    w = np.full(len(rows), default_weight) if pattern else _weights(np.abs(rows[:, 2]))
+    return rows[:, 0] - 1, rows[:, 1] - 1, w
+
+
+def read_text(path):
+    """The repo's own text format: an "n m t" header (or "n m" for spanner
+    output, with t returned as None), then "u v w" lines."""
+    raw = _open_text(path)
+    header = raw.split(b"\n", 1)[0].split()
+    data = raw.split()
+    n, m = int(header[0]), int(header[1])
+    t = int(header[2]) if len(header) >= 3 else None
+    rows = np.array(data[len(header):len(header) + 3 * m], dtype=np.int64).reshape(m, 3)
+    return n, t, rows[:, 0], rows[:, 1], rows[:, 2]
+
+
+def guess_format(path):
+    """Pick an importer from the file name and first bytes."""
+    if is_graph_file(path):
+        return "bin"
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".mtx"):
+        return "mtx"
+    if name.endswith(".gr"):
+        return "dimacs"
+    lines = _open_text(path)[:4096].split(b"\n", 2)
+    head = lines[0].split()
+    second = lines[1].split() if len(lines) > 1 else []
+    if all(x.isdigit() for x in head) and (len(head) == 3 or (len(head) == 2 and len(second) == 3)):
+        # "n m t" graph or "n m" spanner header followed by weighted edges
+        return "text"
+    return "snap"
+
+
+def cache_path(path, fmt, t, cache_dir=CACHE_DIR):
+    """Cached binary file name for an import, keyed by source identity."""
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{fmt}|{t}|v{VERSION}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    base = os.path.basename(path).split(".")[0] or "graph"
+    return os.path.join(cache_dir, f"{base}-{digest}.tsg")
+
+
+def import_graph(path, fmt=None, t=None, cache_dir=CACHE_DIR, default_weight=1, output=None):
+    """Convert an edge list to a binary graph file and return its path.
+
+    Binary inputs are returned unchanged. Otherwise the converted file goes to
+    output, or to a cache entry keyed by the source path, size, mtime,
+    format and t so later calls return immediately. t defaults to the value
+    in a text header, or 3 for formats that have none.
+    """
+    fmt = fmt or guess_format(path)
+    if fmt == "bin":
+        return path
+    dest = output or cache_path(path, fmt, t, cache_dir)
+    if output is None and os.path.exists(dest):
+        return dest
+
+    if fmt == "text":
+        n, file_t, u, v, w = read_text(path)
+        # The repo's own files are already compact and simple
+        t = file_t if t is None else t
+    else:
+        reader = {"snap": read_snap, "dimacs": read_dimacs, "mtx": read_mtx}[fmt]
+        n, u, v, w = clean_edges(*reader(path, default_weight))
+
+    os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+    tmp = dest + ".tmp"
+    write_graph_file(tmp, n, t if t is not None else 3, u, v, w)
+    os.replace(tmp, dest)
+    return dest
+
+
+def load_graph(path, fmt=None, t=None, cache_dir=CACHE_DIR):
+    """Import (through the cache) and memory-map any supported graph."""
+    return read_graph_file(import_graph(path, fmt, t, cache_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and inspect binary graph files")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="Convert an edge list to the binary format")
+    imp.add_argument("path", help="Input graph (text, SNAP, DIMACS .gr, Matrix Market .mtx, optionally .gz)")
+    imp.add_argument("--format", choices=FORMATS, default=None, help="Input format (default: guessed)")
+    imp.add_argument("--t", type=int, default=None, help="t stored in the header (default: from a text header, else 3)")
+    imp.add_argument("--csr", action="store_true", help="Write the CSR layout instead of an edge list")
+    imp.add_argument("--output", "-o", default=None, help="Output path (default: cached under .graph_cache/)")
+
+    info = sub.add_parser("info", help="Print the header of a binary graph file")
+    info.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "info":
+        n, m, t, layout = read_header(args.path)
+        print(f"n={n} m={m} t={t} layout={'csr' if layout == LAYOUT_CSR else 'edges'}")
+        return
+
+    dest = import_graph(args.path, args.format, args.t, output=args.output)
+    if args.csr:
+        g = read_graph_file(dest)
+        csr_dest = args.output or dest[:-4] + ".csr.tsg"
+        write_csr_file(csr_dest + ".tmp", g.n, g.t, *to_csr(g.n, g.u, g.v, g.w))
+        os.replace(csr_dest + ".tmp", csr_dest)
+        dest = csr_dest
+    n, m, t, _ = read_header(dest)
+    print(f"{dest}: n={n} m={m} t={t}", file=sys.stderr)
+    print(dest)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,33 @@ import sys
 import subprocess
 import argparse
 import tempfile
-import matplotlib.pyplot as plt
+import io
+import json
+import threading
+import time
 import numpy as np
 
+import cache
+import generator
+import graphio
+import report
+import resultstore
+import rusage
+import scheduler
+
+CXX_FLAGS = ["-std=c++17", "-O2", "-pthread", "-fopenmp"]
+
+# Bytes moved per read when streaming text between processes
+STREAM_CHUNK = 1 << 20
+
+STAGES = ("generator", "spanner", "checker")
+
 def compile_cpp(file_path, output_name):
     """Compile C++ file and return the path to the executable."""
     try:
         compiler = "g++-14" if sys.platform == "darwin" else "g++"
         subprocess.run(
-            [compiler, "-std=c++17", "-O2", file_path, "-o", output_name],
+            [compiler, *CXX_FLAGS, file_path, "-o", output_name],
             check=True,
             stderr=subprocess.PIPE
         )
@@ -22,172 +40,643 @@ def compile_cpp(file_path, output_name):
         print(f"Error compiling {file_path}: {e.stderr.decode()}")
         return False
 
-def run_generator(n, m, t, max_w=None):
-    """Run the generator and return the generated graph as a string."""
+def generator_cmd(n, m, t, max_w=None, seed=None):
+    """Command line for generator.py."""
     cmd = ["python3", "generator.py", str(n), str(m), str(t)]
     if max_w is not None:
         cmd.append(str(max_w))
+    if seed is not None:
+        cmd += ["--seed", str(seed)]
+    return cmd
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    # Check if the output is empty or invalid
-    output = result.stdout
-    if not output.strip():
-        print("Warning: Generator produced empty output!")
-        return None
-    
-    # Verify the output contains valid graph data
-    lines = output.strip().split('\n')
-    if len(lines) < 1:
-        print("Warning: Generator output has insufficient lines!")
-        return None
-    
-    try:
-        # Check if first line has the format "n m t"
-        params = lines[0].split()
-        if len(params) != 3:
-            print(f"Warning: Invalid first line format: {lines[0]}")
-            return None
-            
-        n_out, m_out, t_out = map(int, params)
-        
-        # Check if we have enough edge lines
-        if len(lines) != m_out + 1:
-            print(f"Warning: Expected {m_out + 1} lines, got {len(lines)}")
-    except ValueError:
-        print(f"Warning: Invalid number format in generator output")
-        return None
-    
-    return output
-
-def run_t_spanner(input_graph):
-    """Run t-spanner algorithm on the input graph and return the output."""
-    with tempfile.NamedTemporaryFile(mode='w+', delete=False) as tmp:
-        tmp.write(input_graph)
-        tmp_name = tmp.name
-
-    result = subprocess.run(
-        ["./t_spanner_exec"],
-        input=input_graph,
-        capture_output=True,
-        text=True
-    )
+class StreamTee(threading.Thread):
+    """Copy a byte stream into sinks in chunks on a background thread.
+
+    Only the header line and the line count are kept (and the text itself
+    with keep), so a graph passes between processes without being held in
+    Python. Sinks are closed at end of input; a sink whose reader exits
+    early is dropped.
+    """
     
-    return result.stdout
-
-def run_t_spanner_with_timing(input_graph):
-    """Run t-spanner algorithm and return output and timing information."""
-    with tempfile.NamedTemporaryFile(mode='w+', delete=False) as tmp:
-        tmp.write(input_graph)
-        tmp_name = tmp.name
-
-    result = subprocess.run(
-        ["./t_spanner_exec"],
-        input=input_graph,
-        capture_output=True,
-        text=True
-    )
+    def __init__(self, src, sinks=(), keep=False):
+        super().__init__(daemon=True)
+        self.src = src
+        self.sinks = list(sinks)
+        self.header = b""
+        self.lines = 0
+        self.chunks = [] if keep else None
+        self.start()
     
-    # Extract timing information from stderr
-    timing_info = {}
-    stderr_lines = result.stderr.strip().split('\n')
-    if len(stderr_lines) >= 3:  # Expecting phase1, phase2, and total timings
+    def run(self):
         try:
-            timing_info['phase1'] = int(stderr_lines[0])
-            timing_info['phase2'] = int(stderr_lines[1])
-            timing_info['total'] = int(stderr_lines[2])
-        except (ValueError, IndexError):
-            pass
+            while chunk := self.src.read(STREAM_CHUNK):
+                if b"\n" not in self.header:
+                    self.header += chunk[:256]
+                self.lines += chunk.count(b"\n")
+                if self.chunks is not None:
+                    self.chunks.append(chunk)
+                for sink in list(self.sinks):
+                    try:
+                        sink.write(chunk)
+                    except BrokenPipeError:
+                        self.sinks.remove(sink)
+        finally:
+            for sink in self.sinks:
+                try:
+                    sink.close()
+                except BrokenPipeError:
+                    pass
+            self.src.close()
     
-    return result.stdout, timing_info
-
-def run_checker(original_graph, spanner_output):
-    """Run the checker to verify if the spanner is valid."""
-    combined_input = original_graph + spanner_output
-    result = subprocess.run(
-        ["./checker_exec"],
-        input=combined_input,
-        capture_output=True,
-        text=True
-    )
+    def params(self):
+        """Integers of the header line, or None if it is missing or malformed."""
+        line = self.header.split(b"\n", 1)[0]
+        try:
+            return [int(x) for x in line.split()] or None
+        except ValueError:
+            return None
     
-    return result.stdout.strip()
+    def text(self):
+        return b"".join(self.chunks).decode() if self.chunks is not None else None
 
-def parse_graph_info(graph_str):
-    """Parse the graph string to extract n and m."""
-    if not graph_str:
-        return None, None
-    
-    lines = graph_str.strip().split('\n')
-    if not lines:
-        return None, None
-    
+def spanner_cmd(seed=None, threads=None, variant="basic"):
+    """Command line for the t-spanner executable.
+
+    Step statistics are always requested: they cost a few timer reads per
+    clustering iteration and feed the per-step plots. threads=None leaves
+    the thread count to OpenMP (OMP_NUM_THREADS or all cores). variant
+    picks the engine's post-pass (see VARIANTS).
+    """
+    cmd = ["./t_spanner_exec", "--stats"]
+    if seed is not None:
+        cmd += ["--seed", str(seed)]
+    if threads is not None:
+        cmd += ["--threads", str(threads)]
+    if variant != "basic":
+        cmd += ["--variant", variant]
+    return cmd
+
+def parse_timing(stderr):
+    """Parse the JSON timing and step statistics line from the spanner's stderr."""
+    stderr_lines = stderr.strip().split('\n')
     try:
-        params = lines[0].split()
-        # if len(params) != 3:
-        #     return None, None
-        
-        n, m = map(int, params[:2])
-        return n, m
-    except (ValueError, IndexError):
-        return None, None
-
-def plot_edge_comparison(n_values, original_m_values, spanner_m_values, t):
-    """Plot a comparison of original and spanner edge counts."""
-    plt.figure(figsize=(10, 6))
-    plt.plot(n_values, original_m_values, 'b-o', label='Original Graph Edges')
-    plt.plot(n_values, spanner_m_values, 'r-o', label='T-Spanner Edges')
-    
-    plt.xlabel('Number of Vertices (n)')
-    plt.ylabel('Number of Edges (m)')
-    plt.title(f'Comparison of Edge Counts between Original Graph and {t}-Spanner')
-    plt.legend()
-    plt.grid(True)
+        return json.loads(stderr_lines[-1])
+    except ValueError:
+        return {}
+
+def step_times(timing_info):
+    """Microseconds per clustering step (summed over iterations) and phase 2, or None."""
+    if "iterations" not in timing_info:
+        return None
+    steps = [sum(it["step_us"][s] for it in timing_info["iterations"]) for s in range(4)]
+    return steps + [timing_info["phase2_stats"]["us"]]
+
+def run_t_spanner_lib(n, t, u, v, w, seed=None, threads=None, variant="basic"):
+    """Run the in-process engine on edge arrays and return (mask, timing_info)."""
+    import tspanner
+    return tspanner.spanner_mask(n, u, v, w, t, seed, stats=True, threads=threads, variant=variant)
+
+def format_graph(n, t, u, v, w):
+    """Format edge arrays in the text format used by the executables.
+
+    Pass t=None for the "n m" header of a spanner output.
+    """
+    buf = io.BytesIO()
+    generator.write_graph(buf, n, t, u, v, w)
+    return buf.getvalue().decode()
+
+def checker_cmd(mode="edges"):
+    """Command line for the checker.
+
+    "edges" checks the stretch of every original edge with bounded Dijkstra
+    (exact, linear memory, multithreaded); "fw" compares all-pairs
+    Floyd-Warshall distances and needs O(n^2) memory.
+    """
+    return ["./checker_exec", "--mode", mode]
+
+def open_checker(mode="edges", t=None):
+    """Start the checker on two pipes and return (process, graph sink, spanner sink).
+
+    The checker reads each graph from /dev/fd/N as it arrives, so neither is
+    written to disk; map_graph_file rejects pipes and falls back to text.
+    """
+    graph_r, graph_w = os.pipe()
+    spanner_r, spanner_w = os.pipe()
+    cmd = checker_cmd(mode) + [f"/dev/fd/{graph_r}", f"/dev/fd/{spanner_r}"]
+    if t is not None:
+        cmd.append(str(t))
+    checker = rusage.Process(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             pass_fds=(graph_r, spanner_r))
+    os.close(graph_r)
+    os.close(spanner_r)
+    return checker, os.fdopen(graph_w, "wb"), os.fdopen(spanner_w, "wb")
+
+def write_to(sink, n, t, u, v, w):
+    """Write a graph as text into sink and close it (for a writer thread)."""
+    try:
+        with sink:
+            generator.write_graph(sink, n, t, u, v, w)
+    except BrokenPipeError:
+        pass
+
+def check_arrays(n, t, u, v, w, mask, mode="edges"):
+    """Check the spanner given by mask over edge arrays, streaming both as text.
+
+    Returns (verdict, checker usage).
+    """
+    checker, graph_sink, spanner_sink = open_checker(mode)
+    writers = [threading.Thread(target=write_to, args=(graph_sink, n, t, u, v, w)),
+               threading.Thread(target=write_to, args=(spanner_sink, n, None, u[mask], v[mask], w[mask]))]
+    for writer in writers:
+        writer.start()
+    verdict = checker.communicate()[0].decode().strip()
+    for writer in writers:
+        writer.join()
+    return verdict, checker.usage
+
+def run_pipeline(n, m, t, max_w=None, seed=None, check="edges", keep_text=False, threads=None):
+    """Stream generator.py into t_spanner_exec and, with check, both into the checker.
+
+    The generator's output is teed into the spanner and the checker, and the
+    spanner's output into the checker, with the processes running
+    concurrently. Counts come from the stream headers and the generator's
+    line count is validated against its header. Returns the same dict as
+    run_case, or None if the generator or spanner produced no output.
+    """
+    gen = rusage.Process(generator_cmd(n, m, t, max_w, seed), stdout=subprocess.PIPE,
+                         stderr=subprocess.DEVNULL)
+    spanner = rusage.Process(spanner_cmd(seed, threads), stdin=subprocess.PIPE,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    checker, graph_sinks, spanner_sinks = None, [spanner.stdin], []
+    if check:
+        checker, graph_sink, spanner_sink = open_checker(check)
+        graph_sinks.append(graph_sink)
+        spanner_sinks.append(spanner_sink)
+    graph_tee = StreamTee(gen.stdout, graph_sinks, keep_text)
+    spanner_tee = StreamTee(spanner.stdout, spanner_sinks, keep_text)
+    stderr = spanner.stderr.read().decode()
+    graph_tee.join()
+    spanner_tee.join()
+    verdict = checker.communicate()[0].decode().strip() if checker else None
+    gen.wait()
+    spanner.wait()
     
-    # Add annotations for the edge reduction percentage
-    if len(n_values) <= 10:
-        for i in range(len(n_values)):
-            if original_m_values[i] > 0:
-                reduction = 100 * (1 - spanner_m_values[i] / original_m_values[i])
-                plt.annotate(f"{reduction:.1f}%", 
-                            xy=(n_values[i], (original_m_values[i] + spanner_m_values[i])/2),
-                            xytext=(5, 0), 
-                            textcoords='offset points')
+    params = graph_tee.params()
+    if params is None or len(params) != 3:
+        print("Warning: Generator produced empty or invalid output!")
+        return None
+    orig_m = params[1]
+    if graph_tee.lines != orig_m + 1:
+        print(f"Warning: Expected {orig_m + 1} lines, got {graph_tee.lines}")
+    spanner_params = spanner_tee.params()
+    if spanner_params is None:
+        return None
+    return {
+        "orig_m": orig_m,
+        "spanner_m": spanner_params[1],
+        "timing": parse_timing(stderr),
+        "valid": verdict == "YES" if check else None,
+        "usage": {"generator": gen.usage, "spanner": spanner.usage,
+                  "checker": checker.usage if checker else None},
+        "graph": graph_tee.text(),
+        "spanner": spanner_tee.text(),
+    }
+
+def run_checker_files(original_path, spanner_path, t=None, mode="edges"):
+    """Run the checker on two graph files (binary or text); returns (verdict, usage)."""
+    cmd = checker_cmd(mode) + [original_path, spanner_path]
+    if t is not None:
+        cmd.append(str(t))
+    result = rusage.run(cmd, capture_output=True, text=True)
+    return result.stdout.strip(), result.usage
+
+def run_case(n, m, t, max_w, engine="exec", seed=None, check="edges", keep_text=False, store=None,
+             threads=None):
+    """Generate one graph, build its spanner and optionally verify it.
+
+    engine="exec" streams text from generator.py through t_spanner_exec
+    (see run_pipeline), engine="lib" generates in-process and calls the
+    shared library on the edge arrays. check is the checker mode ("edges"
+    or "fw"), or None to skip verification. Returns a dict with orig_m,
+    spanner_m, timing, valid (None when not checked), usage and, with
+    keep_text, the graph and spanner text; returns None if a stage produced
+    no output. usage maps each of STAGES to the rusage dict of its child
+    process, or None for a stage that ran in-process or came from the cache.
+
+    With a cache.ResultCache as store (and a fixed seed) the stages go
+    through binary files in the cache instead, and only the graph and
+    spanner text asked for by keep_text is produced. threads is the
+    engine's worker thread count (None: OpenMP default).
+    """
+    if store is not None and seed is not None:
+        graph_key, graph_path = cached_graph(store, n, m, t, max_w, engine, seed)
+        if graph_path is None:
+            return None
+        return cached_spanner(store, graph_key, graph_path, t, engine, seed, check, keep_text, threads)
     
-    # Create plots directory if it doesn't exist
-    os.makedirs('plots', exist_ok=True)
+    if engine != "lib":
+        return run_pipeline(n, m, t, max_w, seed, check, keep_text, threads)
     
-    # Include t in the filename
-    filename = f'plots/edge_comparison_t{t}.png'
-    plt.savefig(filename)
-    print(f"Plot saved to '{filename}'")
-    plt.show()
-
-def plot_time_comparison(n_values, time_values_by_t, title):
-    """Plot a comparison of time taken for different t values."""
-    plt.figure(figsize=(12, 7))
+    u, v, w = generator.generate(n, m, max_w, seed=seed)
+    mask, timing = run_t_spanner_lib(n, t, u, v, w, seed, threads)
+    original_graph = spanner_output = None
+    if keep_text:
+        original_graph = format_graph(n, t, u, v, w)
+        spanner_output = format_graph(n, None, u[mask], v[mask], w[mask])
+    valid = checker_usage = None
+    if check:
+        verdict, checker_usage = check_arrays(n, t, u, v, w, mask, check)
+        valid = verdict == "YES"
+    return {
+        "orig_m": int(u.size),
+        "spanner_m": int(mask.sum()),
+        "timing": timing,
+        "valid": valid,
+        "usage": {"generator": None, "spanner": None, "checker": checker_usage},
+        "graph": original_graph,
+        "spanner": spanner_output,
+    }
+
+def generate_graph_file(path, n, m, t, max_w, engine="exec", seed=None):
+    """Generate a graph straight into a binary graph file.
+
+    Returns the generator's usage ({} when generated in-process), or None
+    if generation failed.
+    """
+    if engine == "lib":
+        u, v, w = generator.generate(n, m, max_w, seed=seed)
+        graphio.write_graph_file(path, n, t, u, v, w)
+        return {}
+    result = rusage.run(generator_cmd(n, m, t, max_w, seed) + ["-o", path])
+    return result.usage if result.returncode == 0 else None
+
+def run_spanner_file(path, out, t, engine="exec", seed=None, threads=None, variant="basic"):
+    """Build the spanner of binary graph file path into binary file out.
+
+    Returns the timing dict, or None if the spanner run failed. The timing
+    of an executable run carries its usage under "usage", so the cache keeps
+    it together with the timing.
+    """
+    if engine == "lib":
+        g = graphio.read_graph_file(path)
+        u, v, w = graphio.to_edges(g)
+        mask, timing = run_t_spanner_lib(g.n, t, u, v, w, seed, threads, variant)
+        graphio.write_graph_file(out, g.n, t, u[mask], v[mask], w[mask])
+        return timing
+    result = rusage.run(
+        spanner_cmd(seed, threads, variant) + ["--input", path, "--output", out, "--t", str(t)],
+        capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"Warning: t-spanner failed: {result.stderr.strip()}")
+        return None
+    return dict(parse_timing(result.stderr), usage=result.usage)
+
+def run_spanner_batch(path, outs, t_values, engine="exec", seed=None, threads=None):
+    """Build the spanner of binary graph file path for every t into the matching file of outs.
+
+    The graph is loaded once: the executable gets a --batch file, the
+    in-process engine reads the file once and reruns on its edge arrays.
+    Returns the timing dicts in t_values order, None for a failed run.
+    Every timing of an executable batch carries the usage of the whole
+    launch (see run_spanner_file), so it covers all of t_values.
+    """
+    if engine == "lib":
+        g = graphio.read_graph_file(path)
+        u, v, w = graphio.to_edges(g)
+        timings = []
+        for t, out in zip(t_values, outs):
+            mask, timing = run_t_spanner_lib(g.n, t, u, v, w, seed, threads)
+            graphio.write_graph_file(out, g.n, t, u[mask], v[mask], w[mask])
+            timings.append(timing)
+        return timings
+    spec = os.path.join(os.path.dirname(outs[0]), "batch.txt")
+    with open(spec, "w") as f:
+        for t, out in zip(t_values, outs):
+            f.write(f"{t} {seed if seed is not None else scheduler.random_seed()} {out}\n")
+    result = rusage.run(spanner_cmd(None, threads) + ["--input", path, "--batch", spec],
+                        capture_output=True, text=True)
+    timings = [None] * len(t_values)
+    for line in result.stderr.splitlines():
+        try:
+            timing = json.loads(line)
+            timings[timing["run"]] = dict(timing, usage=result.usage)
+        except (ValueError, KeyError, IndexError):
+            continue
+    if result.returncode != 0:
+        print(f"Warning: t-spanner batch failed: {result.stderr.strip().splitlines()[-1:]}")
+    return timings
+
+def spanner_flags(engine):
+    """Compile flags of the spanner engine, part of every spanner cache key."""
+    if engine == "lib":
+        import tspanner
+        return tspanner.LIB_FLAGS
+    return CXX_FLAGS
+
+def cached_graph(store, n, m, t, max_w, engine="exec", seed=None):
+    """Return (key, path) of a generated binary graph file, generating it on a miss.
+
+    Both engines generate the same graph from the same seed, and t is passed
+    explicitly to every later stage, so neither is part of the key: a t
+    sweep reuses one graph. path is None if generation failed.
+    """
+    key = cache.make_key("graph", cache.source_digest("generator.py"), np.__version__,
+                         n, m, max_w, seed)
+    path = store.get_file(key)
+    if path is None:
+        with store.scratch() as tmp:
+            out = os.path.join(tmp, "graph.tsg")
+            if generate_graph_file(out, n, m, t, max_w, engine, seed) is None:
+                return key, None
+            path = store.put_file(key, out)
+    return key, path
+
+def spanner_key(graph_key, t, engine="exec", seed=None, threads=None):
+    """Cache key of the spanner (and its timing) of a cached graph."""
+    return cache.make_key("spanner", graph_key, cache.source_digest("algo/*.cpp", "algo/*.hpp"),
+                          engine, spanner_flags(engine), t, seed, threads)
+
+def cached_spanner(store, graph_key, graph_path, t, engine="exec", seed=None, check="edges", keep_text=False,
+                   threads=None):
+    """Build (or reuse) and optionally verify the spanner of a cached graph file.
+
+    The spanner file and its timing are keyed by the graph, the engine source
+    and compile flags, t and seed; the verdict additionally by the checker
+    source and mode. Returns the same dict as run_case; usage has the
+    stages that ran now, and the spanner's also when it is cached with the
+    timing.
+    """
+    key = spanner_key(graph_key, t, engine, seed, threads)
+    spanner_path, timing = store.get_file(key), store.get_json(key)
+    if spanner_path is None or timing is None:
+        with store.scratch() as tmp:
+            out = os.path.join(tmp, "spanner.tsg")
+            timing = run_spanner_file(graph_path, out, t, engine, seed, threads)
+            if timing is None:
+                return None
+            spanner_path = store.put_file(key, out)
+            store.put_json(key, timing)
+    _, orig_m, _, _ = graphio.read_header(graph_path)
+    _, spanner_m, _, _ = graphio.read_header(spanner_path)
     
-    for t, time_data in time_values_by_t.items():
-        plt.plot(n_values, time_data, marker='o', linewidth=2, label=f't={t}')
+    valid = checker_usage = None
+    if check:
+        verdict_key = cache.make_key("verdict", key, cache.source_digest("checker.cpp", "algo/*.hpp"),
+                                     CXX_FLAGS, check)
+        valid = store.get_json(verdict_key)
+        if valid is None:
+            verdict, checker_usage = run_checker_files(graph_path, spanner_path, t, check)
+            valid = verdict == "YES"
+            store.put_json(verdict_key, valid)
     
-    plt.xlabel('Number of Vertices (n)')
-    plt.ylabel('Time (microseconds)')
-    plt.title(title)
-    plt.legend()
-    plt.grid(True)
+    original_graph = spanner_output = None
+    if keep_text:
+        g, h = graphio.read_graph_file(graph_path), graphio.read_graph_file(spanner_path)
+        original_graph = format_graph(g.n, t, *graphio.to_edges(g))
+        spanner_output = format_graph(h.n, None, *graphio.to_edges(h))
+    return {
+        "orig_m": orig_m,
+        "spanner_m": spanner_m,
+        "timing": timing,
+        "valid": valid,
+        "usage": {"generator": None, "spanner": timing.get("usage"), "checker": checker_usage},
+        "graph": original_graph,
+        "spanner": spanner_output,
+    }
+
+def run_file_case(path, t, engine="exec", seed=None, check="edges", store=None, threads=None):
+    """Build and optionally verify the spanner of a graph file.
+
+    path may be any format graphio imports (converted once and cached); the
+    binary file is mmapped by the executables or by the in-process engine,
+    so no text is produced. Returns the same dict as run_case, without text.
+    With a store, the spanner, timing and verdict are cached keyed by the
+    imported file's identity (path, size and mtime).
+    """
+    path = graphio.import_graph(path, t=t)
+    n, orig_m, file_t, _ = graphio.read_header(path)
+    t = t if t is not None else file_t
+    if store is not None and seed is not None:
+        st = os.stat(path)
+        graph_key = cache.make_key("file", os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        return cached_spanner(store, graph_key, path, t, engine, seed, check, threads=threads)
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "spanner.tsg")
+        timing = run_spanner_file(path, out, t, engine, seed, threads)
+        return file_result(path, out, t, timing, check)
+
+def file_result(graph_path, spanner_path, t, timing, check="edges", generator_usage=None):
+    """run_case dict (without text) for a spanner file built with timing, checking it if asked."""
+    if timing is None:
+        return None
+    _, orig_m, _, _ = graphio.read_header(graph_path)
+    _, spanner_m, _, _ = graphio.read_header(spanner_path)
+    valid = checker_usage = None
+    if check:
+        verdict, checker_usage = run_checker_files(graph_path, spanner_path, t, check)
+        valid = verdict == "YES"
+    return {
+        "orig_m": orig_m,
+        "spanner_m": spanner_m,
+        "timing": timing,
+        "valid": valid,
+        "usage": {"generator": generator_usage or None, "spanner": timing.get("usage"),
+                  "checker": checker_usage},
+        "graph": None,
+        "spanner": None,
+    }
+
+def run_variant_case(n, m, t, max_w, variants, sources=None, workers=None, engine="exec", seed=None,
+                     check="edges", threads=None, graph=None):
+    """Build the spanner of one graph with every variant and profile its stretch.
+
+    The graph is generated once (or imported from graph) and every variant
+    of the engine (see VARIANTS) runs on it with the same seed, so they
+    share the Baswana-Sen clustering and differ only in their post-pass.
+    Returns a file_result dict per variant, in variants order, with the
+    stretch summary of stretch.profile_stretch under "stretch" (from
+    `sources` sampled sources, default all); None for a failed build, and
+    None overall if the graph could not be generated.
+    """
+    import stretch
     
-    # Use log scale if values span multiple orders of magnitude
-    if max(max(times) for times in time_values_by_t.values()) > 1000:
-        plt.yscale('log')
+    with tempfile.TemporaryDirectory() as tmp:
+        generator_usage = None
+        if graph:
+            graph_path = graphio.import_graph(graph, t=t)
+        else:
+            graph_path = os.path.join(tmp, "graph.tsg")
+            generator_usage = generate_graph_file(graph_path, n, m, t, max_w, engine, seed)
+            if generator_usage is None:
+                return None
+        cases = []
+        for variant in variants:
+            out = os.path.join(tmp, f"spanner_{variant}.tsg")
+            timing = run_spanner_file(graph_path, out, t, engine, seed, threads, variant)
+            case = file_result(graph_path, out, t, timing, check, generator_usage)
+            if case:
+                case["stretch"] = stretch.profile_stretch(graph_path, out, sources, workers, seed or 0, t=t)
+            cases.append(case)
+        return cases
+
+def run_batch_case(n, m, t_values, max_w, engine="exec", seed=None, check="edges", store=None, threads=None):
+    """run_case for every t in t_values on one generated graph, loaded once.
+
+    The graph goes to a binary file and all spanners come from a single
+    engine launch (run_spanner_batch). With a store only the t values
+    missing from the cache are built. Returns the run_case dicts (without
+    text) in t_values order.
+    """
+    if store is not None and seed is not None:
+        graph_key, graph_path = cached_graph(store, n, m, t_values[0], max_w, engine, seed)
+        if graph_path is None:
+            return [None] * len(t_values)
+        keys = [spanner_key(graph_key, t, engine, seed, threads) for t in t_values]
+        missing = [i for i, key in enumerate(keys) if store.get_file(key) is None or store.get_json(key) is None]
+        if missing:
+            with store.scratch() as tmp:
+                outs = [os.path.join(tmp, f"spanner{i}.tsg") for i in missing]
+                timings = run_spanner_batch(graph_path, outs, [t_values[i] for i in missing], engine, seed, threads)
+                for i, out, timing in zip(missing, outs, timings):
+                    if timing is not None:
+                        store.put_file(keys[i], out)
+                        store.put_json(keys[i], timing)
+        return [cached_spanner(store, graph_key, graph_path, t, engine, seed, check, threads=threads)
+                for t in t_values]
     
-    # Create plots directory if it doesn't exist
-    os.makedirs('plots', exist_ok=True)
+    with tempfile.TemporaryDirectory() as tmp:
+        graph_path = os.path.join(tmp, "graph.tsg")
+        generator_usage = generate_graph_file(graph_path, n, m, t_values[0], max_w, engine, seed)
+        if generator_usage is None:
+            return [None] * len(t_values)
+        outs = [os.path.join(tmp, f"spanner{i}.tsg") for i in range(len(t_values))]
+        timings = run_spanner_batch(graph_path, outs, t_values, engine, seed, threads)
+        return [file_result(graph_path, out, t, timing, check, generator_usage)
+                for t, out, timing in zip(t_values, outs, timings)]
+
+def run_dynamic_case(n, m, t, max_w, batches, size, delete_fraction=0.5, seed=None, check="edges",
+                     threads=None):
+    """Maintain the spanner of one generated graph under random update batches.
+
+    The executable builds the spanner once and then repairs it batch by
+    batch (t_spanner_exec --updates); the final spanner is checked against
+    the final graph. Returns a dict with orig_m, spanner_m (final), timing
+    (the initial build, with the certificate index time), batches (one stats
+    dict per batch), valid and usage, or None if the run failed.
+    """
+    u, v, w = generator.generate(n, m, max_w, seed=seed)
+    updates = generator.generate_updates(n, u, v, batches, size, max_w, delete_fraction, seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        graph_path, updates_path = os.path.join(tmp, "graph.tsg"), os.path.join(tmp, "updates.txt")
+        spanner_path, final_path = os.path.join(tmp, "spanner.tsg"), os.path.join(tmp, "final.tsg")
+        graphio.write_graph_file(graph_path, n, t, u, v, w)
+        with open(updates_path, "wb") as f:
+            generator.write_updates(f, updates)
+        result = rusage.run(
+            spanner_cmd(seed, threads) + ["--input", graph_path, "--updates", updates_path,
+                                          "--output", spanner_path, "--graph_output", final_path],
+            capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"Warning: t-spanner failed: {result.stderr.strip()}")
+            return None
+        lines = [json.loads(line) for line in result.stderr.splitlines() if line.startswith("{")]
+        _, spanner_m, _, _ = graphio.read_header(spanner_path)
+        valid = checker_usage = None
+        if check:
+            verdict, checker_usage = run_checker_files(final_path, spanner_path, t, check)
+            valid = verdict == "YES"
+    return {
+        "orig_m": int(u.size),
+        "spanner_m": spanner_m,
+        "timing": lines[0],
+        "batches": lines[1:],
+        "valid": valid,
+        "usage": {"generator": None, "spanner": result.usage, "checker": checker_usage},
+    }
+
+def run_oracle_case(n, m, t, max_w, queries, sources=None, engine="exec", seed=None, threads=None):
+    """Build the distance oracle of one generated graph and benchmark its queries.
+
+    Throughput is measured on `queries` uniform random pairs through the
+    batch API (tspanner.DistanceOracle), against answering a query with a
+    Dijkstra on the spanner, timed from `sources` sampled sources (default
+    20). The same sources give the exact distances for the observed
+    stretch. Returns a dict with orig_m, spanner_m, timing (the spanner's,
+    with "oracle" and "bunch"), oracle_bytes, qps, sssp_qps, the mean and
+    max stretch, and usage; None if the build failed.
+    """
+    import tspanner
     
-    # Generate filename based on title
-    safe_title = title.lower().replace(' ', '_')
-    filename = f'plots/{safe_title}.png'
-    plt.savefig(filename)
-    print(f"Plot saved to '{filename}'")
-    plt.show()
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        graph_path, spanner_path = os.path.join(tmp, "graph.tsg"), os.path.join(tmp, "spanner.tsg")
+        oracle_path = os.path.join(tmp, "oracle.tso")
+        generator_usage = generate_graph_file(graph_path, n, m, t, max_w, engine, seed)
+        if generator_usage is None:
+            return None
+        g = graphio.read_graph_file(graph_path)
+        u, v, w = graphio.to_edges(g)
+        spanner_usage = None
+        if engine == "lib":
+            timing = tspanner.build_oracle(n, u, v, w, t, oracle_path, seed, threads)
+            mask, _ = run_t_spanner_lib(n, t, u, v, w, seed, threads)
+            spanner_u, spanner_v, spanner_w = u[mask], v[mask], w[mask]
+        else:
+            result = rusage.run(spanner_cmd(seed, threads) + ["--input", graph_path, "--output", spanner_path,
+                                                              "--t", str(t), "--oracle", oracle_path],
+                                capture_output=True, text=True)
+            if result.returncode != 0:
+                print(f"Warning: t-spanner failed: {result.stderr.strip()}")
+                return None
+            timing, spanner_usage = parse_timing(result.stderr), result.usage
+            spanner_u, spanner_v, spanner_w = graphio.to_edges(graphio.read_graph_file(spanner_path))
+        oracle_bytes = os.path.getsize(oracle_path)
+        
+        with tspanner.DistanceOracle(oracle_path) as oracle:
+            qu = rng.integers(n, size=queries, dtype=np.int32)
+            qv = rng.integers(n, size=queries, dtype=np.int32)
+            start = time.perf_counter()
+            oracle.query(qu, qv, threads)
+            qps = queries / max(time.perf_counter() - start, 1e-9)
+            
+            graph_csr = graphio.to_csr(n, u, v, w)
+            spanner_csr = graphio.to_csr(n, spanner_u, spanner_v, spanner_w)
+            targets = np.arange(n, dtype=np.int32)
+            stretch_sum, stretch_max, pairs, sssp_time = 0.0, 1.0, 0, 0.0
+            picked = rng.choice(n, size=min(sources or 20, n), replace=False)
+            for s in picked:
+                start = time.perf_counter()
+                tspanner.sssp(*spanner_csr, int(s))
+                sssp_time += time.perf_counter() - start
+                exact = tspanner.sssp(*graph_csr, int(s))
+                estimate = oracle.query(np.full(n, s, dtype=np.int32), targets, threads)
+                reached = exact > 0
+                ratio = estimate[reached] / exact[reached]
+                stretch_sum += ratio.sum()
+                stretch_max = max(stretch_max, float(ratio.max()) if ratio.size else 1.0)
+                pairs += int(reached.sum())
+    return {
+        "orig_m": int(u.size),
+        "spanner_m": int(spanner_u.size),
+        "timing": timing,
+        "oracle_bytes": oracle_bytes,
+        "qps": qps,
+        "sssp_qps": len(picked) / max(sssp_time, 1e-9),
+        "stretch_mean": stretch_sum / pairs if pairs else 1.0,
+        "stretch_max": stretch_max,
+        "usage": {"generator": generator_usage or None, "spanner": spanner_usage, "checker": None},
+    }
+
+# Spanner variants of the engine (tspanner.VARIANTS, --variant of t_spanner_exec)
+VARIANTS = ("basic", "lowdeg", "prune")
+
+# Modes of main() in the order it checks them; no flag runs "validate"
+MODES = ("plot_weights", "plot", "plot_time", "plot_resources", "plot_scaling", "dynamic", "oracle",
+         "variants", "profile_stretch", "graph")
+
+def sweep_mode(args):
+    """Name of the mode main() runs for args, as recorded in the results store."""
+    return next((mode for mode in MODES if getattr(args, mode)), "validate")
 
 def main():
     parser = argparse.ArgumentParser(description="T-Spanner Test Framework")
@@ -197,6 +686,43 @@ def main():
     parser.add_argument("--t", type=int, default=3, help="T parameter for spanner (default: 3)")
     parser.add_argument("--max_w", type=int, default=None, help="Maximum edge weight (default: n)")
     parser.add_argument("--verbose", action="store_true", help="Print detailed outputs")
+    parser.add_argument("--engine", choices=["exec", "lib"], default="exec",
+                        help="Run the spanner as a subprocess (exec) or in-process via the shared library (lib)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Base random seed; every test case derives its own seed from it (default: random)")
+    parser.add_argument("--jobs", type=int, default=1, help="Run independent test cases on this many worker processes")
+    parser.add_argument("--pin", action="store_true",
+                        help="Pin each worker to its own CPU (recommended with --jobs for --plot_time)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Worker threads of the spanner engine (default: OMP_NUM_THREADS or all cores)")
+    parser.add_argument("--check_mode", choices=["edges", "fw"], default="edges",
+                        help="Checker: stretch of every original edge via bounded Dijkstra (edges) "
+                             "or all-pairs Floyd-Warshall (fw, O(n^3))")
+    parser.add_argument("--profile_stretch", action="store_true",
+                        help="Profile the stretch distribution (mean, percentiles, worst pairs) "
+                             "of generated graphs, or of --graph")
+    parser.add_argument("--variants", nargs="+", choices=VARIANTS, default=None,
+                        help="Compare these spanner variants on the same generated graphs (or --graph): "
+                             "size, time and stretch side by side")
+    parser.add_argument("--sources", type=int, default=None,
+                        help="Sampled sources for --profile_stretch and --variants (default: all vertices) "
+                             "and --oracle (default: 20)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for --profile_stretch and --variants (default: CPU count)")
+    parser.add_argument("--graph", default=None,
+                        help="Validate on this graph file instead of generated ones "
+                             "(binary .tsg, text, SNAP, DIMACS .gr or Matrix Market .mtx)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse generated graphs, spanners, timings and verdicts from an on-disk cache "
+                             "(hits across runs need a fixed --seed)")
+    parser.add_argument("--cache_dir", default=cache.CACHE_DIR, help="Cache directory (default: .cache)")
+    parser.add_argument("--results", default=resultstore.RESULTS_PATH,
+                        help="Append every measured run to this SQLite store, which report.py plots from "
+                             "(default: results.db; empty keeps it in memory)")
+    parser.add_argument("--show", action="store_true",
+                        help="Also show the plots in a window (they are always saved under plots/)")
+    parser.add_argument("--cache_max_mb", type=int, default=cache.DEFAULT_MAX_BYTES >> 20,
+                        help="Evict least recently used cache entries beyond this size (default: 2048)")
     
     # Add plot parameters
     parser.add_argument("--plot", action="store_true", help="Generate comparison plot")
@@ -212,6 +738,24 @@ def main():
     
     # Add time analysis option
     parser.add_argument("--plot_time", action="store_true", help="Generate time analysis plot")
+    parser.add_argument("--plot_scaling", action="store_true",
+                        help="Generate a strong-scaling plot of the engine over --threads_values at fixed n")
+    parser.add_argument("--plot_resources", action="store_true",
+                        help="Plot peak RSS, CPU time, page faults and context switches of the generator, "
+                             "spanner and checker processes against n for every --t_values (bypasses --cache)")
+    parser.add_argument("--threads_values", type=int, nargs="*",
+                        help="Thread counts for --plot_scaling (default: powers of two up to the CPU count)")
+    parser.add_argument("--dynamic", action="store_true",
+                        help="Maintain the spanner under random batches of edge insertions and deletions "
+                             "and check the final spanner")
+    parser.add_argument("--oracle", action="store_true",
+                        help="Build the Thorup-Zwick distance oracle of generated graphs and benchmark "
+                             "its query throughput and stretch")
+    parser.add_argument("--queries", type=int, default=1000000, help="Random query pairs for --oracle")
+    parser.add_argument("--update_batches", type=int, default=10, help="Update batches for --dynamic")
+    parser.add_argument("--batch_size", type=int, default=100, help="Updates per batch for --dynamic")
+    parser.add_argument("--delete_fraction", type=float, default=0.5,
+                        help="Fraction of the --dynamic updates that are deletions (default: 0.5)")
     
     args = parser.parse_args()
 
@@ -224,6 +768,25 @@ def main():
         print("Failed to compile checker.cpp")
         return
     
+    if not compile_cpp("measure.cpp", "measure_exec"):
+        print("Failed to compile measure.cpp")
+        return
+    
+    # Test case i of a graph configuration gets the same seed in every mode
+    # and for every t, whichever worker runs it
+    base_seed = args.seed if args.seed is not None else scheduler.random_seed()
+    if args.seed is None:
+        print(f"Base seed: {base_seed} (pass --seed {base_seed} to reproduce)")
+    store = cache.ResultCache(args.cache_dir, args.cache_max_mb << 20) if args.cache else None
+    
+    # Every case is recorded as it comes back; plots are built from the store
+    results_store = resultstore.ResultStore(args.results or ":memory:")
+    sweep = results_store.new_sweep(sweep_mode(args), dict(vars(args), base_seed=base_seed))
+    
+    def record(case, i, n, m, t, max_w, seed, threads=args.threads, extra=None):
+        results_store.add_run(sweep, case, extra, case_index=i, engine=args.engine, n=n, m=m, t=t,
+                              max_w=max_w, seed=seed, threads=threads)
+    
     if args.plot_weights:
         # Generate a sequence of max_w values
         w_values = []
@@ -236,11 +799,17 @@ def main():
         t_values = args.t_values if args.t_values else [3, 5, 7]
         n = args.n
         
-        plt.figure(figsize=(10, 6))
+        # Calculate m based on n if not specified
+        m = args.m if args.m is not None else n * (n - 1) // 2
+        
+        # One job per (max_w, test case) graph, building its spanners for every t in one launch
+        jobs = [((n, m, t_values, max_w, args.engine, scheduler.job_seed(base_seed, n, m, max_w, i), args.check_mode),
+                 {"store": store, "threads": args.threads})
+                for max_w in w_values for i in range(args.test_cases)]
+        batches = iter(scheduler.run_jobs(run_batch_case, jobs, args.jobs, args.pin))
+        cases = {(max_w, i): next(batches) for max_w in w_values for i in range(args.test_cases)}
         
         for t in t_values:
-            spanner_edges_by_weight = []
-            
             for max_w in w_values:
                 print(f"\nTesting with n={n}, t={t}, max_w={max_w}")
                 
@@ -248,53 +817,24 @@ def main():
                 spanner_edges = []
                 
                 for i in range(args.test_cases):
-                    # Calculate m based on n if not specified
-                    m = args.m if args.m is not None else n * (n - 1) // 2
-                    
-                    # Generate graph and run algorithm
-                    original_graph = run_generator(n, m, t, max_w)
-                    if not original_graph:
+                    case = cases[(max_w, i)][t_values.index(t)]
+                    record(case, i, n, m, t, max_w, scheduler.job_seed(base_seed, n, m, max_w, i))
+                    if not case:
                         continue
                     
-                    spanner_output = run_t_spanner(original_graph)
-                    if not spanner_output:
-                        continue
-                    
-                    # Extract edge count
-                    _, spanner_m = parse_graph_info(spanner_output)
-                    
-                    if spanner_m is not None:
-                        spanner_edges.append(spanner_m)
+                    if case["spanner_m"] is not None:
+                        spanner_edges.append(case["spanner_m"])
                         
-                    # Check if spanner is valid
-                    result = run_checker(original_graph, spanner_output)
-                    is_valid = result == "YES"
+                    is_valid = case["valid"]
                     print(f"  Test case {i+1}: {'Valid' if is_valid else 'Invalid'} t-spanner")
                 
                 if spanner_edges:
                     avg_spanner_m = sum(spanner_edges) / len(spanner_edges)
-                    spanner_edges_by_weight.append(avg_spanner_m)
                     print(f"  Average spanner edges: {avg_spanner_m:.1f}")
                 else:
                     print(f"  No valid data for max_w={max_w}")
-                    spanner_edges_by_weight.append(None)
-            
-            # Plot the line for this t value
-            plt.plot(w_values, spanner_edges_by_weight, marker='o', label=f't={t}')
-        
-        plt.xlabel('Maximum Edge Weight')
-        plt.ylabel('Number of Edges in t-Spanner')
-        plt.title(f'Effect of Edge Weight on Spanner Size (n={n})')
-        plt.legend()
-        plt.grid(True)
-        
-        # Create plots directory if it doesn't exist
-        os.makedirs('plots', exist_ok=True)
-        
-        filename = f'plots/weight_comparison_n{n}.png'
-        plt.savefig(filename)
-        print(f"Plot saved to '{filename}'")
-        plt.show()
+        
+        report.report_sweep(results_store, sweep, args.show)
     
     elif args.plot:
         # Generate a sequence of n values based on growth or addition factor
@@ -322,8 +862,15 @@ def main():
             # Linear spacing between min_n and max_n
             n_values = [int(n) for n in np.linspace(args.min_n, args.max_n, args.steps)]
         
-        original_m_values = []
-        spanner_m_values = []
+        def sweep_job(n, i):
+            # Calculate m and max_w based on n if not specified
+            m = args.m if args.m is not None else n * (n - 1) // 2
+            max_w = args.max_w if args.max_w is not None else n
+            seed = scheduler.job_seed(base_seed, n, m, max_w, i)
+            return (n, m, args.t, max_w, args.engine, seed, args.check_mode), {"store": store, "threads": args.threads}
+        
+        jobs = [sweep_job(n, i) for n in n_values for i in range(args.test_cases)]
+        results = scheduler.run_jobs(run_case, jobs, args.jobs, args.pin)
         
         for n in n_values:
             print(f"\nTesting with n={n}")
@@ -333,47 +880,30 @@ def main():
             spanner_edges = []
             
             for i in range(args.test_cases):
-                # Calculate m based on n if not specified
-                m = args.m if args.m is not None else n * (n - 1) // 2
-                max_w = args.max_w if args.max_w is not None else n
-                
-                # Generate graph and run algorithm
-                original_graph = run_generator(n, m, args.t, max_w)
-                if not original_graph:
+                # Generate graph, run algorithm and check the spanner
+                case = next(results)
+                _, m, t, max_w, _, seed, _ = sweep_job(n, i)[0]
+                record(case, i, n, m, t, max_w, seed)
+                if not case:
                     continue
                 
-                spanner_output = run_t_spanner(original_graph)
-                if not spanner_output:
-                    continue
-                
-                # Extract edge counts
-                _, orig_m = parse_graph_info(original_graph)
-                _, spanner_m = parse_graph_info(spanner_output)
-                
+                orig_m, spanner_m = case["orig_m"], case["spanner_m"]
                 if orig_m is not None and spanner_m is not None:
                     orig_edges.append(orig_m)
                     spanner_edges.append(spanner_m)
                     
-                # Check if spanner is valid
-                result = run_checker(original_graph, spanner_output)
-                is_valid = result == "YES"
+                is_valid = case["valid"]
                 print(f"  Test case {i+1}: {'Valid' if is_valid else 'Invalid'} t-spanner")
                 
             if orig_edges and spanner_edges:
                 avg_orig_m = sum(orig_edges) / len(orig_edges)
                 avg_spanner_m = sum(spanner_edges) / len(spanner_edges)
-                
-                original_m_values.append(avg_orig_m)
-                spanner_m_values.append(avg_spanner_m)
-                
                 print(f"  Average edges - Original: {avg_orig_m:.1f}, T-Spanner: {avg_spanner_m:.1f}")
             else:
                 print(f"  No valid data for n={n}")
         
-        if original_m_values and spanner_m_values:
-            plot_edge_comparison(n_values, original_m_values, spanner_m_values, args.t)
-        else:
-            print("No data to plot. Try different parameters or check for errors ")        
+        if not report.report_sweep(results_store, sweep, args.show):
+            print("No data to plot. Try different parameters or check for errors ")
     
     elif args.plot_time:
         # Generate a sequence of n values
@@ -382,42 +912,48 @@ def main():
         # Use provided t_values or default
         t_values = args.t_values if args.t_values else [3, 5, 7]
         
-        # Dictionary to store timing data for each t value
-        phase1_times = {t: [] for t in t_values}
-        phase2_times = {t: [] for t in t_values}
-        total_times = {t: [] for t in t_values}
+        def timing_job(n, i):
+            # Calculate m and max_w based on n if not specified
+            m = args.m if args.m is not None else n * (n - 1) // 2
+            max_w = args.max_w if args.max_w is not None else n
+            seed = scheduler.job_seed(base_seed, n, m, max_w, i)
+            return (n, m, t_values, max_w, args.engine, seed), {"check": None, "store": store, "threads": args.threads}
+        
+        # One job per (n, test case) graph, timing every t in one launch
+        jobs = [timing_job(n, i) for n in n_values for i in range(args.test_cases)]
+        results = scheduler.run_jobs(run_batch_case, jobs, args.jobs, args.pin)
         
         for n in n_values:
             print(f"\nTesting with n={n}")
+            batches = [next(results) for _ in range(args.test_cases)]
             
-            for t in t_values:
+            for ti, t in enumerate(t_values):
                 print(f"  Running with t={t}")
                 
-                # Calculate m based on n if not specified
-                m = args.m if args.m is not None else n * (n - 1) // 2
-                max_w = args.max_w if args.max_w is not None else n
-                
                 # Run multiple test cases and average the times
                 phase1_time_sum = 0
                 phase2_time_sum = 0
                 total_time_sum = 0
+                step_time_sums = None
                 valid_runs = 0
                 
                 for i in range(args.test_cases):
-                    # Generate graph and run algorithm with timing
-                    original_graph = run_generator(n, m, t, max_w)
-                    if not original_graph:
-                        continue
-                    
-                    spanner_output, timing_info = run_t_spanner_with_timing(original_graph)
-                    if not spanner_output or not timing_info:
+                    case = batches[i][ti]
+                    _, m, _, max_w, _, seed = timing_job(n, i)[0]
+                    record(case, i, n, m, t, max_w, seed,
+                           extra={"steps": step_times(case["timing"])} if case and case["timing"] else None)
+                    if not case or not case["timing"]:
                         continue
+                    timing_info = case["timing"]
                     
                     if all(key in timing_info for key in ['phase1', 'phase2', 'total']):
                         phase1_time_sum += timing_info['phase1']
                         phase2_time_sum += timing_info['phase2']
                         total_time_sum += timing_info['total']
                         valid_runs += 1
+                        steps = step_times(timing_info)
+                        if steps:
+                            step_time_sums = [a + b for a, b in zip(step_time_sums or [0] * len(steps), steps)]
                         
                         if args.verbose:
                             print(f"    Run {i+1}: Phase1={timing_info['phase1']}μs, "
@@ -429,32 +965,258 @@ def main():
                     avg_phase1 = phase1_time_sum / valid_runs
                     avg_phase2 = phase2_time_sum / valid_runs
                     avg_total = total_time_sum / valid_runs
-                    
-                    phase1_times[t].append(avg_phase1)
-                    phase2_times[t].append(avg_phase2)
-                    total_times[t].append(avg_total)
-                    
                     print(f"    Average times for t={t}: Phase1={avg_phase1:.1f}μs, "
                           f"Phase2={avg_phase2:.1f}μs, Total={avg_total:.1f}μs")
+                    
+                    if args.verbose and step_time_sums:
+                        print("    Average step times: " + ", ".join(
+                            f"{label}={x / valid_runs:.1f}μs" for label, x in zip(report.STEP_LABELS, step_time_sums)))
                 else:
                     print(f"    No valid timing data for n={n}, t={t}")
-                    # Append None or 0 to maintain alignment with n_values
-                    phase1_times[t].append(None)
-                    phase2_times[t].append(None)
-                    total_times[t].append(None)
         
         # Generate plots
-        if any(all(x is not None for x in times) for times in phase1_times.values()):
-            plot_time_comparison(n_values, phase1_times, 
-                               f"T-Spanner Phase 1 Execution Time")
+        report.report_sweep(results_store, sweep, args.show)
+    
+    elif args.plot_resources:
+        n_values = [int(n) for n in np.linspace(args.min_n, args.max_n, args.steps)]
+        t_values = args.t_values if args.t_values else [3, 5, 7]
+        
+        def resource_job(n, t, i):
+            # Calculate m and max_w based on n if not specified
+            m = args.m if args.m is not None else n * (n - 1) // 2
+            max_w = args.max_w if args.max_w is not None else n
+            seed = scheduler.job_seed(base_seed, n, m, max_w, i)
+            return (n, m, t, max_w, args.engine, seed, args.check_mode), {"threads": args.threads}
+        
+        # One pipeline per (n, t, test case); no store, since a cache hit skips the stage being measured
+        jobs = [resource_job(n, t, i) for n in n_values for t in t_values for i in range(args.test_cases)]
+        results = scheduler.run_jobs(run_case, jobs, args.jobs, args.pin)
+        
+        usage_by_stage = {stage: {t: [] for t in t_values} for stage in STAGES}
+        for n in n_values:
+            print(f"\nProfiling n={n}")
+            for t in t_values:
+                cases = []
+                for i in range(args.test_cases):
+                    case = next(results)
+                    _, m, _, max_w, _, seed, _ = resource_job(n, t, i)[0]
+                    record(case, i, n, m, t, max_w, seed)
+                    if case:
+                        cases.append(case)
+                for stage in STAGES:
+                    usage = rusage.mean_usage(case["usage"][stage] for case in cases)
+                    usage_by_stage[stage][t].append(usage)
+                    if usage:
+                        print(f"  t={t} {stage}: {rusage.format_usage(usage)}")
+        
+        if any(any(rows) for by_t in usage_by_stage.values() for rows in by_t.values()):
+            report.report_sweep(results_store, sweep, args.show)
+        else:
+            print("No resource usage measured (the lib engine runs generator and spanner in-process)")
+    
+    elif args.plot_scaling:
+        n = args.n
+        m = args.m if args.m is not None else n * (n - 1) // 2
+        max_w = args.max_w if args.max_w is not None else n
+        thread_values = args.threads_values
+        if not thread_values:
+            cpus = len(scheduler.available_cpus())
+            thread_values = [1 << i for i in range(cpus.bit_length()) if 1 << i <= cpus]
+            if thread_values[-1] != cpus:
+                thread_values.append(cpus)
+        if args.jobs > 1:
+            print("Warning: --jobs > 1 makes the runs compete for cores; use --jobs 1 for scaling")
+        
+        # Every thread count builds the spanner of the same graphs with the same seeds
+        jobs = [((n, m, args.t, max_w, args.engine, scheduler.job_seed(base_seed, n, m, max_w, i)),
+                 {"check": None, "store": store, "threads": threads})
+                for threads in thread_values for i in range(args.test_cases)]
+        results = scheduler.run_jobs(run_case, jobs, args.jobs, args.pin)
         
-        if any(all(x is not None for x in times) for times in phase2_times.values()):
-            plot_time_comparison(n_values, phase2_times, 
-                               f"T-Spanner Phase 2 Execution Time")
+        times_by_phase = {phase: [] for phase in ('phase1', 'phase2', 'total')}
+        print(f"Strong scaling with n={n}, m={m}, t={args.t}")
+        for threads in thread_values:
+            timings = []
+            for i in range(args.test_cases):
+                case = next(results)
+                record(case, i, n, m, args.t, max_w, scheduler.job_seed(base_seed, n, m, max_w, i), threads)
+                if case and case["timing"]:
+                    timings.append(case["timing"])
+            for phase, times in times_by_phase.items():
+                times.append(float(np.median([x[phase] for x in timings])) if timings else None)
+            print(f"  threads={threads}: " + ", ".join(
+                f"{phase}={times[-1]:.0f}μs" for phase, times in times_by_phase.items() if times[-1] is not None))
         
-        if any(all(x is not None for x in times) for times in total_times.values()):
-            plot_time_comparison(n_values, total_times, 
-                               f"T-Spanner Total Execution Time")
+        if all(x is not None for x in times_by_phase['total']):
+            report.report_sweep(results_store, sweep, args.show)
+    
+    elif args.dynamic:
+        n = args.n
+        m = args.m if args.m is not None else n * (n - 1) // 2
+        max_w = args.max_w if args.max_w is not None else n
+        print(f"Maintaining {args.t}-spanners of n={n}, m={m} under {args.update_batches} batches "
+              f"of {args.batch_size} updates")
+        
+        jobs = [((n, m, args.t, max_w, args.update_batches, args.batch_size, args.delete_fraction,
+                  scheduler.job_seed(base_seed, n, m, max_w, i), args.check_mode), {"threads": args.threads})
+                for i in range(args.test_cases)]
+        successful_cases = 0
+        for i, case in enumerate(scheduler.run_jobs(run_dynamic_case, jobs, args.jobs, args.pin)):
+            record(case, i, n, m, args.t, max_w, jobs[i][0][-2],
+                   extra={"index": case["timing"]["index"], "batches": case["batches"]} if case else None)
+            if not case:
+                continue
+            timing = case["timing"]
+            latencies = [b["us"] for b in case["batches"]]
+            print(f"\nTest case {i+1}: {case['orig_m']} edges, build {timing['total']}μs, "
+                  f"certificate index {timing['index']}μs")
+            if latencies:
+                print(f"  Batch latency: median {np.median(latencies):.0f}μs, max {max(latencies)}μs, "
+                      f"{np.mean(latencies) / max(args.batch_size, 1):.1f}μs per update")
+                print(f"  Rechecked {sum(b['rechecked'] for b in case['batches'])} edges "
+                      f"({sum(b['searched'] for b in case['batches'])} by search), "
+                      f"promoted {sum(b['promoted'] for b in case['batches'])} into the spanner")
+            if args.verbose:
+                for b in case["batches"]:
+                    print(f"    Batch {b['batch']}: {b['us']}μs, +{b['inserted']} -{b['deleted']}, "
+                          f"{b['edges']} spanner edges")
+            if case["valid"]:
+                successful_cases += 1
+                print(f"✅ Final spanner valid ({case['spanner_m']} edges)")
+            else:
+                print(f"❌ Final spanner invalid")
+        
+        print(f"\nSummary: {successful_cases}/{args.test_cases} valid t-spanners")
+    
+    elif args.oracle:
+        n = args.n
+        m = args.m if args.m is not None else n * (n - 1) // 2
+        max_w = args.max_w if args.max_w is not None else n
+        k = (args.t + 1) // 2
+        print(f"Benchmarking distance oracles of n={n}, m={m}, t={args.t} "
+              f"(stretch bound {2 * k - 1}) with {args.queries} queries")
+        
+        jobs = [((n, m, args.t, max_w, args.queries, args.sources, args.engine,
+                  scheduler.job_seed(base_seed, n, m, max_w, i)), {"threads": args.threads})
+                for i in range(args.test_cases)]
+        for i, case in enumerate(scheduler.run_jobs(run_oracle_case, jobs, args.jobs, args.pin)):
+            record(case, i, n, m, args.t, max_w, jobs[i][0][-1], extra={
+                "oracle": case["timing"]["oracle"], "bunch": case["timing"]["bunch"],
+                **{key: case[key] for key in ("oracle_bytes", "qps", "sssp_qps", "stretch_mean", "stretch_max")},
+            } if case else None)
+            if not case:
+                continue
+            timing = case["timing"]
+            print(f"\nTest case {i+1}: {case['orig_m']} -> {case['spanner_m']} edges")
+            print(f"  Build: spanner {timing['total']}μs, oracle {timing['oracle']}μs, "
+                  f"{timing['bunch']} bunch entries ({timing['bunch'] / max(n, 1):.1f} per vertex), "
+                  f"{case['oracle_bytes'] / 2**20:.2f} MB")
+            print(f"  Queries: {case['qps']:.0f}/s batched vs {case['sssp_qps']:.1f}/s by Dijkstra "
+                  f"on the spanner ({case['qps'] / case['sssp_qps']:.0f}x)")
+            print(f"  Stretch: mean {case['stretch_mean']:.3f}, max {case['stretch_max']:.3f}")
+            if case["stretch_max"] > 2 * k - 1:
+                print(f"❌ Stretch above the bound {2 * k - 1}")
+    
+    elif args.variants:
+        n = args.n
+        m = args.m if args.m is not None else n * (n - 1) // 2
+        max_w = args.max_w if args.max_w is not None else n
+        source = args.graph if args.graph else f"generated graphs with n={n}, m={m}"
+        print(f"Comparing variants {', '.join(args.variants)} on {args.test_cases} {source}, t={args.t}")
+        
+        by_variant = {variant: [] for variant in args.variants}
+        for i in range(args.test_cases):
+            seed = scheduler.job_seed(base_seed, args.graph or n, m, max_w, i)
+            cases = run_variant_case(n, m, args.t, max_w, args.variants, args.sources, args.workers,
+                                     args.engine, seed, args.check_mode, args.threads, args.graph)
+            if cases is None:
+                continue
+            print(f"\nTest case {i+1}:")
+            for variant, case in zip(args.variants, cases):
+                extra = {"variant": variant}
+                if case:
+                    extra["post"] = case["timing"].get("post")
+                    extra["stretch"] = {key: case["stretch"][key] for key in ("mean", "max", "percentiles", "above_t")}
+                record(case, i, None if args.graph else n, case and case["orig_m"], args.t,
+                       None if args.graph else max_w, seed, extra=extra)
+                if not case:
+                    print(f"  {variant}: failed")
+                    continue
+                by_variant[variant].append(case)
+                print(f"  {variant}: {case['orig_m']} -> {case['spanner_m']} edges, {case['timing']['total']}μs, "
+                      f"stretch mean {case['stretch']['mean'] or 0:.4f} max {case['stretch']['max']:.4f}"
+                      + ("" if case["valid"] is None else " ✅" if case["valid"] else " ❌ invalid"))
+        
+        # Averages over the test cases, one row per variant
+        print(f"\n{'variant':<8} {'edges':>10} {'kept':>7} {'total μs':>10} {'post μs':>9} "
+              f"{'mean':>7} {'max':>7} {'valid':>6}")
+        for variant, cases in by_variant.items():
+            if not cases:
+                print(f"{variant:<8} {'-':>10}")
+                continue
+            edges = np.mean([c["spanner_m"] for c in cases])
+            kept = np.mean([c["spanner_m"] / max(c["orig_m"], 1) for c in cases])
+            total = np.mean([c["timing"]["total"] for c in cases])
+            post = np.mean([c["timing"].get("post", 0) for c in cases])
+            mean = np.mean([c["stretch"]["mean"] or 1.0 for c in cases])
+            worst = max(c["stretch"]["max"] for c in cases)
+            valid = sum(bool(c["valid"]) for c in cases)
+            print(f"{variant:<8} {edges:>10.1f} {kept:>7.1%} {total:>10.0f} {post:>9.0f} "
+                  f"{mean:>7.4f} {worst:>7.3f} {valid:>3}/{len(cases)}")
+    
+    elif args.profile_stretch:
+        import stretch
+        
+        n = args.n
+        m = args.m if args.m is not None else n * (n - 1) // 2
+        max_w = args.max_w if args.max_w is not None else n
+        source = args.graph if args.graph else f"generated graphs with n={n}, m={m}"
+        print(f"Profiling stretch of {args.test_cases} spanners of {source}, t={args.t}")
+        
+        for i in range(args.test_cases):
+            seed = scheduler.job_seed(base_seed, args.graph or n, m, max_w, i)
+            with tempfile.TemporaryDirectory() as tmp:
+                if args.graph:
+                    graph_path = graphio.import_graph(args.graph, t=args.t)
+                else:
+                    graph_path = os.path.join(tmp, "graph.tsg")
+                    if generate_graph_file(graph_path, n, m, args.t, max_w, args.engine, seed) is None:
+                        continue
+                spanner_path = os.path.join(tmp, "spanner.tsg")
+                if run_spanner_file(graph_path, spanner_path, args.t, args.engine, seed, args.threads) is None:
+                    continue
+                
+                _, orig_m, _, _ = graphio.read_header(graph_path)
+                _, spanner_m, _, _ = graphio.read_header(spanner_path)
+                print(f"\nTest case {i+1}: {orig_m} -> {spanner_m} edges")
+                summary = stretch.profile_stretch(graph_path, spanner_path, args.sources, args.workers,
+                                                  seed, t=args.t)
+                stretch.print_summary(summary)
+                record({"orig_m": orig_m, "spanner_m": spanner_m}, i, n, m, args.t, max_w, seed,
+                       extra={"stretch": summary})
+    
+    elif args.graph:
+        print(f"Running {args.test_cases} test cases on {args.graph} with t={args.t}")
+        
+        jobs = [((args.graph, args.t, args.engine, scheduler.job_seed(base_seed, args.graph, i), args.check_mode),
+                 {"store": store, "threads": args.threads})
+                for i in range(args.test_cases)]
+        if args.jobs > 1:
+            # Convert once up front instead of racing on the import cache
+            graphio.import_graph(args.graph, t=args.t)
+        
+        successful_cases = 0
+        for i, case in enumerate(scheduler.run_jobs(run_file_case, jobs, args.jobs, args.pin)):
+            record(case, i, None, case and case["orig_m"], args.t, None, jobs[i][0][3])
+            if not case:
+                continue
+            if case["valid"]:
+                successful_cases += 1
+                print(f"✅ Test case {i+1}: Valid t-spanner ({case['orig_m']} -> {case['spanner_m']} edges)")
+            else:
+                print(f"❌ Test case {i+1}: Invalid t-spanner")
+        
+        print(f"\nSummary: {successful_cases}/{args.test_cases} valid t-spanners")
     
     else:
         if args.m is None:
@@ -469,25 +1231,26 @@ def main():
         
         print(f"Running {args.test_cases} test cases with n={args.n}, t={args.t}")
         
+        # Generate random graphs, run t-spanner algorithm and verify using checker
+        jobs = [((args.n, args.m, args.t, args.max_w, args.engine,
+                  scheduler.job_seed(base_seed, args.n, args.m, args.max_w, i), args.check_mode),
+                 {"keep_text": args.verbose, "store": store, "threads": args.threads})
+                for i in range(args.test_cases)]
+        results = scheduler.run_jobs(run_case, jobs, args.jobs, args.pin)
+        
         successful_cases = 0
         for i in range(args.test_cases):
             print(f"\nTest case {i+1}/{args.test_cases}:")
             
-            # Generate random graph
-            original_graph = run_generator(args.n, args.m, args.t, args.max_w)
-            if args.verbose:
+            case = next(results)
+            record(case, i, args.n, args.m, args.t, args.max_w, jobs[i][0][5])
+            if args.verbose and case:
                 print("Original graph:")
-                print(original_graph)
-            
-            # Run t-spanner algorithm
-            spanner_output = run_t_spanner(original_graph)
-            if args.verbose:
+                print(case["graph"])
                 print("T-spanner output:")
-                print(spanner_output)
+                print(case["spanner"])
             
-            # Verify using checker
-            result = run_checker(original_graph, spanner_output)
-            is_valid = result == "YES"
+            is_valid = bool(case and case["valid"])
             
             if is_valid:
                 successful_cases += 1
@@ -496,7 +1259,10 @@ def main():
                 print(f"❌ Test case {i+1}: Invalid t-spanner")
             
             if args.verbose:
-                print(f"Checker output: {result}")
+                print(f"Checker output: {'YES' if is_valid else 'NO'}")
+                for stage in STAGES:
+                    if case and case["usage"][stage]:
+                        print(f"  {stage}: {rusage.format_usage(case['usage'][stage])}")
         
         print(f"\nSummary: {successful_cases}/{args.test_cases} valid t-spanners")
 
@@ -0,0 +1,57 @@
+#include "bits/stdc++.h"
+#include <fcntl.h>
+#include <signal.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+#include <unistd.h>
+using namespace std;
+
+// Runs a command and writes its resource usage to a file descriptor:
+//
+//   measure_exec FD command [args...]
+//
+// One line "maxrss utime stime nvcsw nivcsw minflt majflt" goes to FD once
+// the command exits (ru_maxrss unscaled, times in seconds), and the exit
+// status is passed through. The command is forked from this small process
+// rather than from the harness: Linux carries a process's peak RSS across
+// exec, so a child forked from a large Python process would report at least
+// the parent's RSS.
+
+signed main(int argc, char** argv) {
+    if (argc < 3) {
+        fprintf(stderr, "usage: %s FD command [args...]\n", argv[0]);
+        return 127;
+    }
+    int fd = atoi(argv[1]);
+    fcntl(fd, F_SETFD, FD_CLOEXEC);
+
+    pid_t pid = fork();
+    if (pid < 0) {
+        perror("fork");
+        return 127;
+    }
+    if (pid == 0) {
+        execvp(argv[2], argv + 2);
+        perror(argv[2]);
+        _exit(127);
+    }
+
+    int status = 0;
+    struct rusage ru;
+    while (wait4(pid, &status, 0, &ru) < 0) {
+        if (errno != EINTR) return 127;
+    }
+    dprintf(fd, "%ld %ld.%06ld %ld.%06ld %ld %ld %ld %ld\n", ru.ru_maxrss,
+            (long)ru.ru_utime.tv_sec, (long)ru.ru_utime.tv_usec,
+            (long)ru.ru_stime.tv_sec, (long)ru.ru_stime.tv_usec,
+            ru.ru_nvcsw, ru.ru_nivcsw, ru.ru_minflt, ru.ru_majflt);
+    close(fd);
+
+    if (WIFSIGNALED(status)) {
+        // Die the same way, so the harness sees the signal
+        signal(WTERMSIG(status), SIG_DFL);
+        kill(getpid(), WTERMSIG(status));
+        return 128 + WTERMSIG(status);
+    }
+    return WEXITSTATUS(status);
+}
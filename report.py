@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""Build the plots of main.py sweeps from the results store.
+
+main.py records every measured case in the store (resultstore.py) and renders
+its plots through this module, so a plot can be redrawn or changed later
+without rerunning the sweep:
+
+    python report.py                 # latest sweep of every plotting mode
+    python report.py --sweep 12      # one stored sweep
+    python report.py --list          # stored sweeps
+
+matplotlib is only imported when a plot is drawn, with the headless Agg
+backend unless the plots are shown.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+import resultstore
+import rusage
+
+STEP_LABELS = ["Step 1 (sampling)", "Step 2 (nearest sampled cluster)",
+               "Step 3 (join and prune)", "Step 4 (intra-cluster edges)", "Phase 2"]
+
+PLOTS_DIR = "plots"
+
+
+def pyplot(show=False):
+    """matplotlib.pyplot, imported on first use; headless unless plots are shown."""
+    import matplotlib
+    if not show:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def save(plt, fig, filename, show=False):
+    """Save fig under plots/, then show it (blocking) or close it."""
+    # Create plots directory if it doesn't exist
+    os.makedirs(PLOTS_DIR, exist_ok=True)
+
+    path = os.path.join(PLOTS_DIR, filename)
+    fig.savefig(path)
+    print(f"Plot saved to '{path}'")
+    if show:
+        plt.show()
+    plt.close(fig)
+    return path
+
+
+def plot_edge_comparison(n_values, original_m_values, spanner_m_values, t, show=False):
+    """Plot a comparison of original and spanner edge counts."""
+    plt = pyplot(show)
+    fig = plt.figure(figsize=(10, 6))
+    plt.plot(n_values, original_m_values, 'b-o', label='Original Graph Edges')
+    plt.plot(n_values, spanner_m_values, 'r-o', label='T-Spanner Edges')
+
+    plt.xlabel('Number of Vertices (n)')
+    plt.ylabel('Number of Edges (m)')
+    plt.title(f'Comparison of Edge Counts between Original Graph and {t}-Spanner')
+    plt.legend()
+    plt.grid(True)
+
+    # Add annotations for the edge reduction percentage
+    if len(n_values) <= 10:
+        for i in range(len(n_values)):
+            if original_m_values[i] > 0:
+                reduction = 100 * (1 - spanner_m_values[i] / original_m_values[i])
+                plt.annotate(f"{reduction:.1f}%",
+                            xy=(n_values[i], (original_m_values[i] + spanner_m_values[i])/2),
+                            xytext=(5, 0),
+                            textcoords='offset points')
+
+    # Include t in the filename
+    return save(plt, fig, f'edge_comparison_t{t}.png', show)
+
+
+def plot_weight_comparison(w_values, spanner_edges_by_t, n, show=False):
+    """Plot the spanner size against the maximum edge weight, one line per t."""
+    plt = pyplot(show)
+    fig = plt.figure(figsize=(10, 6))
+
+    for t, spanner_edges_by_weight in spanner_edges_by_t.items():
+        plt.plot(w_values, spanner_edges_by_weight, marker='o', label=f't={t}')
+
+    plt.xlabel('Maximum Edge Weight')
+    plt.ylabel('Number of Edges in t-Spanner')
+    plt.title(f'Effect of Edge Weight on Spanner Size (n={n})')
+    plt.legend()
+    plt.grid(True)
+
+    return save(plt, fig, f'weight_comparison_n{n}.png', show)
+
+
+def plot_time_comparison(n_values, time_values_by_t, title, show=False):
+    """Plot a comparison of time taken for different t values."""
+    plt = pyplot(show)
+    fig = plt.figure(figsize=(12, 7))
+
+    for t, time_data in time_values_by_t.items():
+        plt.plot(n_values, time_data, marker='o', linewidth=2, label=f't={t}')
+
+    plt.xlabel('Number of Vertices (n)')
+    plt.ylabel('Time (microseconds)')
+    plt.title(title)
+    plt.legend()
+    plt.grid(True)
+
+    # Use log scale if values span multiple orders of magnitude
+    if max((x for times in time_values_by_t.values() for x in times if x is not None), default=0) > 1000:
+        plt.yscale('log')
+
+    # Generate filename based on title
+    safe_title = title.lower().replace(' ', '_')
+    return save(plt, fig, f'{safe_title}.png', show)
+
+
+def plot_step_breakdown(n_values, step_times_by_t, show=False):
+    """Plot the time of each clustering step against n, one panel per t."""
+    plt = pyplot(show)
+    fig, axes = plt.subplots(1, len(step_times_by_t), figsize=(6 * len(step_times_by_t), 6),
+                             squeeze=False, sharey=True)
+
+    for ax, (t, rows) in zip(axes[0], step_times_by_t.items()):
+        for s, label in enumerate(STEP_LABELS):
+            ax.plot(n_values, [row[s] if row else None for row in rows], marker='o', label=label)
+        ax.set_title(f't={t}')
+        ax.set_xlabel('Number of Vertices (n)')
+        ax.grid(True)
+    axes[0][0].set_ylabel('Time (microseconds)')
+    axes[0][0].legend()
+    fig.suptitle('T-Spanner Time per Step')
+
+    return save(plt, fig, 't-spanner_step_breakdown.png', show)
+
+
+def plot_scaling(thread_values, times_by_phase, n, t, show=False):
+    """Plot the speedup of each phase over the single-thread time against the thread count."""
+    plt = pyplot(show)
+    fig = plt.figure(figsize=(10, 6))
+
+    for phase, times in times_by_phase.items():
+        base = times[0]
+        plt.plot(thread_values, [base / x if base and x else None for x in times],
+                 marker='o', linewidth=2, label=phase)
+    plt.plot(thread_values, [p / thread_values[0] for p in thread_values], 'k--', label='ideal')
+
+    plt.xlabel('Threads')
+    plt.ylabel(f'Speedup over {thread_values[0]} thread(s)')
+    plt.title(f'T-Spanner Strong Scaling (n={n}, t={t})')
+    plt.legend()
+    plt.grid(True)
+
+    return save(plt, fig, f'strong_scaling_n{n}_t{t}.png', show)
+
+
+def plot_resources(n_values, usage_by_stage, show=False):
+    """Plot peak RSS, CPU time, page faults and context switches of every stage against n.
+
+    usage_by_stage maps stage -> t -> one averaged usage dict (or None) per
+    n. Each stage gets a colour and each t a line style; the generator does
+    not depend on t, so it is drawn once, averaged over t.
+    """
+    plt = pyplot(show)
+    panels = [("Peak RSS (MB)", lambda u: u["peak_rss"] / 2**20),
+              ("CPU time, user + sys (s)", lambda u: u["user"] + u["sys"]),
+              ("Page faults, minor + major", lambda u: u["minflt"] + u["majflt"]),
+              ("Context switches, vol + invol", lambda u: u["vcsw"] + u["ivcsw"])]
+    colors = {"generator": "tab:green", "spanner": "tab:blue", "checker": "tab:red"}
+    styles = ['-', '--', ':', '-.']
+    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+    for ax, (label, value) in zip(axes.flat, panels):
+        for stage, by_t in usage_by_stage.items():
+            if stage == "generator":
+                rows = [rusage.mean_usage(col) for col in zip(*by_t.values())]
+                lines = {None: rows}
+            else:
+                lines = by_t
+            for j, (t, rows) in enumerate(lines.items()):
+                if not any(rows):
+                    continue
+                ax.plot(n_values, [value(u) if u else None for u in rows], marker='o',
+                        color=colors.get(stage), linestyle=styles[j % len(styles)],
+                        label=stage if t is None else f'{stage} t={t}')
+        ax.set_xlabel('Number of Vertices (n)')
+        ax.set_ylabel(label)
+        ax.grid(True)
+    axes[0][0].legend()
+    fig.suptitle('Resource Usage per Stage')
+
+    return save(plt, fig, 'resource_usage.png', show)
+
+
+def distinct(runs, column):
+    """Values of column over runs, in order of first appearance."""
+    return list(dict.fromkeys(run[column] for run in runs))
+
+
+def mean(values):
+    """Mean of the values that are not None, or None."""
+    values = [x for x in values if x is not None]
+    return sum(values) / len(values) if values else None
+
+
+def report_edges(runs, show=False):
+    """--plot: average original and spanner edge counts against n."""
+    n_values, original_m_values, spanner_m_values = [], [], []
+    for n in distinct(runs, "n"):
+        done = [run for run in runs if run["n"] == n and run["orig_m"] is not None and run["spanner_m"] is not None]
+        if done:
+            n_values.append(n)
+            original_m_values.append(mean(run["orig_m"] for run in done))
+            spanner_m_values.append(mean(run["spanner_m"] for run in done))
+    if not n_values:
+        return []
+    return [plot_edge_comparison(n_values, original_m_values, spanner_m_values, runs[0]["t"], show)]
+
+
+def report_weights(runs, show=False):
+    """--plot_weights: average spanner size against max_w, one line per t."""
+    w_values = distinct(runs, "max_w")
+    spanner_edges_by_t = {t: [mean(run["spanner_m"] for run in runs if run["t"] == t and run["max_w"] == max_w)
+                              for max_w in w_values]
+                          for t in distinct(runs, "t")}
+    return [plot_weight_comparison(w_values, spanner_edges_by_t, runs[0]["n"], show)]
+
+
+def report_time(runs, show=False):
+    """--plot_time: average phase times and step breakdown against n, one line per t."""
+    n_values, t_values = distinct(runs, "n"), distinct(runs, "t")
+
+    def series(key):
+        return {t: [mean(key(run) for run in runs if run["t"] == t and run["n"] == n) for n in n_values]
+                for t in t_values}
+
+    paths = []
+    for phase, title in (("phase1", "T-Spanner Phase 1 Execution Time"),
+                         ("phase2", "T-Spanner Phase 2 Execution Time"),
+                         ("total", "T-Spanner Total Execution Time")):
+        times = series(lambda run: run[phase])
+        if any(all(x is not None for x in row) for row in times.values()):
+            paths.append(plot_time_comparison(n_values, times, title, show))
+
+    step_times_by_t = {}
+    for t in t_values:
+        step_times_by_t[t] = []
+        for n in n_values:
+            rows = [run["extra"]["steps"] for run in runs
+                    if run["t"] == t and run["n"] == n and run["extra"].get("steps")]
+            step_times_by_t[t].append([sum(col) / len(rows) for col in zip(*rows)] if rows else None)
+    if any(any(rows) for rows in step_times_by_t.values()):
+        paths.append(plot_step_breakdown(n_values, step_times_by_t, show))
+    return paths
+
+
+def report_scaling(runs, show=False):
+    """--plot_scaling: median phase times against the thread count."""
+    thread_values = distinct(runs, "threads")
+    times_by_phase = {}
+    for phase in ('phase1', 'phase2', 'total'):
+        times_by_phase[phase] = []
+        for threads in thread_values:
+            times = [run[phase] for run in runs if run["threads"] == threads and run[phase] is not None]
+            times_by_phase[phase].append(float(np.median(times)) if times else None)
+    if not all(x is not None for x in times_by_phase['total']):
+        return []
+    return [plot_scaling(thread_values, times_by_phase, runs[0]["n"], runs[0]["t"], show)]
+
+
+def report_resources(runs, show=False):
+    """--plot_resources: average per-process usage of every stage against n, one line per t."""
+    n_values, t_values = distinct(runs, "n"), distinct(runs, "t")
+    usage_by_stage = {}
+    for stage in ("generator", "spanner", "checker"):
+        usage_by_stage[stage] = {
+            t: [rusage.mean_usage(run["extra"].get("usage", {}).get(stage)
+                                  for run in runs if run["t"] == t and run["n"] == n)
+                for n in n_values]
+            for t in t_values}
+    if not any(any(rows) for by_t in usage_by_stage.values() for rows in by_t.values()):
+        return []
+    return [plot_resources(n_values, usage_by_stage, show)]
+
+
+# Plot builders by main.py mode; the other modes only record runs
+REPORTS = {
+    "plot": report_edges,
+    "plot_weights": report_weights,
+    "plot_time": report_time,
+    "plot_scaling": report_scaling,
+    "plot_resources": report_resources,
+}
+
+
+def report_sweep(store, sweep_id, show=False):
+    """Build the plots of one stored sweep; returns the paths written."""
+    sweep = store.sweep(sweep_id)
+    if sweep is None:
+        raise KeyError(f"no sweep {sweep_id} in {store.path}")
+    runs = store.runs(sweep_id)
+    if sweep["mode"] not in REPORTS or not runs:
+        return []
+    return REPORTS[sweep["mode"]](runs, show)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build plots from the stored results of main.py sweeps.")
+    parser.add_argument("--results", default=resultstore.RESULTS_PATH,
+                        help="Results store written by main.py (default: results.db)")
+    parser.add_argument("--sweep", type=int, action="append",
+                        help="Sweep id to plot (repeatable; default: the latest sweep of every plotting mode)")
+    parser.add_argument("--mode", choices=sorted(REPORTS), help="Only plot the latest sweep of this mode")
+    parser.add_argument("--list", action="store_true", help="List the stored sweeps and exit")
+    parser.add_argument("--show", action="store_true", help="Also show every plot in a window")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.results):
+        sys.exit(f"No results store at {args.results}; run main.py first")
+    store = resultstore.ResultStore(args.results)
+    if args.list:
+        for sweep in store.sweeps():
+            print(f"{sweep['id']:5d}  {sweep['created']}  {sweep['mode']:15s}  {len(store.runs(sweep['id']))} runs")
+        return
+
+    sweep_ids = args.sweep
+    if not sweep_ids:
+        latest = {sweep["mode"]: sweep["id"] for sweep in store.sweeps(args.mode)}
+        sweep_ids = [latest[mode] for mode in REPORTS if mode in latest]
+    if not sweep_ids:
+        print("No plotting sweeps stored")
+    for sweep_id in sweep_ids:
+        if not report_sweep(store, sweep_id, args.show):
+            print(f"Nothing to plot for sweep {sweep_id}")
+
+
+if __name__ == "__main__":
+    main()
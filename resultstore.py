@@ -0,0 +1,111 @@
+"""Persistent store of measured runs for main.py and report.py.
+
+Every main.py invocation opens a sweep (its mode and full argument list)
+and appends one row per measured case: graph parameters, seed, engine and
+thread count, edge counts, the engine's phase timings and the checker's
+verdict as columns, plus a JSON "extra" column for whatever a mode
+measures beyond that (step times, per-process usage, batch and oracle
+statistics). Plots are built from these rows (see report.py), so redrawing
+one never reruns the sweep. The store is SQLite from the standard library;
+the path ":memory:" keeps it for the current process only.
+"""
+
+import datetime
+import json
+import os
+import sqlite3
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(ROOT, "results.db")
+
+# Columns of a run besides its sweep, in table order
+RUN_COLUMNS = ("case_index", "engine", "n", "m", "t", "max_w", "seed", "threads",
+               "orig_m", "spanner_m", "valid", "phase1", "phase2", "total", "input", "output")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    id INTEGER PRIMARY KEY,
+    mode TEXT NOT NULL,
+    created TEXT NOT NULL,
+    args TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    sweep INTEGER NOT NULL REFERENCES sweeps(id),
+    case_index INTEGER, engine TEXT,
+    n INTEGER, m INTEGER, t INTEGER, max_w INTEGER, seed INTEGER, threads INTEGER,
+    orig_m INTEGER, spanner_m INTEGER, valid INTEGER,
+    phase1 INTEGER, phase2 INTEGER, total INTEGER, input INTEGER, output INTEGER,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_sweep ON runs(sweep);
+"""
+
+
+def _json_default(x):
+    # NumPy scalars in measurements
+    return x.item() if hasattr(x, "item") else str(x)
+
+
+class ResultStore:
+    """Sweeps and their runs in one SQLite file."""
+
+    def __init__(self, path=RESULTS_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def new_sweep(self, mode, args):
+        """Open a sweep of the given mode; args is a JSON-serialisable dict. Returns its id."""
+        created = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+        with self.db:
+            cur = self.db.execute("INSERT INTO sweeps (mode, created, args) VALUES (?, ?, ?)",
+                                  (mode, created, json.dumps(args, default=_json_default)))
+        return cur.lastrowid
+
+    def add_run(self, sweep, case=None, extra=None, **params):
+        """Append one run to sweep.
+
+        params fills the parameter columns (case_index, engine, n, m, t,
+        max_w, seed, threads). case is a main.py result dict: its orig_m,
+        spanner_m, valid and timing phases fill the remaining columns, and
+        its usage goes to extra along with the given extra dict. A failed
+        case (None) is stored with empty measurements.
+        """
+        row = {col: params.get(col) for col in RUN_COLUMNS}
+        extra = dict(extra or {})
+        if case:
+            timing = case.get("timing") or {}
+            row["orig_m"], row["spanner_m"] = case.get("orig_m"), case.get("spanner_m")
+            row["valid"] = case.get("valid")
+            for phase in ("phase1", "phase2", "total", "input", "output"):
+                row[phase] = timing.get(phase)
+            if case.get("usage"):
+                extra["usage"] = case["usage"]
+        extra = json.dumps(extra, default=_json_default) if extra else None
+        with self.db:
+            self.db.execute(
+                f"INSERT INTO runs (sweep, {', '.join(RUN_COLUMNS)}, extra) "
+                f"VALUES (?, {', '.join('?' * len(RUN_COLUMNS))}, ?)",
+                (sweep, *(row[col] for col in RUN_COLUMNS), extra))
+
+    def sweep(self, sweep_id):
+        """The sweep as a dict (id, mode, created, args), or None."""
+        row = self.db.execute("SELECT * FROM sweeps WHERE id = ?", (sweep_id,)).fetchone()
+        return dict(row, args=json.loads(row["args"])) if row else None
+
+    def sweeps(self, mode=None):
+        """All sweeps (of one mode), oldest first."""
+        if mode is None:
+            rows = self.db.execute("SELECT * FROM sweeps ORDER BY id").fetchall()
+        else:
+            rows = self.db.execute("SELECT * FROM sweeps WHERE mode = ? ORDER BY id", (mode,)).fetchall()
+        return [dict(row, args=json.loads(row["args"])) for row in rows]
+
+    def runs(self, sweep_id):
+        """Runs of a sweep in insertion order, as dicts with extra decoded ({} if empty)."""
+        rows = self.db.execute("SELECT * FROM runs WHERE sweep = ? ORDER BY rowid", (sweep_id,)).fetchall()
+        return [dict(row, extra=json.loads(row["extra"]) if row["extra"] else {}) for row in rows]
@@ -0,0 +1,120 @@
+"""Resource usage of the child processes main.py launches.
+
+Every generator, spanner and checker run goes through Process, a Popen that
+keeps the kernel's accounting for that one child (peak RSS, user/sys CPU
+time, context switches and page faults) on the object. This stays exact
+when several children run at once, which RUSAGE_CHILDREN deltas do not.
+
+Linux carries a process's peak RSS across exec, and Popen forks from the
+harness, so a child would report at least the harness's own RSS. When
+measure_exec (built from measure.cpp) exists, the command is started
+through it instead: it forks the command from a tiny process, reaps it with
+wait4 and reports the usage on a pipe. Without it the child is reaped with
+os.wait4 directly and its peak RSS has that floor. Usage is a plain dict,
+so it travels through the worker pool and the result cache as JSON.
+"""
+
+import os
+import subprocess
+import sys
+
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+LAUNCHER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "measure_exec")
+
+FIELDS = ("peak_rss", "user", "sys", "vcsw", "ivcsw", "minflt", "majflt")
+
+
+def usage_dict(ru):
+    """Usage dict of a resource.struct_rusage: peak RSS in bytes, CPU times in seconds."""
+    return {
+        "peak_rss": ru.ru_maxrss * RSS_UNIT,
+        "user": ru.ru_utime,
+        "sys": ru.ru_stime,
+        "vcsw": ru.ru_nvcsw,
+        "ivcsw": ru.ru_nivcsw,
+        "minflt": ru.ru_minflt,
+        "majflt": ru.ru_majflt,
+    }
+
+
+def parse_launcher(line):
+    """Usage dict of a measure_exec report line, or None if it is malformed."""
+    try:
+        values = [float(x) for x in line.split()]
+    except ValueError:
+        return None
+    if len(values) != len(FIELDS):
+        return None
+    usage = dict(zip(FIELDS, values))
+    usage["peak_rss"] *= RSS_UNIT
+    return usage
+
+
+class Process(subprocess.Popen):
+    """Popen whose usage attribute holds the child's usage dict once it was waited for.
+
+    wait(), communicate() and the context manager all reap through
+    _try_wait; poll() does not, so callers wait for the child instead.
+    """
+
+    usage = None
+    _report = None
+
+    def __init__(self, args, **kwargs):
+        if not os.path.exists(LAUNCHER):
+            super().__init__(args, **kwargs)
+            return
+        r, w = os.pipe()
+        kwargs["pass_fds"] = tuple(kwargs.get("pass_fds", ())) + (w,)
+        try:
+            super().__init__([LAUNCHER, str(w)] + list(args), **kwargs)
+        except BaseException:
+            os.close(r)
+            raise
+        finally:
+            os.close(w)
+        self._report = r
+
+    def _try_wait(self, wait_flags):
+        try:
+            pid, sts, ru = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            # Reaped elsewhere (e.g. SIGCHLD ignored): status and usage are lost
+            return self.pid, 0
+        if pid == self.pid:
+            if self._report is None:
+                self.usage = usage_dict(ru)
+            else:
+                # The launcher has exited, so its report is complete
+                with os.fdopen(self._report) as report:
+                    self.usage = parse_launcher(report.read())
+                self._report = None
+        return pid, sts
+
+
+def run(cmd, capture_output=False, text=False, **kwargs):
+    """subprocess.run through Process; the CompletedProcess gets a usage attribute."""
+    if capture_output:
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    with Process(cmd, text=text, **kwargs) as proc:
+        stdout, stderr = proc.communicate()
+    result = subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+    result.usage = proc.usage
+    return result
+
+
+def mean_usage(usages):
+    """Field-wise mean of usage dicts, skipping missing ones; None if there are none."""
+    usages = [u for u in usages if u]
+    if not usages:
+        return None
+    return {f: sum(u[f] for u in usages) / len(usages) for f in FIELDS}
+
+
+def format_usage(u):
+    """One-line summary of a usage dict."""
+    return (f"peak RSS {u['peak_rss'] / 2**20:.1f} MB, CPU {u['user']:.3f}s user + {u['sys']:.3f}s sys, "
+            f"{u['vcsw']:.0f}/{u['ivcsw']:.0f} vol/invol switches, "
+            f"{u['minflt']:.0f}/{u['majflt']:.0f} minor/major faults")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Stretch distribution profiler for spanners.
+
+Runs single-source shortest paths from k sampled sources (or every vertex)
+on both the original graph and the spanner in a pool of worker processes.
+Each worker mmaps the two graphs as CSR files and keeps only O(n) distance
+arrays, returning a fixed-size stretch histogram, exact sum/max and its
+worst pairs per source. The parent merges these as they arrive, so memory
+never depends on the number of pairs.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import graphio
+import tspanner
+
+# Histogram bins over [1, max(t, 2)]; larger stretches go to an overflow count
+HIST_BINS = 1000
+PERCENTILES = (50, 90, 99, 99.9)
+
+_worker = {}
+
+
+def _init_worker(graph_csr, spanner_csr, t, hi, worst):
+    g = graphio.read_graph_file(graph_csr)
+    h = graphio.read_graph_file(spanner_csr)
+    tspanner.load_library()
+    _worker.update(g=g, h=h, t=t, hi=hi, worst=worst,
+                   dg=np.empty(g.n, dtype=np.int64), dh=np.empty(g.n, dtype=np.int64))
+
+
+def _profile_source(s):
+    """Stretch statistics for all pairs (s, x) with x reachable from s in G."""
+    g, h = _worker["g"], _worker["h"]
+    dg = tspanner.sssp(g.indptr, g.indices, g.weights, s, _worker["dg"])
+    dh = tspanner.sssp(h.indptr, h.indices, h.weights, s, _worker["dh"])
+    reach = np.flatnonzero(dg > 0)
+    lost = reach[dh[reach] < 0]
+    reach = reach[dh[reach] >= 0]
+    ratio = dh[reach] / dg[reach]
+    exact = int((dh[reach] == dg[reach]).sum())
+
+    hi = _worker["hi"]
+    hist, _ = np.histogram(ratio, bins=HIST_BINS, range=(1.0, hi))
+    k = min(_worker["worst"], ratio.size)
+    top = np.argpartition(ratio, ratio.size - k)[ratio.size - k:] if k else np.empty(0, dtype=np.int64)
+    worst = [(float(ratio[i]), int(s), int(reach[i]), int(dg[reach[i]]), int(dh[reach[i]])) for i in top]
+    # Pairs disconnected in the spanner have infinite stretch
+    worst += [(float("inf"), int(s), int(x), int(dg[x]), -1) for x in lost[:_worker["worst"]]]
+    return {
+        "hist": hist,
+        "overflow": int((ratio > hi).sum()),
+        "above": int((ratio > _worker["t"]).sum()),
+        "pairs": int(ratio.size),
+        "exact": exact,
+        "sum": float(ratio.sum()),
+        "max": float(ratio.max()) if ratio.size else 1.0,
+        "lost": int(lost.size),
+        "worst": worst,
+    }
+
+
+def _to_csr_file(path, dest):
+    """Return a CSR layout version of a binary graph file, writing it if needed."""
+    g = graphio.read_graph_file(path)
+    if isinstance(g, graphio.CSRGraph):
+        return path
+    graphio.write_csr_file(dest, g.n, g.t, *graphio.to_csr(g.n, g.u, g.v, g.w))
+    return dest
+
+
+def choose_sources(n, k=None, seed=0):
+    """k distinct random sources, or every vertex when k is None or >= n."""
+    if k is None or k >= n:
+        return np.arange(n)
+    return np.sort(np.random.default_rng(seed).choice(n, size=k, replace=False))
+
+
+def profile_stretch(graph_path, spanner_path, k=None, workers=None, seed=0, worst=10,
+                    t=None, progress=None):
+    """Profile the stretch of spanner_path relative to graph_path.
+
+    Both paths may be anything graphio imports. progress, if given, is called
+    with the merged summary after each finished source so callers can
+    stream partial results. Returns the final summary dict.
+    """
+    graph_path = graphio.import_graph(graph_path, t=t)
+    spanner_path = graphio.import_graph(spanner_path, t=t)
+    n, _, file_t, _ = graphio.read_header(graph_path)
+    t = t if t is not None else file_t
+    hi = float(max(t, 2))
+    sources = choose_sources(n, k, seed)
+    workers = workers or os.cpu_count() or 1
+
+    total = {
+        "hist": np.zeros(HIST_BINS, dtype=np.int64), "overflow": 0, "pairs": 0,
+        "sum": 0.0, "max": 1.0, "lost": 0, "above": 0, "exact": 0, "worst": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        g_csr = _to_csr_file(graph_path, os.path.join(tmp, "graph.tsg"))
+        h_csr = _to_csr_file(spanner_path, os.path.join(tmp, "spanner.tsg"))
+        init = (g_csr, h_csr, t, hi, worst)
+        chunk = max(1, len(sources) // (workers * 8))
+        with mp.Pool(workers, initializer=_init_worker, initargs=init) as pool:
+            for done, part in enumerate(pool.imap_unordered(_profile_source, sources.tolist(), chunk), 1):
+                total["hist"] += part["hist"]
+                for key in ("overflow", "pairs", "sum", "lost", "above", "exact"):
+                    total[key] += part[key]
+                total["max"] = max(total["max"], part["max"])
+                total["worst"] = sorted(total["worst"] + part["worst"], reverse=True)[:worst]
+                if progress:
+                    progress(summarize(total, hi, t, done, len(sources)))
+    return summarize(total, hi, t, len(sources), len(sources))
+
+
+def summarize(total, hi, t, done, sources):
+    """Mean, max and histogram percentiles of merged per-source results."""
+    edges = np.linspace(1.0, hi, HIST_BINS + 1)
+    counted = total["pairs"]
+    cum = np.cumsum(total["hist"])
+    pct = {}
+    for p in PERCENTILES:
+        rank = int(np.ceil(p / 100 * counted)) if counted else 0
+        if counted == 0:
+            pct[str(p)] = None
+        elif rank <= total["exact"]:
+            # Distance-preserving pairs are counted exactly
+            pct[str(p)] = 1.0
+        elif rank > cum[-1]:
+            # Falls in the overflow bin: only the exact max is known
+            pct[str(p)] = total["max"]
+        else:
+            # Upper edge of the bin holding the rank-th smallest stretch
+            pct[str(p)] = float(edges[np.searchsorted(cum, max(rank, 1)) + 1])
+    return {
+        "t": t,
+        "sources": sources,
+        "sources_done": done,
+        "pairs": counted,
+        "mean": total["sum"] / counted if counted else None,
+        "max": total["max"] if not total["lost"] else float("inf"),
+        "percentiles": pct,
+        "above_t": total["above"],
+        "exact_pairs": total["exact"],
+        "disconnected": total["lost"],
+        "hist_edges": edges.tolist(),
+        "hist_counts": total["hist"].tolist() + [total["overflow"]],
+        "worst": [
+            {"stretch": r, "u": u, "v": v, "d_graph": dg, "d_spanner": dh}
+            for r, u, v, dg, dh in total["worst"]
+        ],
+    }
+
+
+def print_summary(summary, out=sys.stdout):
+    pct = ", ".join(f"p{p}={v:.3f}" for p, v in summary["percentiles"].items() if v is not None)
+    print(f"  Stretch over {summary['pairs']} pairs from {summary['sources_done']} sources: "
+          f"mean={summary['mean'] or 0:.4f} max={summary['max']:.4f} {pct}", file=out)
+    if summary["above_t"] or summary["disconnected"]:
+        print(f"  Pairs above t={summary['t']}: {summary['above_t']}, "
+              f"disconnected in spanner: {summary['disconnected']}", file=out)
+    for wp in summary["worst"][:5]:
+        print(f"    worst: ({wp['u']}, {wp['v']}) stretch={wp['stretch']:.4f} "
+              f"d_G={wp['d_graph']} d_H={wp['d_spanner']}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the stretch distribution of a spanner")
+    parser.add_argument("graph", help="Original graph (binary .tsg or any format graphio imports)")
+    parser.add_argument("spanner", help="Spanner (binary .tsg or text output of t_spanner_exec)")
+    parser.add_argument("--sources", type=int, default=None, help="Number of sampled sources (default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for source sampling (default: 0)")
+    parser.add_argument("--worst", type=int, default=10, help="Number of worst pairs to keep (default: 10)")
+    parser.add_argument("--t", type=int, default=None, help="Stretch bound (default: from the graph header)")
+    parser.add_argument("--json", default=None, help="Write the full summary (with histogram) to this file")
+    parser.add_argument("--progress", action="store_true", help="Stream partial summaries to stderr")
+    args = parser.parse_args()
+
+    last = [0.0]
+
+    def progress(summary):
+        if time.monotonic() - last[0] >= 1.0:
+            last[0] = time.monotonic()
+            print_summary(summary, sys.stderr)
+
+    summary = profile_stretch(args.graph, args.spanner, args.sources, args.workers, args.seed,
+                              args.worst, args.t, progress if args.progress else None)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
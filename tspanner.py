@@ -0,0 +1,266 @@
+"""In-process bindings for the Baswana-Sen engine in algo/t-spanner.cpp.
+
+The C++ file is built as a shared library (-DTSPANNER_LIB) and called
+through ctypes. int32 NumPy arrays are handed to the engine by pointer, so
+nothing is copied or formatted as text on the way in or out.
+"""
+
+import ctypes
+import glob
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LIB_SOURCE = os.path.join(ROOT, "algo", "t-spanner.cpp")
+LIB_PATH = os.path.join(ROOT, "libtspanner.so")
+LIB_FLAGS = ["-std=c++17", "-O2", "-fopenmp", "-shared", "-fPIC", "-DTSPANNER_LIB"]
+
+# Spanner variants of the engine, in the order of its VARIANTS table
+VARIANTS = ("basic", "lowdeg", "prune")
+
+_lib = None
+
+_i32p = np.ctypeslib.ndpointer(dtype=np.int32, flags="C_CONTIGUOUS")
+_i64p = np.ctypeslib.ndpointer(dtype=np.int64, flags="C_CONTIGUOUS")
+_u8p = np.ctypeslib.ndpointer(dtype=np.uint8, flags="C_CONTIGUOUS")
+
+
+def build_library(force=False):
+    """Compile the shared library if it is missing or older than its sources (algo/*)."""
+    sources = glob.glob(os.path.join(ROOT, "algo", "*"))
+    if (not force and os.path.exists(LIB_PATH)
+            and os.path.getmtime(LIB_PATH) >= max(os.path.getmtime(p) for p in sources)):
+        return LIB_PATH
+    compiler = "g++-14" if sys.platform == "darwin" else "g++"
+    try:
+        subprocess.run([compiler, *LIB_FLAGS, LIB_SOURCE, "-o", LIB_PATH],
+                       check=True, stderr=subprocess.PIPE)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Error compiling {LIB_SOURCE}: {e.stderr.decode()}") from None
+    return LIB_PATH
+
+
+def load_library():
+    """Build (if needed) and load the engine, declaring the C signatures once."""
+    global _lib
+    if _lib is not None:
+        return _lib
+    lib = ctypes.CDLL(build_library())
+    lib.ts_spanner_edges.restype = ctypes.c_longlong
+    lib.ts_spanner_edges.argtypes = [
+        ctypes.c_int, ctypes.c_longlong, _i32p, _i32p, _i32p,
+        ctypes.c_int, ctypes.c_ulonglong, _u8p, _i64p,
+    ]
+    lib.ts_spanner_csr.restype = ctypes.c_longlong
+    lib.ts_spanner_csr.argtypes = [
+        ctypes.c_int, _i64p, _i32p, _i32p,
+        ctypes.c_int, ctypes.c_ulonglong, _u8p, _i64p,
+    ]
+    lib.ts_set_threads.restype = None
+    lib.ts_set_threads.argtypes = [ctypes.c_int]
+    lib.ts_set_variant.restype = ctypes.c_int
+    lib.ts_set_variant.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int]
+    lib.ts_set_stats.restype = None
+    lib.ts_set_stats.argtypes = [ctypes.c_int]
+    lib.ts_last_stats.restype = ctypes.c_longlong
+    lib.ts_last_stats.argtypes = [ctypes.c_char_p, ctypes.c_longlong]
+    lib.ts_dijkstra.restype = None
+    lib.ts_dijkstra.argtypes = [ctypes.c_int, _i64p, _i32p, _i32p, ctypes.c_int, _i64p]
+    lib.ts_oracle_edges.restype = ctypes.c_longlong
+    lib.ts_oracle_edges.argtypes = [
+        ctypes.c_int, ctypes.c_longlong, _i32p, _i32p, _i32p,
+        ctypes.c_int, ctypes.c_ulonglong, ctypes.c_char_p, _i64p,
+    ]
+    lib.ts_oracle_load.restype = ctypes.c_void_p
+    lib.ts_oracle_load.argtypes = [ctypes.c_char_p]
+    lib.ts_oracle_free.restype = None
+    lib.ts_oracle_free.argtypes = [ctypes.c_void_p]
+    lib.ts_oracle_info.restype = None
+    lib.ts_oracle_info.argtypes = [ctypes.c_void_p, _i64p]
+    lib.ts_oracle_query.restype = ctypes.c_int
+    lib.ts_oracle_query.argtypes = [ctypes.c_void_p, ctypes.c_longlong, _i32p, _i32p, _i64p]
+    _lib = lib
+    return lib
+
+
+def _as_i32(a):
+    # No copy when the caller already passes contiguous int32
+    return np.ascontiguousarray(a, dtype=np.int32)
+
+
+def _seed(seed):
+    if seed is None:
+        return int.from_bytes(os.urandom(8), "little")
+    return int(seed) & 0xFFFFFFFFFFFFFFFF
+
+
+def _set_variant(lib, variant):
+    if variant not in VARIANTS:
+        raise ValueError(f"unknown variant {variant!r} (one of {', '.join(VARIANTS)})")
+    lib.ts_set_variant(VARIANTS.index(variant), 0, 0)
+
+
+def _timing(raw, stats):
+    if stats:
+        return last_stats()
+    return {"phase1": int(raw[0]), "phase2": int(raw[1]), "total": int(raw[2])}
+
+
+def last_stats():
+    """Timings and step statistics of the last spanner call, as a dict.
+
+    Step statistics ("iterations", "phase2_stats") are only present if that
+    call was made with stats=True.
+    """
+    lib = load_library()
+    buf = ctypes.create_string_buffer(1 << 16)
+    size = lib.ts_last_stats(buf, len(buf))
+    if size >= len(buf):
+        buf = ctypes.create_string_buffer(size + 1)
+        lib.ts_last_stats(buf, len(buf))
+    return json.loads(buf.value)
+
+
+def spanner_mask(n, u, v, w, t, seed=None, stats=False, threads=None, variant="basic"):
+    """Build a t-spanner of the edge list (u, v, w).
+
+    Returns (mask, timing): a boolean array with mask[i] set when edge i is
+    kept, and the phase1/phase2/total microseconds reported by the engine.
+    With stats, timing also holds the per-iteration step timings and
+    counters (see last_stats). threads sets the engine's OpenMP thread
+    count (None: OMP_NUM_THREADS or all cores); the spanner is the same
+    for every thread count. variant picks the engine's post-pass (see
+    VARIANTS and --variant of t_spanner_exec) with its default parameters.
+    """
+    u, v, w = _as_i32(u), _as_i32(v), _as_i32(w)
+    if not (u.shape == v.shape == w.shape):
+        raise ValueError("u, v and w must have the same length")
+    mask = np.zeros(u.size, dtype=np.uint8)
+    raw = np.zeros(3, dtype=np.int64)
+    lib = load_library()
+    lib.ts_set_stats(int(stats))
+    lib.ts_set_threads(threads or 0)
+    _set_variant(lib, variant)
+    kept = lib.ts_spanner_edges(n, u.size, u, v, w, t, _seed(seed), mask, raw)
+    if kept < 0:
+        raise ValueError("edge endpoint out of range [0, n)")
+    return mask.view(bool), _timing(raw, stats)
+
+
+def spanner_edges(n, u, v, w, t, seed=None, stats=False, threads=None, variant="basic"):
+    """Like spanner_mask, but return the indices of the kept edges."""
+    mask, timing = spanner_mask(n, u, v, w, t, seed, stats, threads, variant)
+    return np.flatnonzero(mask), timing
+
+
+def spanner_csr_mask(indptr, indices, weights, t, seed=None, stats=False, threads=None, variant="basic"):
+    """Build a t-spanner of a CSR graph.
+
+    Entries with column > row are the edges, so the matrix may be symmetric
+    or upper triangular. The returned mask is indexed by CSR entry and set
+    only on those upper entries.
+    """
+    indptr = np.ascontiguousarray(indptr, dtype=np.int64)
+    indices, weights = _as_i32(indices), _as_i32(weights)
+    n = indptr.size - 1
+    mask = np.zeros(indices.size, dtype=np.uint8)
+    raw = np.zeros(3, dtype=np.int64)
+    lib = load_library()
+    lib.ts_set_stats(int(stats))
+    lib.ts_set_threads(threads or 0)
+    _set_variant(lib, variant)
+    kept = lib.ts_spanner_csr(n, indptr, indices, weights, t, _seed(seed), mask, raw)
+    if kept < 0:
+        raise ValueError("column index out of range [0, n)")
+    return mask.view(bool), _timing(raw, stats)
+
+
+def sssp(indptr, indices, weights, source, out=None):
+    """Dijkstra distances from source on a CSR graph (-1 where unreachable).
+
+    out may be a preallocated int64 array of length n, reused across calls.
+    """
+    indptr = np.ascontiguousarray(indptr, dtype=np.int64)
+    indices, weights = _as_i32(indices), _as_i32(weights)
+    n = indptr.size - 1
+    if not 0 <= source < n:
+        raise ValueError("source out of range [0, n)")
+    if out is None:
+        out = np.empty(n, dtype=np.int64)
+    load_library().ts_dijkstra(n, indptr, indices, weights, int(source), out)
+    return out
+
+
+def build_oracle(n, u, v, w, t, path, seed=None, threads=None):
+    """Build the spanner of (u, v, w) and its distance oracle, saved to path.
+
+    The oracle answers (2k-1)-approximate distance queries with k = (t+1)/2
+    (see DistanceOracle); t_spanner_exec --oracle builds the same file.
+    Returns the timing dict: phase1/phase2/total of the spanner plus
+    "oracle", the microseconds spent on the oracle, and "bunch", its number
+    of bunch entries.
+    """
+    u, v, w = _as_i32(u), _as_i32(v), _as_i32(w)
+    if not (u.shape == v.shape == w.shape):
+        raise ValueError("u, v and w must have the same length")
+    raw = np.zeros(4, dtype=np.int64)
+    lib = load_library()
+    lib.ts_set_stats(0)
+    lib.ts_set_threads(threads or 0)
+    _set_variant(lib, "basic")
+    entries = lib.ts_oracle_edges(n, u.size, u, v, w, t, _seed(seed), os.fsencode(path), raw)
+    if entries == -1:
+        raise ValueError("edge endpoint out of range [0, n)")
+    if entries < 0:
+        raise OSError(f"cannot write {path}")
+    return {"phase1": int(raw[0]), "phase2": int(raw[1]), "total": int(raw[2]),
+            "oracle": int(raw[3]), "bunch": int(entries)}
+
+
+class DistanceOracle:
+    """A loaded Thorup-Zwick distance oracle file.
+
+    query() estimates d(u, v) for whole arrays of pairs in one call, each
+    in O(k) hash lookups, never below the distance and at most 2k-1 times
+    it. Use as a context manager or call close() to free it.
+    """
+
+    def __init__(self, path):
+        self._lib = load_library()
+        self._handle = self._lib.ts_oracle_load(os.fsencode(path))
+        if not self._handle:
+            raise OSError(f"cannot read oracle file {path}")
+        info = np.zeros(4, dtype=np.int64)
+        self._lib.ts_oracle_info(self._handle, info)
+        self.n, self.k, self.t, self.entries = (int(x) for x in info)
+
+    def query(self, u, v, threads=None):
+        """Distance estimates for the pairs (u[i], v[i]) as int64, -1 where disconnected."""
+        u, v = _as_i32(np.atleast_1d(u)), _as_i32(np.atleast_1d(v))
+        if u.shape != v.shape:
+            raise ValueError("u and v must have the same length")
+        if self._handle is None:
+            raise ValueError("oracle is closed")
+        out = np.empty(u.size, dtype=np.int64)
+        self._lib.ts_set_threads(threads or 0)
+        if self._lib.ts_oracle_query(self._handle, u.size, u, v, out) < 0:
+            raise ValueError("query vertex out of range [0, n)")
+        return out
+
+    def close(self):
+        if self._handle is not None:
+            self._lib.ts_oracle_free(self._handle)
+            self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()